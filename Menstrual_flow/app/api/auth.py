@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Header
 from pydantic import BaseModel
 from typing import Optional
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import jwt
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+import secrets
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app import config
+from app.database import get_async_db
 from app.storage.model import User
 
 SECRET_KEY = "your-secret-key"
@@ -17,12 +21,8 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 fake_users_db = {}
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return (await db.execute(select(User).where(User.email == email))).scalars().first()
 
 class UserSignup(BaseModel):
     email: str
@@ -55,15 +55,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 # OTP removed: no longer generating or validating one-time codes
 
 @router.post("/signup", status_code=201)
-def signup(user: UserSignup, db: Session = Depends(get_db)):
+async def signup(user: UserSignup, db: AsyncSession = Depends(get_async_db)):
     # check existing
-    existing = db.query(User).filter(User.email == user.email).first()
+    existing = await _user_by_email(db, user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    # create new user (no OTP)
+    # create new user (no OTP); bcrypt is CPU-bound, so hash off the event loop
     new_user = User(
         email=user.email,
-        password_hash=hash_password(user.password),
+        password_hash=await run_in_threadpool(hash_password, user.password),
         phone=user.phone,
         age=user.age,
         height_cm=user.height_cm,
@@ -73,8 +73,8 @@ def signup(user: UserSignup, db: Session = Depends(get_db)):
         otp_expires=None
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return {"message": "User registered successfully.", "id": new_user.id, "email": new_user.email}
 
 # OTP routes removed
@@ -82,9 +82,9 @@ def signup(user: UserSignup, db: Session = Depends(get_db)):
 # Resend OTP route removed
 
 @router.post("/login", response_model=TokenResponse)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    u = db.query(User).filter(User.email == user.email).first()
-    if not u or not verify_password(user.password, u.password_hash):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    u = await _user_by_email(db, user.email)
+    if not u or not await run_in_threadpool(verify_password, user.password, u.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_access_token({"sub": u.email})
     return {"access_token": token}
@@ -92,7 +92,7 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 security = HTTPBearer()
 
-def get_current_user(creds: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
+async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)) -> User:
     try:
         payload = jwt.decode(creds.credentials, SECRET_KEY, algorithms=[ALGORITHM])
     except Exception:
@@ -100,11 +100,18 @@ def get_current_user(creds: HTTPAuthorizationCredentials = Depends(security), db
     email = payload.get("sub")
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
-    u = db.query(User).filter(User.email == email).first()
+    u = await _user_by_email(db, email)
     if not u:
         raise HTTPException(status_code=401, detail="Invalid token")
     return u
 
+def require_admin_key(x_admin_key: Optional[str] = Header(None)):
+    """Guard for operator endpoints: the X-Admin-Key header must match RETRAIN_ADMIN_KEY."""
+    if not config.RETRAIN_ADMIN_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, config.RETRAIN_ADMIN_KEY):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
 class UserProfileOut(BaseModel):
     id: int
     email: str
@@ -114,7 +121,7 @@ class UserProfileOut(BaseModel):
     blood_group: Optional[str] = None
 
 @router.get("/me", response_model=UserProfileOut)
-def me(current: User = Depends(get_current_user)):
+async def me(current: User = Depends(get_current_user)):
     return UserProfileOut(
         id=current.id,
         email=current.email,
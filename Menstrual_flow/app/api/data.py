@@ -1,7 +1,13 @@
-from fastapi import APIRouter
+import json
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+from app import config
+from app.models import BatchReadings
 from app.services import data_service
+from app.services.ingest_buffer import IngestBufferFull, IngestUnavailable
 from app.services.thingspeak_service import thingspeak_service
 
 router = APIRouter()
@@ -42,9 +48,25 @@ class SingleReadingInput(BaseModel):
     color_temperature: Optional[float] = None
     color_category: Optional[str] = None
 
+def _submit_buffered(fields: dict) -> int:
+    """Queue a reading on the ingest buffer, mapping backpressure to 429 / 503."""
+    try:
+        return data_service.submit_reading(fields)
+    except IngestBufferFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except IngestUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/single")
-def add_single_reading(input: SingleReadingInput):
-    return data_service.add_single_reading(
+async def add_single_reading(input: SingleReadingInput, response: Response):
+    if config.INGEST_BUFFER_ENABLED:
+        # Acknowledged before the write; the reading is stored once committed_seq reaches seq
+        # (single server worker only: each worker process numbers its own readings)
+        response.status_code = 202
+        return {"status": "accepted", "seq": _submit_buffered(input.dict())}
+    return await data_service.add_single_reading_async(
         user_email=input.user_email,
         flow_ml=input.flow_ml,
         hb=input.hb,
@@ -79,10 +101,48 @@ def add_single_reading(input: SingleReadingInput):
         color_temperature=input.color_temperature,
         color_category=input.color_category
     )
+
+@router.get("/ingest/status")
+def ingest_status():
+    """Ingest buffer state; a buffered reading is stored once committed_seq >= its seq.
+    Sequence numbers are per process, so this holds only with a single server worker."""
+    return data_service.ingest_buffer.snapshot()
+
+@router.post("/batch")
+def add_readings_batch(batch: BatchReadings, upsert: bool = False):
+    """Insert many readings in one transaction; upsert=true updates the newest reading with
+    the same (user_email, timestamp) instead of adding another. Returns a status per reading."""
+    if len(batch.readings) > config.INGEST_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {config.INGEST_BATCH_MAX_ROWS} readings)")
+    return data_service.add_readings_batch(batch.readings, upsert=upsert)
+
+@router.get("/history/{user_email}")
+async def reading_history(
+    user_email: str,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (id and timestamp are always included)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    stream: bool = Query(False, description="Stream every remaining reading as NDJSON instead of one page"),
+):
+    """Readings in time order, one keyset page at a time or streamed as NDJSON."""
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        if stream:
+            pages = data_service.iter_reading_pages_async(user_email, field_list, cursor, page_size=limit, start=start, end=end)
+            # One chunk per page keeps the number of sends (and queries) per response small
+            chunks = ("".join(json.dumps(item) + "\n" for item in page) async for page in pages)
+            return StreamingResponse(chunks, media_type="application/x-ndjson")
+        items, next_cursor = await data_service.readings_page_async(user_email, field_list, cursor, limit, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
 @router.get("/analysis/{user_email}")
-def analyze_user(user_email: str):
-    from app.services.analytics_service import compute_summary
-    return compute_summary(user_email)
+async def analyze_user(user_email: str):
+    from app.services.analytics_service import compute_summary_async
+    return await compute_summary_async(user_email)
 
 @router.get("/gas-sensor/latest")
 async def get_latest_gas_sensor_data():
@@ -111,7 +171,7 @@ async def add_gas_sensor_reading(user_email: str):
     gas_data.update(aqi_data)
     
     # Add the reading with sensor data (gas + color)
-    reading = data_service.add_single_reading(
+    fields = dict(
         user_email=user_email,
         flow_ml=0.0,  # Default flow value
         # Gas sensor data
@@ -136,6 +196,13 @@ async def add_gas_sensor_reading(user_email: str):
         color_temperature=gas_data.get("color_temperature"),
         color_category=gas_data.get("color_category")
     )
+    if config.INGEST_BUFFER_ENABLED:
+        return {
+            "message": "Gas sensor reading accepted",
+            "seq": _submit_buffered(fields),
+            "gas_data": gas_data
+        }
+    reading = await data_service.add_single_reading_async(**fields)
     
     return {
         "message": "Gas sensor reading added successfully",
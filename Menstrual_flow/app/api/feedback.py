@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.storage.model import Feedback
 
 
@@ -30,7 +31,7 @@ class FeedbackOut(BaseModel):
 
 
 @router.post("/", response_model=FeedbackOut, status_code=201)
-def create_feedback(payload: FeedbackIn, db: Session = Depends(get_db)):
+async def create_feedback(payload: FeedbackIn, db: AsyncSession = Depends(get_async_db)):
     fb = Feedback(
         rating=int(payload.rating),
         comment=(payload.comment or '')[:1000] if payload.comment else None,
@@ -39,20 +40,20 @@ def create_feedback(payload: FeedbackIn, db: Session = Depends(get_db)):
         user_email=(payload.user_email or None),
     )
     db.add(fb)
-    db.commit()
-    db.refresh(fb)
+    await db.commit()
+    await db.refresh(fb)
     return fb
 
 
 @router.get("/public", response_model=List[FeedbackOut])
-def list_public_feedback(limit: int = 12, db: Session = Depends(get_db)):
-    q = db.query(Feedback).order_by(Feedback.created_at.desc()).limit(max(1, min(limit, 50)))
-    return q.all()
+async def list_public_feedback(limit: int = 12, db: AsyncSession = Depends(get_async_db)):
+    q = select(Feedback).order_by(Feedback.created_at.desc()).limit(max(1, min(limit, 50)))
+    return (await db.execute(q)).scalars().all()
 
 
 @router.get("/summary")
-def feedback_summary(db: Session = Depends(get_db)):
-    rows = db.query(Feedback.rating).all()
+async def feedback_summary(db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.execute(select(Feedback.rating))).all()
     ratings = [r[0] for r in rows if isinstance(r[0], int)]
     if not ratings:
         return {"count": 0, "avg": None}
@@ -1,12 +1,26 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
-from app.ml.ml_service import predict_flow_risk, save_user_entry
+import json
+import threading
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+from app import config
+from app.api.auth import require_admin_key
+from app.ml import advice, image_features, ml_service, stage_timer
+from app.ml.inference_executor import InferenceOverloaded
+from app.ml.ml_service import predict_flow_risk, predict_flow_risk_async, predict_flow_risk_batch, save_user_entry
 
 router = APIRouter(
     tags=["ML"]
 )
 
+def _check_image_size(image_base64: Optional[str]):
+    # Reject before decoding anything; the limit applies to the decoded bytes
+    if image_base64 and len(image_base64) > image_features.max_base64_length():
+        raise HTTPException(status_code=413, detail=f"Image too large (max {config.IMAGE_MAX_BYTES} bytes)")
+
+
 class FlowInput(BaseModel):
     flow_ml: float
     hb: float
@@ -45,24 +59,175 @@ class FlowInput(BaseModel):
     discharge_color: Optional[float] = None
 
 @router.post("/predict")
-async def predict_flow(input_data: FlowInput):
+async def predict_flow(input_data: FlowInput, response: Response, compact: bool = False):
+    """Pass compact=true to get `advice_codes` (rendered with GET /advice/catalog) instead of advice text."""
+    _check_image_size(input_data.image_base64)
+    return await _predict(input_data, response, compact=compact)
+
+
+async def _predict(input_data: FlowInput, response: Response, image_descriptor=None, compact=False):
+    if not config.SERVER_TIMING_HEADER:
+        return await _run_predict(input_data, image_descriptor, compact)
+    with stage_timer.collect() as spans:
+        result = await _run_predict(input_data, image_descriptor, compact)
+    response.headers["Server-Timing"] = stage_timer.server_timing(spans)
+    return result
+
+
+async def _run_predict(input_data: FlowInput, image_descriptor=None, compact=False):
     try:
-        features = input_data.dict()
+        # Unset optional biomarkers are treated as absent rather than as None values
+        features = input_data.dict(exclude_none=True)
         label = features.pop("label", None)
         image_base64 = features.pop("image_base64", None)
 
         if label is not None:
             save_user_entry(features, label)
 
-        result = predict_flow_risk(features, image_base64=image_base64)
+        result = await predict_flow_risk_async(
+            features, image_base64=image_base64, image_descriptor=image_descriptor, compact=compact
+        )
 
         return result
 
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {e}")
 
 
 # Alias path to satisfy frontend calling /flow/predict
 @router.post("/flow/predict")
-async def predict_flow_alias(input_data: FlowInput):
-    return await predict_flow(input_data)
\ No newline at end of file
+async def predict_flow_alias(input_data: FlowInput, response: Response, compact: bool = False):
+    return await predict_flow(input_data, response, compact)
+
+
+# Allowance for multipart boundaries, headers and the JSON `data` field around the image
+_UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+@router.post("/predict/upload")
+async def predict_flow_upload(request: Request, response: Response, compact: bool = False):
+    """
+    Multipart variant of /predict for binary images. Send a `data` field with the
+    FlowInput JSON (without image_base64) and an optional `image` file field.
+    The body is rejected from its Content-Length before anything is read; the
+    form parser spools the file and PIL reads it from that buffer.
+    """
+    length = request.headers.get("content-length")
+    if length is None:
+        raise HTTPException(status_code=411, detail="Content-Length required")
+    if not length.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if int(length) > config.IMAGE_MAX_BYTES + _UPLOAD_FORM_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"Upload too large (max {config.IMAGE_MAX_BYTES} bytes image)")
+
+    async with request.form(max_files=1, max_fields=1) as form:
+        data = form.get("data")
+        if not isinstance(data, str):
+            raise HTTPException(status_code=422, detail="Missing 'data' form field")
+        try:
+            input_data = FlowInput(**json.loads(data))
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid 'data' field: {e}")
+
+        image_descriptor = None
+        image = form.get("image")
+        if image is not None and not isinstance(image, str) and ml_service.uses_image_features():
+            try:
+                image_descriptor = await run_in_threadpool(image_features.extract_descriptor_file, image.file)
+            except image_features.ImageTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
+
+    input_data.image_base64 = None
+    return await _predict(input_data, response, image_descriptor=image_descriptor, compact=compact)
+
+
+@router.post("/predict/batch")
+def predict_flow_batch(inputs: List[FlowInput], compact: bool = False):
+    """Score a list of FlowInput payloads in one pass; results keep the order of the input."""
+    if len(inputs) > config.PREDICT_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {config.PREDICT_BATCH_MAX_ROWS} rows)")
+    for item in inputs:
+        _check_image_size(item.image_base64)
+    try:
+        rows, images = [], {}
+        for i, item in enumerate(inputs):
+            features = item.dict(exclude_none=True)
+            label = features.pop("label", None)
+            image_base64 = features.pop("image_base64", None)
+            if label is not None:
+                save_user_entry(features, label)
+            if image_base64:
+                images[i] = image_base64
+            rows.append(features)
+
+        results = predict_flow_risk_batch(rows, compact=compact)
+        # Rows carrying an image go through the single-row path, which extracts the image descriptor
+        for i, image_base64 in images.items():
+            results[i] = predict_flow_risk(rows[i], image_base64=image_base64, compact=compact)
+
+        return {"count": len(results), "results": results}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {e}")
+
+@router.get("/advice/catalog")
+def advice_catalog(request: Request, response: Response):
+    """
+    Advice templates keyed by the codes returned in compact mode. A compact entry
+    is [code] or [code, value]; the value fills the one Python-format placeholder
+    in the first line of that code, whatever its name ("{v:.1f}" for biomarkers,
+    "{count}", "{confidence}"). The catalog only changes between releases, so
+    clients can cache it by its version (the ETag).
+    """
+    etag = f'"{advice.CATALOG_VERSION}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return {"version": advice.CATALOG_VERSION, "codes": advice.ADVICE_CATALOG}
+
+
+@router.get("/ml/metrics")
+def ml_metrics():
+    """Inference batching statistics (batch sizes and queue wait), executor load, cache hit rate,
+    per-stage prediction timings and cascade decision rates."""
+    return {
+        "batcher": ml_service.batcher.stats.snapshot(),
+        "executor": ml_service.inference_executor.snapshot(),
+        "cache": ml_service.prediction_cache.snapshot() if ml_service.prediction_cache is not None else None,
+        "stages": stage_timer.STATS.snapshot(),
+        "cascade": ml_service.cascade_stats(),
+        "retrain": ml_service.retrain_scheduler.status(),
+    }
+
+
+_retrain_lock = threading.Lock()
+_last_manual_retrain = None
+
+
+@router.post("/ml/retrain", status_code=202, dependencies=[Depends(require_admin_key)])
+def request_retrain(full: bool = False):
+    """Schedule a background retrain; coalesced with one already queued or running.
+    Pass full=true to refit from the whole flow_data table instead of growing the forest.
+    Needs the admin key, and accepts at most one request per RETRAIN_MANUAL_MIN_INTERVAL_S."""
+    global _last_manual_retrain
+    with _retrain_lock:
+        now = time.monotonic()
+        if _last_manual_retrain is not None:
+            wait = config.RETRAIN_MANUAL_MIN_INTERVAL_S - (now - _last_manual_retrain)
+            if wait > 0:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Retrain requested too recently",
+                    headers={"Retry-After": str(int(wait) + 1)},
+                )
+        _last_manual_retrain = now
+    scheduled = ml_service.retrain_scheduler.request("admin", full=full)
+    return {
+        "scheduled": scheduled,
+        "status": ml_service.retrain_scheduler.status(),
+    }
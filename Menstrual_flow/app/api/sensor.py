@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.api.ml import FlowInput
-from app.ml.ml_service import predict_flow_risk, save_user_entry, retrain_model_incremental
+from app.ml.ml_service import predict_flow_risk, save_user_entry
 
 router = APIRouter()
 
@@ -9,6 +9,6 @@ def sensor_feed(sensor_data: FlowInput):
     features = sensor_data.dict()
     image = features.pop("image_base64", None)
     result = predict_flow_risk(features, image_base64=image)
+    # Saving the row notifies the background retrain scheduler
     save_user_entry(features, label=result['prediction'])
-    retrain_model_incremental()
     return result
@@ -0,0 +1,117 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+########## SQLite storage ##########
+# Applied to every pooled connection by app/storage/engine.py
+READINGS_DB_PATH = os.getenv("READINGS_DB_PATH", "./swasthya_flow_new.db")
+FLOW_DATA_DB_PATH = os.getenv("FLOW_DATA_DB_PATH", "./swasthya_flow.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "16"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+# Empty journal mode / synchronous leave the SQLite defaults
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+########## ML inference micro-batching ##########
+INFERENCE_BATCHING_ENABLED = _env_bool("INFERENCE_BATCHING_ENABLED", True)
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "64"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "2"))
+
+########## Background model retraining ##########
+RETRAIN_ENABLED = _env_bool("RETRAIN_ENABLED", True)
+RETRAIN_MIN_NEW_ROWS = int(os.getenv("RETRAIN_MIN_NEW_ROWS", "50"))
+RETRAIN_MAX_INTERVAL_S = float(os.getenv("RETRAIN_MAX_INTERVAL_S", "3600"))
+RETRAIN_TREES_PER_UPDATE = int(os.getenv("RETRAIN_TREES_PER_UPDATE", "10"))
+# Incremental trees see only the new rows but vote like base trees: an update adds one
+# tree per this many new rows (up to RETRAIN_TREES_PER_UPDATE) and waits for more rows
+# below that, and once incremental trees would cast more than this share of the votes
+# the forest is refit from the whole table instead. Lower values limit how far a few
+# noisy labels can move predictions, at the cost of slower pickup of new data
+RETRAIN_MIN_ROWS_PER_TREE = int(os.getenv("RETRAIN_MIN_ROWS_PER_TREE", "50"))
+RETRAIN_MAX_INCREMENTAL_SHARE = float(os.getenv("RETRAIN_MAX_INCREMENTAL_SHARE", "0.2"))
+RETRAIN_CONSOLIDATE_EVERY = int(os.getenv("RETRAIN_CONSOLIDATE_EVERY", "20"))
+RETRAIN_CHUNK_ROWS = int(os.getenv("RETRAIN_CHUNK_ROWS", "5000"))
+# POST /ml/retrain needs this key in the X-Admin-Key header; unset disables the endpoint
+RETRAIN_ADMIN_KEY = os.getenv("RETRAIN_ADMIN_KEY", "")
+# Minimum time between accepted manual retrain requests
+RETRAIN_MANUAL_MIN_INTERVAL_S = float(os.getenv("RETRAIN_MANUAL_MIN_INTERVAL_S", "60"))
+
+########## Batch scoring ##########
+PREDICT_BATCH_MAX_ROWS = int(os.getenv("PREDICT_BATCH_MAX_ROWS", "1000"))
+
+########## Batch reading ingestion ##########
+INGEST_BATCH_MAX_ROWS = int(os.getenv("INGEST_BATCH_MAX_ROWS", "10000"))
+
+########## Write-behind ingest buffer ##########
+# /flow/single and /data/gas-sensor/add-reading acknowledge readings with a sequence
+# number and write them in group commits instead of one transaction each. The buffer
+# and its sequence numbers live in one process: enable it only with a single server
+# worker (uvicorn --workers 1), or the seq from one worker is compared against
+# /flow/ingest/status from another
+INGEST_BUFFER_ENABLED = _env_bool("INGEST_BUFFER_ENABLED", False)
+# Readings held in memory before new ones are rejected with 429
+INGEST_BUFFER_MAX_ROWS = int(os.getenv("INGEST_BUFFER_MAX_ROWS", "10000"))
+INGEST_FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "500"))
+INGEST_FLUSH_INTERVAL_MS = float(os.getenv("INGEST_FLUSH_INTERVAL_MS", "5"))
+
+########## Flattened forest evaluator ##########
+FLAT_FOREST_ENABLED = _env_bool("FLAT_FOREST_ENABLED", True)
+FLAT_FOREST_MAX_ROWS = int(os.getenv("FLAT_FOREST_MAX_ROWS", "128"))
+
+########## Model artifacts ##########
+MODEL_PATH = os.getenv("MODEL_PATH", "app/ml/model.joblib")
+FLAT_MODEL_PATH = os.getenv("FLAT_MODEL_PATH", "app/ml/model_flat.joblib")
+# joblib mmap_mode for loading model arrays; empty disables memory-mapping
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE", "r")
+MODEL_WARMUP_ON_STARTUP = _env_bool("MODEL_WARMUP_ON_STARTUP", True)
+
+########## Inference executor ##########
+# "process", "thread" or "none" (score on the event loop, through the micro-batcher)
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "process")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "64"))
+# Startup waits this long for executor workers to spawn and load the model
+INFERENCE_START_TIMEOUT_S = float(os.getenv("INFERENCE_START_TIMEOUT_S", "60"))
+
+########## Prediction result cache ##########
+PREDICTION_CACHE_ENABLED = _env_bool("PREDICTION_CACHE_ENABLED", True)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_TTL_S = float(os.getenv("PREDICTION_CACHE_TTL_S", "600"))
+# Lab values are rounded to this many decimals to build the cache key only; scoring uses the
+# values as sent, so panels that round alike share the first one's cached result
+PREDICTION_CACHE_DECIMALS = int(os.getenv("PREDICTION_CACHE_DECIMALS", "3"))
+
+########## Image features ##########
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))
+IMAGE_DESCRIPTOR_CACHE_SIZE = int(os.getenv("IMAGE_DESCRIPTOR_CACHE_SIZE", "1024"))
+IMAGE_DESCRIPTOR_CACHE_TTL_S = float(os.getenv("IMAGE_DESCRIPTOR_CACHE_TTL_S", "3600"))
+
+########## Prediction stage timing ##########
+STAGE_TIMING_ENABLED = _env_bool("STAGE_TIMING_ENABLED", True)
+# Adds a Server-Timing header with per-stage durations to prediction responses
+SERVER_TIMING_HEADER = _env_bool("SERVER_TIMING_HEADER", False)
+
+########## Cascade inference ##########
+# Single-row predictions first vote with a few trees plus the condition rules and
+# only go to the full forest when that is not confident
+CASCADE_ENABLED = _env_bool("CASCADE_ENABLED", False)
+CASCADE_STAGE1_TREES = int(os.getenv("CASCADE_STAGE1_TREES", "16"))
+# First-stage probability needed to settle a row as Normal (with no rule hits) or as a condition (with rule hits)
+CASCADE_NORMAL_CUTOFF = float(os.getenv("CASCADE_NORMAL_CUTOFF", "0.7"))
+CASCADE_ABNORMAL_CUTOFF = float(os.getenv("CASCADE_ABNORMAL_CUTOFF", "0.85"))
+# Fraction of settled rows also scored by the full forest to measure agreement
+CASCADE_AUDIT_RATE = float(os.getenv("CASCADE_AUDIT_RATE", "0.05"))
@@ -1,12 +1,9 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./swasthya_flow_new.db"
-
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The engine is configured (pool, pragmas) in app.storage.engine
+from app.storage.engine import ReadingsSession as SessionLocal, readings_engine as engine
+from app.storage.engine import async_readings_session
 
 Base = declarative_base()
 
@@ -17,3 +14,9 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator:
+    """AsyncSession dependency for handlers that run on the event loop."""
+    async with async_readings_session() as db:
+        yield db
@@ -1,10 +1,16 @@
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from app.api import auth, data
 from app.api import feedback
 from app.database import SessionLocal
 from app.storage.model import Feedback
 from app.api import ml
+from app.ml import ml_service
+from app.services import data_service
+from app.storage.engine import dispose_async_engines
+from app import config
 
 
 app = FastAPI(
@@ -38,6 +44,23 @@ async def root():
 @app.on_event("startup")
 async def startup_event():
     print("FemPlus API started successfully!")
+    # Model loading and worker spawning block, so they run off the event loop
+    if config.MODEL_WARMUP_ON_STARTUP:
+        try:
+            await run_in_threadpool(ml_service.model_handle.warmup)
+        except Exception as e:
+            print("Model warmup failed:", e)
+    try:
+        await run_in_threadpool(ml_service.inference_executor.start, config.INFERENCE_START_TIMEOUT_S)
+    except Exception as e:
+        print("Inference executor start failed:", e)
+    if config.RETRAIN_ENABLED:
+        ml_service.retrain_scheduler.start()
+    if config.INGEST_BUFFER_ENABLED:
+        # uvicorn and gunicorn take their default worker count from WEB_CONCURRENCY
+        if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            print("Ingest buffer sequence numbers are per worker process; run a single worker with INGEST_BUFFER_ENABLED")
+        data_service.ingest_buffer.start()
     # Seed a few feedback rows if table is empty
     try:
         db = SessionLocal()
@@ -59,3 +82,12 @@ async def startup_event():
         except Exception:
             pass
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush buffered readings before anything else goes away. Each stop joins a
+    # thread or pool, so they run off the event loop
+    await run_in_threadpool(data_service.ingest_buffer.stop)
+    await run_in_threadpool(ml_service.inference_executor.shutdown)
+    await run_in_threadpool(ml_service.batcher.stop)
+    await run_in_threadpool(ml_service.retrain_scheduler.stop)
+    await dispose_async_engines()
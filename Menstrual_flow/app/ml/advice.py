@@ -0,0 +1,211 @@
+"""
+Precompiled advice text.
+
+Every advice line the API can return has a stable code in ADVICE_CATALOG. The
+templates are compiled once at import, per (condition, risk level) and per
+biomarker band, so building advice only formats the numeric values. Clients can
+ask for the compact form (codes plus values) and render it with the catalog
+from GET /advice/catalog, which only changes when this file does.
+"""
+import hashlib
+import json
+import re
+import string
+
+from app.ml.rules import BANDS, BIOMARKER_BANDS, CONDITION_RULES, RISK_LEVELS
+
+# Tips shown under each detected condition; conditions without an entry only get the header line
+CONDITION_TIPS = {
+    "Anemia Risk": [
+        "• Eat iron-rich foods: spinach, beetroot, lentils, red meat",
+        "• Consider iron supplements (ask doctor first)",
+        "• Get a blood test to confirm",
+    ],
+    "PCOS Risk": [
+        "• Track your menstrual cycles",
+        "• Maintain healthy weight",
+        "• See a gynecologist for testing",
+    ],
+    "Thyroid Imbalance": [
+        "• Get thyroid blood tests (T3, T4, TSH)",
+        "• See an endocrinologist",
+        "• Eat a balanced diet",
+    ],
+    "Diabetes Risk": [
+        "• Eat less sugar, more fiber",
+        "• Exercise regularly",
+        "• Get blood sugar tests",
+        "• See a diabetes specialist",
+    ],
+    "Infection Suspected": [
+        "• See a doctor immediately",
+        "• Take prescribed antibiotics",
+        "• Stay clean and hydrated",
+    ],
+    "Menorrhagia": [
+        "• Track how many pads you use",
+        "• See a gynecologist",
+        "• Consider iron supplements",
+    ],
+    "Endometriosis Risk": [
+        "• See a gynecologist for exam",
+        "• Track your pain patterns",
+        "• Consider anti-inflammatory diet",
+    ],
+    "PID Risk": [
+        "• See a doctor immediately",
+        "• Take all prescribed antibiotics",
+        "• Avoid sex until treated",
+    ],
+}
+
+RISK_SUMMARY = {
+    "Critical": ("risk.critical", "\n🚨 CRITICAL RISK: Multiple serious conditions detected. Seek immediate medical attention."),
+    "High": ("risk.high", "\n⚠️ HIGH RISK: Serious conditions detected. Consult a doctor within 24-48 hours."),
+    "Moderate": ("risk.moderate", "\n⚡ MODERATE RISK: Conditions require monitoring. Schedule a doctor visit within a week."),
+}
+RISK_SUMMARY_OTHER = ("risk.low", "\n📊 LOW RISK: Some conditions detected. Monitor closely and consider preventive care.")
+
+
+def slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def condition_code(name: str, risk_level: str) -> str:
+    return f"condition.{slug(name)}.{risk_level.lower()}"
+
+
+def _catalog() -> dict:
+    """code -> list of template lines ("{field}" / "{field:spec}" placeholders, Python format syntax)."""
+    catalog = {}
+    for biomarker, rules, default in BIOMARKER_BANDS:
+        for k, (_, _, template) in enumerate(rules):
+            catalog[BANDS.code(biomarker, k)] = [template]
+        catalog[BANDS.code(biomarker, None)] = [default]
+
+    for code, line in list(RISK_SUMMARY.values()) + [RISK_SUMMARY_OTHER]:
+        catalog[code] = [line]
+    catalog["risk.none"] = ["\n✅ NO RISK DETECTED: You are good to go! Your biomarkers appear normal."]
+
+    catalog["conditions.header"] = ["\n🔍 Detected Conditions ({count}):"]
+    for name in list(CONDITION_RULES) + [n for n in CONDITION_TIPS if n not in CONDITION_RULES]:
+        for level in RISK_LEVELS:
+            # Condition name and risk level are baked in; only the confidence is interpolated
+            header = f"\n📋 {name} ({level} Risk - " + "{confidence}% confidence):"
+            catalog[condition_code(name, level)] = [header] + CONDITION_TIPS.get(name, [])
+    catalog["conditions.none"] = ["\n✅ No specific conditions detected. Your biomarkers appear to be within normal ranges."]
+
+    catalog["tips.detected"] = [
+        "\n💡 General Tips:",
+        "• See your doctor regularly",
+        "• Follow treatment plans",
+        "• Don't ignore symptoms",
+    ]
+    catalog["tips.healthy"] = [
+        "\n💡 Stay Healthy:",
+        "• Regular check-ups",
+        "• Eat well and exercise",
+        "• Track your cycle",
+    ]
+    return catalog
+
+
+def compile_template(template: str):
+    """(prefix, field, spec, suffix); field is None for a line with nothing to interpolate."""
+    chunks = list(string.Formatter().parse(template))
+    prefix, field, spec, _ = chunks[0]
+    if field is None:
+        return prefix, None, None, ""
+    if any(f is not None for _, f, _, _ in chunks[1:]):
+        raise ValueError(f"Advice templates take at most one value: {template!r}")
+    return prefix, field, spec, "".join(literal for literal, _, _, _ in chunks[1:])
+
+
+def format_template(compiled, value) -> str:
+    """Fill a compile_template result with `value` (ignored when the line takes no value)."""
+    prefix, field, spec, suffix = compiled
+    if field is None:
+        return prefix
+    return prefix + format(value, spec) + suffix
+
+
+ADVICE_CATALOG = _catalog()
+CATALOG_VERSION = hashlib.sha1(
+    json.dumps(ADVICE_CATALOG, sort_keys=True, ensure_ascii=False).encode()
+).hexdigest()[:12]
+
+# code -> (header line compiled, remaining lines); only a code's first line takes values
+_COMPILED = {}
+for _code, _lines in ADVICE_CATALOG.items():
+    _compiled = [compile_template(t) for t in _lines]
+    if any(c[1] is not None for c in _compiled[1:]):
+        raise ValueError(f"Only the first line of advice code {_code!r} may take a value")
+    _COMPILED[_code] = (_compiled[0], tuple(_lines[1:]))
+_CONDITION_CODES = {
+    (name, level): condition_code(name, level)
+    for name in list(CONDITION_RULES) + list(CONDITION_TIPS)
+    for level in RISK_LEVELS
+}
+_RISK_LINES = {risk: ADVICE_CATALOG[code][0] for risk, (code, _) in RISK_SUMMARY.items()}
+_RISK_LINES[None] = ADVICE_CATALOG[RISK_SUMMARY_OTHER[0]][0]
+_COUNT_PREFIX, _, _, _COUNT_SUFFIX = _COMPILED["conditions.header"][0]
+_NO_CONDITIONS_LINES = tuple(
+    ADVICE_CATALOG["risk.none"] + ADVICE_CATALOG["conditions.none"] + ADVICE_CATALOG["tips.healthy"]
+)
+_DETECTED_TIPS_LINES = tuple(ADVICE_CATALOG["tips.detected"])
+
+
+def summary_codes(detected_conditions: list, overall_risk: str) -> list:
+    """
+    Advice codes that follow the biomarker lines, as (code, values or None) pairs,
+    in the order generate_comprehensive_advice prints them.
+    """
+    if not detected_conditions:
+        return [("risk.none", None), ("conditions.none", None), ("tips.healthy", None)]
+    codes = [
+        (RISK_SUMMARY.get(overall_risk, RISK_SUMMARY_OTHER)[0], None),
+        ("conditions.header", {"count": len(detected_conditions)}),
+    ]
+    for condition in detected_conditions:
+        codes.append((
+            _CONDITION_CODES[condition["condition"], condition["risk_level"]],
+            {"confidence": int(condition["confidence"] * 100)},
+        ))
+    codes.append(("tips.detected", None))
+    return codes
+
+
+def render_summary(detected_conditions: list, overall_risk: str) -> list:
+    """Same lines as render(summary_codes(...)), without building the intermediate codes."""
+    if not detected_conditions:
+        return list(_NO_CONDITIONS_LINES)
+    lines = [
+        _RISK_LINES.get(overall_risk, _RISK_LINES[None]),
+        _COUNT_PREFIX + str(len(detected_conditions)) + _COUNT_SUFFIX,
+    ]
+    for condition in detected_conditions:
+        (prefix, _, _, suffix), tips = _COMPILED[_CONDITION_CODES[condition["condition"], condition["risk_level"]]]
+        lines.append(prefix + str(int(condition["confidence"] * 100)) + suffix)
+        lines.extend(tips)
+    lines.extend(_DETECTED_TIPS_LINES)
+    return lines
+
+
+def render(codes) -> list:
+    """Expand (code, values) pairs into advice lines."""
+    lines = []
+    for code, values in codes:
+        compiled, rest = _COMPILED[code]
+        field = compiled[1]
+        lines.append(format_template(compiled, None if field is None else values[field]))
+        if rest:
+            lines.extend(rest)
+    return lines
+
+
+def compact(codes) -> list:
+    """
+    JSON form of (code, values) pairs for the compact response mode: [code] or
+    [code, value], since a code's template takes at most one value.
+    """
+    return [[code, *values.values()] if values else [code] for code, values in codes]
@@ -0,0 +1,183 @@
+"""
+Offline risk scoring of every flow reading.
+
+    python -m app.ml.batch_score [--chunk-size 2000] [--workers 2] [--model-version V]
+
+flow_readings is read in id order, one chunk at a time (keyset pagination, so
+memory stays flat however large the table is). Chunks are scored with the
+vectorized batch path on a process pool and written to flow_predictions, keyed
+by (reading_id, model_version), in one transaction per chunk. Chunks are
+committed in id order, so the highest reading_id stored for a model version is
+the resume point: rerunning after an interruption continues from there.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from sqlalchemy import func, inspect, insert, select
+
+from app import config
+from app.database import engine
+from app.ml import ml_service
+from app.storage.model import FlowPrediction, FlowReading
+
+readings = FlowReading.__table__
+predictions = FlowPrediction.__table__
+
+
+def model_version(path: str = config.MODEL_PATH) -> str:
+    """Content hash of the model file, so the same model scores to the same version everywhere."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def _to_features(columns, row) -> dict:
+    features = {}
+    for name, value in zip(columns, row):
+        if value is None:
+            continue
+        try:
+            features[name] = float(value)
+        except (TypeError, ValueError):
+            # Free-text columns (e.g. discharge descriptions) are treated as not measured
+            continue
+    return features
+
+
+def _read_chunks(db_engine, columns, after_id: int, chunk_size: int):
+    query = (
+        select(readings.c.id, *[readings.c[name] for name in columns])
+        .order_by(readings.c.id)
+        .limit(chunk_size)
+    )
+    last_id = after_id
+    while True:
+        with db_engine.connect() as conn:
+            rows = conn.execute(query.where(readings.c.id > last_id)).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [r[0] for r in rows], [_to_features(columns, r[1:]) for r in rows]
+
+
+def _score_chunk(version: str, ids: list, rows: list) -> list:
+    """Score one chunk (in a worker process) and return rows ready for flow_predictions."""
+    labels, probs, prob_dicts, detected = ml_service.score_rows(rows)
+    scored_at = datetime.utcnow()
+    out = []
+    for reading_id, row, prob_dict, conditions in zip(ids, probs, prob_dicts, detected):
+        best = int(row.argmax())
+        out.append({
+            "reading_id": reading_id,
+            "model_version": version,
+            "prediction": str(labels[best]),
+            "risk_indicator": ml_service.assess_overall_risk(conditions, prob_dict),
+            "confidence": float(row[best]),
+            "probabilities": json.dumps(prob_dict),
+            "detected_conditions": json.dumps(
+                [[c["condition"], c["risk_level"], round(c["confidence"], 4)] for c in conditions]
+            ),
+            "scored_at": scored_at,
+        })
+    return out
+
+
+def _write(db_engine, rows: list) -> int:
+    if rows:
+        with db_engine.begin() as conn:
+            conn.execute(insert(predictions).prefix_with("OR REPLACE"), rows)
+    return len(rows)
+
+
+def resume_point(db_engine, version: str) -> int:
+    with db_engine.connect() as conn:
+        last = conn.execute(
+            select(func.max(predictions.c.reading_id)).where(predictions.c.model_version == version)
+        ).scalar()
+    return last or 0
+
+
+def run(chunk_size: int = 2000, workers: int = 2, version: str = None, db_engine=engine, verbose: bool = True) -> dict:
+    """Score all readings after the resume point. Returns a summary with rows and rows/sec."""
+    version = version or model_version()
+    predictions.create(bind=db_engine, checkfirst=True)
+    existing = {c["name"] for c in inspect(db_engine).get_columns("flow_readings")}
+    columns = [name for name in ml_service.EXPECTED_FEATURES if name in existing]
+    start_after = resume_point(db_engine, version)
+    if verbose:
+        print(f"Scoring flow_readings with model {version}, resuming after id {start_after}")
+
+    pool = None
+    if workers > 0:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=ml_service._init_worker,
+        )
+    # Bounded in-flight chunks keep memory flat while the pool stays busy
+    max_in_flight = max(1, workers) * 2
+    pending = deque()
+    scored = 0
+    started = time.perf_counter()
+
+    def drain(keep: int):
+        nonlocal scored
+        while len(pending) > keep or (pending and pending[0].done()):
+            scored += _write(db_engine, pending.popleft().result())
+            if verbose:
+                elapsed = time.perf_counter() - started
+                print(f"  {scored} rows, {scored / elapsed:.0f} rows/s")
+
+    try:
+        for ids, rows in _read_chunks(db_engine, columns, start_after, chunk_size):
+            if pool is not None:
+                future = pool.submit(_score_chunk, version, ids, rows)
+            else:
+                future = Future()
+                future.set_result(_score_chunk(version, ids, rows))
+            pending.append(future)
+            drain(max_in_flight - 1)
+        drain(0)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "model_version": version,
+        "resumed_after_id": start_after,
+        "rows": scored,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(scored / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    if verbose:
+        print(f"Scored {scored} readings in {elapsed:.2f}s ({summary['rows_per_s']} rows/s)")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch risk scoring of flow_readings into flow_predictions")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="scoring processes; 0 scores in this process")
+    parser.add_argument("--model-version", default=None,
+                        help="version key to store results under (default: hash of the model file)")
+    args = parser.parse_args(argv)
+    run(chunk_size=args.chunk_size, workers=args.workers, version=args.model_version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Flattened RandomForestClassifier evaluator.
+
+All trees of a fitted forest are packed into contiguous node arrays (feature,
+threshold, children, leaf probabilities). Prediction walks every tree for every
+row at once with NumPy indexing, skipping sklearn's per-call validation and
+per-tree dispatch, which dominate the cost for one row or a small batch.
+
+The flat arrays are stored uncompressed with joblib, so they can be loaded with
+`mmap_mode="r"` and shared between worker processes. Export a saved model with:
+
+    python -m app.ml.flat_forest app/ml/model.joblib app/ml/model_flat.joblib
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+
+class FlatForest:
+    """Drop-in replacement for `predict_proba` / `predict` of a fitted forest classifier."""
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, max_depth, classes, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+        # Identifies the sklearn model file this was flattened from
+        self.source_fingerprint = None
+
+    @classmethod
+    def from_estimator(cls, forest) -> "FlatForest":
+        trees = [est.tree_ for est in forest.estimators_]
+        if any(t.n_outputs != 1 for t in trees):
+            raise ValueError("Only single-output forests can be flattened")
+
+        sizes = [t.node_count for t in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+        n_nodes = int(sum(sizes))
+        n_classes = len(forest.classes_)
+
+        feature = np.zeros(n_nodes, dtype=np.intp)
+        threshold = np.full(n_nodes, np.inf)
+        left = np.arange(n_nodes, dtype=np.intp)
+        right = np.arange(n_nodes, dtype=np.intp)
+        missing_left = np.zeros(n_nodes, dtype=bool)
+        value = np.zeros((n_nodes, n_classes))
+
+        for tree, off in zip(trees, offsets):
+            sl = slice(off, off + tree.node_count)
+            internal = tree.children_left != -1
+            idx = np.flatnonzero(internal)
+            # Leaves keep threshold=inf and point to themselves, so extra steps are no-ops
+            feature[sl][idx] = tree.feature[idx]
+            threshold[sl][idx] = tree.threshold[idx]
+            left[sl][idx] = tree.children_left[idx] + off
+            right[sl][idx] = tree.children_right[idx] + off
+            if hasattr(tree, "missing_go_to_left"):
+                missing_left[sl] = np.asarray(tree.missing_go_to_left, dtype=bool)
+            leaf_value = tree.value[:, 0, :]
+            totals = leaf_value.sum(axis=1, keepdims=True)
+            value[sl] = np.divide(leaf_value, totals, out=np.zeros_like(leaf_value), where=totals > 0)
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            left=left,
+            right=right,
+            missing_left=missing_left,
+            value=value,
+            roots=offsets,
+            max_depth=max(t.max_depth for t in trees),
+            classes=np.asarray(forest.classes_),
+            n_features=forest.n_features_in_,
+        )
+
+    def save(self, path: str):
+        """Write atomically; arrays are stored uncompressed so `load` can memory-map them."""
+        import joblib
+
+        # A temp file of our own, so concurrent writers never truncate each other's
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path) + ".", suffix=".tmp"
+        )
+        os.close(fd)
+        try:
+            joblib.dump(self, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = None) -> "FlatForest":
+        import joblib
+
+        flat = joblib.load(path, mmap_mode=mmap_mode)
+        if not isinstance(flat, cls):
+            raise TypeError(f"{path} does not contain a FlatForest")
+        return flat
+
+    def apply(self, X: np.ndarray, n_trees: int = None) -> np.ndarray:
+        """Leaf node index (into the flat arrays) for every (row, tree), over the first `n_trees` trees."""
+        # sklearn evaluates trees on float32 inputs; do the same so splits agree
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but FlatForest is expecting {self.n_features_in_} features as input"
+            )
+        has_nan = np.isnan(X).any()
+        roots = self.roots[:n_trees]
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(roots, (X.shape[0], len(roots)))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_left[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X: np.ndarray, n_trees: int = None) -> np.ndarray:
+        """Mean leaf probabilities; `n_trees` limits the vote to the first trees (a cheaper, noisier estimate)."""
+        return self.value[self.apply(X, n_trees)].mean(axis=1)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def _prefix_nodes(self, n_trees: int):
+        """Node arrays of the first `n_trees` trees as Python lists (leaves get feature -1), built once."""
+        cached = getattr(self, "_prefix", None)
+        if cached is None or cached[0] != n_trees:
+            end = int(self.roots[n_trees]) if n_trees < len(self.roots) else len(self.threshold)
+            leaf = np.asarray(self.left[:end]) == np.arange(end)
+            cached = (
+                n_trees,
+                [int(r) for r in self.roots[:n_trees]],
+                np.where(leaf, -1, self.feature[:end]).tolist(),
+                np.asarray(self.threshold[:end]).tolist(),
+                np.asarray(self.left[:end]).tolist(),
+                np.asarray(self.right[:end]).tolist(),
+                np.asarray(self.missing_left[:end]).tolist(),
+            )
+            self._prefix = cached
+        return cached
+
+    def predict_proba_row(self, x: np.ndarray, n_trees: int) -> np.ndarray:
+        """
+        predict_proba of one row over the first `n_trees` trees, walked in plain
+        Python. The vectorized walk costs the same per depth level whatever the
+        number of trees, so for one row and a few trees this is much cheaper.
+        """
+        _, roots, feature, threshold, left, right, missing_left = self._prefix_nodes(n_trees)
+        x = np.asarray(x, dtype=np.float32).tolist()
+        leaves = []
+        for node in roots:
+            f = feature[node]
+            while f >= 0:
+                v = x[f]
+                if v <= threshold[node] or (v != v and missing_left[node]):
+                    node = left[node]
+                else:
+                    node = right[node]
+                f = feature[node]
+            leaves.append(node)
+        return self.value[leaves].mean(axis=0)
+
+
+class ForestPredictor:
+    """
+    Routes predict_proba to the flattened evaluator for small batches and to
+    the sklearn forest for large ones, where sklearn's per-tree loop wins.
+    """
+
+    def __init__(self, get_forest, flat: FlatForest = None, max_flat_rows: int = 128):
+        # get_forest is called only when sklearn is needed, so the estimator can load lazily
+        self._get_forest = get_forest
+        self.flat = flat
+        self.max_flat_rows = max_flat_rows
+
+    @property
+    def classes_(self):
+        if self.flat is not None:
+            return self.flat.classes_
+        return self._get_forest().classes_
+
+    @property
+    def n_features_in_(self):
+        if self.flat is not None:
+            return self.flat.n_features_in_
+        return getattr(self._get_forest(), "n_features_in_", None)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if self.flat is not None and len(X) <= self.max_flat_rows:
+            return self.flat.predict_proba(X)
+        return self._get_forest().predict_proba(X)
+
+    def predict_proba_prefix(self, X: np.ndarray, n_trees: int) -> np.ndarray:
+        """Probabilities from the first `n_trees` trees only."""
+        if self.flat is not None:
+            if len(X) == 1:
+                return self.flat.predict_proba_row(X[0], n_trees)[None, :]
+            return self.flat.predict_proba(X, n_trees)
+        trees = self._get_forest().estimators_[:n_trees]
+        return np.mean([tree.predict_proba(X) for tree in trees], axis=0)
+
+
+def export_flat_forest(model_path: str, out_path: str) -> FlatForest:
+    import joblib
+
+    flat = FlatForest.from_estimator(joblib.load(model_path))
+    st = os.stat(model_path)
+    flat.source_fingerprint = f"{st.st_size}:{st.st_mtime_ns}"
+    flat.save(out_path)
+    return flat
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "app/ml/model.joblib"
+    dst = sys.argv[2] if len(sys.argv) > 2 else "app/ml/model_flat.joblib"
+    flat = export_flat_forest(src, dst)
+    print(f"Flattened {len(flat.roots)} trees ({len(flat.threshold)} nodes) to {dst}")
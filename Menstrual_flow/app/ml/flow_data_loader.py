@@ -0,0 +1,76 @@
+"""
+flow_data -> NumPy, without pandas.
+
+Rows are streamed with fetchmany straight into a preallocated float32 feature
+matrix and an int32 label-code vector, so peak memory stays close to the size
+of the final arrays. The buffers are sized from a COUNT(*) of the rows to read
+and grow geometrically if more rows arrive while reading.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def _grow(array: np.ndarray, min_rows: int) -> np.ndarray:
+    capacity = max(min_rows, 2 * len(array), 1)
+    grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def load_flow_data(
+    conn,
+    features: Sequence[str],
+    after_rowid: int = 0,
+    chunk_rows: int = 5000,
+    table: str = "flow_data",
+) -> Tuple[np.ndarray, np.ndarray, List[str], int]:
+    """
+    Read rows with rowid > after_rowid in rowid order.
+
+    Returns (X, codes, classes, max_rowid): X is float32 (NULL and non-numeric
+    values become NaN), classes[codes[i]] is row i's label. Rows without a
+    label cannot be trained on and are skipped, but still advance max_rowid.
+    """
+    expected = conn.execute(
+        f"SELECT COUNT(*) FROM {table} WHERE rowid > ? AND label IS NOT NULL", (after_rowid,)
+    ).fetchone()[0]
+    X = np.empty((expected, len(features)), dtype=np.float32)
+    codes = np.empty(expected, dtype=np.int32)
+    classes: List[str] = []
+    class_index = {}
+
+    # REAL columns store numeric text as numbers, so anything else left as text
+    # (e.g. a discharge description) is not a measurement: read it as NULL -> NaN
+    columns = ",".join(f"CASE WHEN typeof({f}) IN ('real', 'integer') THEN {f} END" for f in features)
+    cur = conn.execute(
+        f"SELECT rowid, {columns}, label FROM {table} WHERE rowid > ? ORDER BY rowid",
+        (after_rowid,),
+    )
+    n, max_rowid = 0, after_rowid
+    while True:
+        rows = cur.fetchmany(chunk_rows)
+        if not rows:
+            break
+        max_rowid = rows[-1][0]
+        rows = [r for r in rows if r[-1] is not None]
+        if not rows:
+            continue
+        end = n + len(rows)
+        if end > len(X):
+            X = _grow(X, end)
+            codes = _grow(codes, end)
+
+        # None becomes NaN
+        X[n:end] = np.array([r[1:-1] for r in rows], dtype=np.float32)
+
+        for i, row in enumerate(rows, start=n):
+            label = row[-1]
+            code = class_index.get(label)
+            if code is None:
+                code = class_index[label] = len(classes)
+                classes.append(label)
+            codes[i] = code
+        n = end
+
+    return X[:n], codes[:n], classes, max_rowid
@@ -0,0 +1,31 @@
+"""
+The flow_data training table: the model's feature columns and their DDL.
+
+Kept free of heavy imports so scripts that only need the column layout
+(synthetic data generation) do not pull in ml_service.
+"""
+
+EXPECTED_FEATURES = [
+    "flow_ml", "hb", "ph", "crp", "hba1c_ratio",
+    "clots_score", "fsh_level", "lh_level",
+    "amh_level", "tsh_level", "prolactin_level",
+    # Additional parameters for comprehensive diagnosis
+    "esr", "leukocyte_count", "vaginal_ph", "ca125", "estrogen",
+    "progesterone", "androgens", "blood_glucose", "wbc_count",
+    # Disease-specific symptoms
+    "pain_score", "weight_gain", "acne_severity", "insulin_resistance",
+    "fever", "tenderness", "pain_during_intercourse", "bloating",
+    "weight_loss", "appetite_loss", "vaginal_discharge", "discharge_odor", "discharge_color"
+]
+
+_flow_data_ready = False
+
+def ensure_flow_data_table(conn):
+    """Create flow_data (every feature as REAL, plus label) on first use instead of at import time."""
+    global _flow_data_ready
+    if _flow_data_ready:
+        return
+    columns = ", ".join(f"{name} REAL" for name in EXPECTED_FEATURES)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS flow_data ({columns}, label TEXT)")
+    conn.commit()
+    _flow_data_ready = True
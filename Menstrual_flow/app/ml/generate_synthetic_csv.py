@@ -1,44 +1,10 @@
-import pandas as pd
-import numpy as np
+import sys
+from pathlib import Path
 
-EXPECTED_FEATURES = [
-    "flow_ml", "hb", "ph", "crp", "hba1c_ratio",
-    "clots_score", "fsh_level", "lh_level",
-    "amh_level", "tsh_level", "prolactin_level"
-]
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 
-LABELS = [
-    "Normal",
-    "Anemia Risk",
-    "Diabetes Risk",
-    "Infection Suspected",
-    "Menorrhagia",
-    "PCOS Risk",
-    "Thyroid Imbalance"
-]
+from app.ml.synthetic_data import write_csv
 
-rows = []
-for _ in range(1000):
-    row = {f: np.random.uniform(0, 15) for f in EXPECTED_FEATURES}
-
-    if row["hb"] < 10:
-        label = "Anemia Risk"
-    elif row["hba1c_ratio"] > 6.5:
-        label = "Diabetes Risk"
-    elif row["crp"] > 5:
-        label = "Infection Suspected"
-    elif row["flow_ml"] > 80 or row["clots_score"] > 5:
-        label = "Menorrhagia"
-    elif row["fsh_level"] > 10 and row["lh_level"] > 10 and row["amh_level"] > 5:
-        label = "PCOS Risk"
-    elif row["tsh_level"] > 4.5:
-        label = "Thyroid Imbalance"
-    else:
-        label = "Normal"
-
-    row["label"] = label
-    rows.append(row)
-
-df = pd.DataFrame(rows)
-df.to_csv("app/ml/synthetic_flow_data.csv", index=False)
+# Thin wrapper kept for existing workflows; see app/ml/synthetic_data.py for options
+write_csv("app/ml/synthetic_flow_data.csv", rows=1000)
 print("Synthetic dataset with 1000 rows created: app/ml/synthetic_flow_data.csv")
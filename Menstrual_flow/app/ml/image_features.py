@@ -0,0 +1,117 @@
+"""
+Compact image descriptor shared by prediction and training.
+
+Instead of raw pixels, an image is summarised by HSV colour histograms plus
+per-channel mean and standard deviation (DESCRIPTOR_SIZE floats). Images are
+decoded at reduced size (JPEG draft mode, then thumbnail), and byte and pixel
+limits are checked before any pixel data is decoded. Descriptors are cached by
+a hash of the image bytes.
+"""
+import base64
+import binascii
+import hashlib
+from io import BytesIO
+
+import numpy as np
+
+from app import config
+from app.ml.prediction_cache import PredictionCache
+
+HIST_BINS = 8
+THUMBNAIL_SIZE = (64, 64)
+
+DESCRIPTOR_NAMES = (
+    [f"img_{ch}_hist_{i}" for ch in ("h", "s", "v") for i in range(HIST_BINS)]
+    + [f"img_{ch}_{stat}" for ch in ("h", "s", "v") for stat in ("mean", "std")]
+)
+DESCRIPTOR_SIZE = len(DESCRIPTOR_NAMES)
+
+_cache = PredictionCache(config.IMAGE_DESCRIPTOR_CACHE_SIZE, config.IMAGE_DESCRIPTOR_CACHE_TTL_S)
+
+
+class ImageTooLarge(ValueError):
+    """The image exceeds IMAGE_MAX_BYTES or IMAGE_MAX_PIXELS."""
+
+
+def max_base64_length() -> int:
+    """Longest base64 string that can decode to at most IMAGE_MAX_BYTES."""
+    return 4 * ((config.IMAGE_MAX_BYTES + 2) // 3)
+
+
+def decode_base64(image_base64: str) -> bytes:
+    if len(image_base64) > max_base64_length():
+        raise ImageTooLarge(f"Image larger than {config.IMAGE_MAX_BYTES} bytes")
+    try:
+        return base64.b64decode(image_base64)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 image: {e}")
+
+
+def extract_descriptor(data: bytes) -> np.ndarray:
+    """Descriptor for encoded image bytes (any format PIL reads). Results are cached by content hash."""
+    if len(data) > config.IMAGE_MAX_BYTES:
+        raise ImageTooLarge(f"Image larger than {config.IMAGE_MAX_BYTES} bytes")
+    return _cached_descriptor(hashlib.sha256(data).digest(), lambda: BytesIO(data))
+
+
+def extract_descriptor_file(fp, chunk_size: int = 64 * 1024) -> np.ndarray:
+    """
+    Same as `extract_descriptor` for a seekable binary file (e.g. a spooled upload).
+    The file is hashed in chunks and handed to PIL directly, without reading it into one bytes object.
+    """
+    h = hashlib.sha256()
+    size = 0
+    fp.seek(0)
+    for chunk in iter(lambda: fp.read(chunk_size), b""):
+        size += len(chunk)
+        if size > config.IMAGE_MAX_BYTES:
+            raise ImageTooLarge(f"Image larger than {config.IMAGE_MAX_BYTES} bytes")
+        h.update(chunk)
+
+    def rewind():
+        fp.seek(0)
+        return fp
+
+    return _cached_descriptor(h.digest(), rewind)
+
+
+def descriptor_from_base64(image_base64: str) -> np.ndarray:
+    return extract_descriptor(decode_base64(image_base64))
+
+
+def cache_stats() -> dict:
+    return _cache.snapshot()
+
+
+def _cached_descriptor(key: bytes, open_fp) -> np.ndarray:
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    descriptor = _compute_descriptor(open_fp())
+    descriptor.setflags(write=False)
+    _cache.put(key, descriptor)
+    return descriptor
+
+
+def _compute_descriptor(fp) -> np.ndarray:
+    from PIL import Image
+
+    # open() only parses the header, so the pixel limit is checked before decoding
+    img = Image.open(fp)
+    width, height = img.size
+    if width * height > config.IMAGE_MAX_PIXELS:
+        raise ImageTooLarge(f"Image has {width}x{height} pixels (max {config.IMAGE_MAX_PIXELS})")
+
+    # JPEG: let the decoder downscale by up to 8x instead of decoding full resolution
+    img.draft("RGB", THUMBNAIL_SIZE)
+    img = img.convert("RGB")
+    img.thumbnail(THUMBNAIL_SIZE)
+    hsv = np.asarray(img.convert("HSV"), dtype=np.float32).reshape(-1, 3) / 255.0
+
+    parts = []
+    for ch in range(3):
+        hist, _ = np.histogram(hsv[:, ch], bins=HIST_BINS, range=(0.0, 1.0))
+        parts.append(hist / max(len(hsv), 1))
+    for ch in range(3):
+        parts.append([hsv[:, ch].mean(), hsv[:, ch].std()])
+    return np.concatenate(parts).astype(np.float32)
@@ -0,0 +1,249 @@
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_STOP = object()
+
+# Upper bounds of the queue-wait histogram buckets, in milliseconds
+WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class _Pending:
+    __slots__ = ("row", "future", "enqueued")
+
+    def __init__(self, row: np.ndarray):
+        self.row = row
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class BatchStats:
+    """Counters for batch sizes and the time requests spend queued."""
+
+    def __init__(self, max_batch_size: int):
+        self._lock = threading.Lock()
+        self._size_buckets = []
+        b = 1
+        while b < max_batch_size:
+            self._size_buckets.append(b)
+            b *= 2
+        self._size_buckets.append(max_batch_size)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.batches = 0
+            self.max_batch = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            self.size_hist = [0] * len(self._size_buckets)  # batches never exceed the last bucket
+            self.wait_hist = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record(self, batch_size: int, waits_ms: List[float]):
+        with self._lock:
+            self.batches += 1
+            self.requests += batch_size
+            self.max_batch = max(self.max_batch, batch_size)
+            self.size_hist[_bucket_index(self._size_buckets, batch_size)] += 1
+            for w in waits_ms:
+                self.wait_total_ms += w
+                self.wait_max_ms = max(self.wait_max_ms, w)
+                self.wait_hist[_bucket_index(WAIT_BUCKETS_MS, w)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch,
+                "batch_size_histogram": {
+                    f"<={b}": n for b, n in zip(self._size_buckets, self.size_hist)
+                },
+                "avg_queue_wait_ms": round(self.wait_total_ms / self.requests, 3) if self.requests else 0.0,
+                "max_queue_wait_ms": round(self.wait_max_ms, 3),
+                "queue_wait_histogram_ms": {
+                    **{f"<={b}": n for b, n in zip(WAIT_BUCKETS_MS, self.wait_hist)},
+                    f">{WAIT_BUCKETS_MS[-1]}": self.wait_hist[-1],
+                },
+            }
+
+
+def _bucket_index(bounds, value) -> int:
+    for i, b in enumerate(bounds):
+        if value <= b:
+            return i
+    return len(bounds)
+
+
+class InferenceBatcher:
+    """
+    Collects concurrent single-row predictions for up to `max_wait_ms` (or until
+    `max_batch_size` rows are queued) and scores them with one `predict_proba` call.
+
+    `get_model` is called once per batch, so a model swapped in between batches
+    is picked up without restarting the batcher. Each caller receives the
+    `(classes, probabilities)` pair for its own row.
+    """
+
+    def __init__(self, get_model: Callable[[], Any], max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self._get_model = get_model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = BatchStats(self.max_batch_size)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def submit(self, row: np.ndarray) -> Future:
+        """Queue one feature row; the returned future resolves to (classes, probabilities)."""
+        if self._thread is None:
+            self.start()
+        pending = _Pending(np.asarray(row, dtype=float).ravel())
+        self._queue.put(pending)
+        return pending.future
+
+    def predict_proba(self, row: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return self.submit(row).result()
+
+    async def apredict_proba(self, row: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return await asyncio.wrap_future(self.submit(row))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = item.enqueued + self.max_wait
+            stop_after = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop_after = True
+                    break
+                batch.append(nxt)
+            self._score(batch)
+            if stop_after:
+                return
+
+    def _score(self, batch: List[_Pending]):
+        started = time.perf_counter()
+        self.stats.record(len(batch), [(started - p.enqueued) * 1000.0 for p in batch])
+
+        # Rows of different widths (e.g. with image features) cannot share a matrix
+        groups: Dict[int, List[_Pending]] = {}
+        for p in batch:
+            groups.setdefault(p.row.shape[0], []).append(p)
+
+        try:
+            model = self._get_model()
+            classes = model.classes_
+        except Exception as e:
+            for p in batch:
+                p.future.set_exception(e)
+            return
+
+        for rows in groups.values():
+            try:
+                probs = model.predict_proba(np.vstack([p.row for p in rows]))
+            except Exception as e:
+                for p in rows:
+                    p.future.set_exception(e)
+                continue
+            for i, p in enumerate(rows):
+                p.future.set_result((classes, probs[i]))
+
+
+class ExecutorBatcher:
+    """
+    InferenceBatcher for the process executor: coalesces concurrent requests on
+    the event loop for up to `max_wait_ms` (or `max_batch_size` requests) and
+    hands each group to `run_batch(items)`, e.g. one executor call that scores
+    the whole group with one predict_proba in the worker.
+
+    `run_batch` returns one result per item; an exception instance in the list
+    fails only that caller, an exception raised by `run_batch` fails the group.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        stats: Optional[BatchStats] = None,
+    ):
+        self._run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.stats = stats or BatchStats(self.max_batch_size)
+        self._items = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._items.append((item, future, time.perf_counter()))
+        if len(self._items) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._items = self._items, []
+        if not batch:
+            return
+        # A fresh context, so batch-level work is not attributed to whichever request triggered the flush
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        started = time.perf_counter()
+        self.stats.record(len(batch), [(started - enqueued) * 1000.0 for _, _, enqueued in batch])
+        try:
+            results = await self._run_batch([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,137 @@
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait as wait_futures
+from typing import Any, Callable, Dict, Optional
+
+
+class InferenceOverloaded(Exception):
+    """Raised when the executor already has `max_pending` calls queued or running."""
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound inference off the event loop on a thread or process pool.
+
+    `kind` is "process", "thread" or "none" (call inline). The pool is created
+    once by `start()`; process workers run `initializer` when they spawn so the
+    model is loaded before the first request reaches them. At most
+    `max_pending` calls may be queued or running at a time; further calls
+    raise InferenceOverloaded instead of waiting, so overload shows up as a
+    fast rejection rather than unbounded latency.
+    """
+
+    def __init__(
+        self,
+        kind: str = "process",
+        workers: int = 2,
+        max_pending: int = 64,
+        initializer: Optional[Callable[[], Any]] = None,
+    ):
+        self.kind = (kind or "none").strip().lower()
+        if self.kind not in ("process", "thread", "none"):
+            raise ValueError(f"Unknown inference executor kind: {kind!r}")
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self._initializer = initializer
+        self._lock = threading.Lock()
+        self._pool: Optional[Executor] = None
+        self._pending = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.kind != "none"
+
+    def start(self, timeout: Optional[float] = None, wait: bool = True):
+        """
+        Create the pool. For processes, `wait` also spawns every worker and blocks
+        until their initializers ran, raising TimeoutError after `timeout` seconds;
+        call it from a thread, not the event loop.
+        """
+        with self._lock:
+            if self._pool is not None or not self.enabled:
+                return
+            if self.kind == "process":
+                # spawn: the server process has background threads, which fork does not copy safely
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self._initializer,
+                )
+                pool = self._pool
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+                pool = None
+        if pool is not None and wait:
+            # Spawn every worker now so model loading happens at startup, not on the first requests
+            futures = [pool.submit(os.getpid) for _ in range(self.workers)]
+            done, not_done = wait_futures(futures, timeout)
+            for f in done:
+                f.result()
+            if not_done:
+                raise TimeoutError(f"{len(not_done)} of {self.workers} inference workers not ready after {timeout}s")
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Await `fn(*args)` on the pool. `fn` must be a picklable module-level function for processes."""
+        if not self.enabled:
+            return fn(*args)
+        if self._pool is None:
+            # Never wait for worker startup on the event loop; workers spawn with the first calls
+            self.start(wait=False)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise InferenceOverloaded(f"Inference queue full ({self.max_pending} pending)")
+            self._pending += 1
+            self.submitted += 1
+        try:
+            if self.kind == "thread":
+                # Like asyncio.to_thread: the call sees the caller's context variables
+                future = self._pool.submit(contextvars.copy_context().run, fn, *args)
+            else:
+                future = self._pool.submit(fn, *args)
+        except Exception:
+            self._done(ok=False)
+            raise
+        try:
+            result = await asyncio.wrap_future(future)
+        except BaseException:
+            self._done(ok=False)
+            raise
+        self._done(ok=True)
+        return result
+
+    def _done(self, ok: bool):
+        with self._lock:
+            self._pending -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "running": self._pool is not None,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
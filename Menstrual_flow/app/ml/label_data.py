@@ -1,6 +1,12 @@
+import sys
+
+import numpy as np
 import pandas as pd
 
-df = pd.read_csv("app/ml/realistic_synthetic_flow_data_5000.csv")
+SOURCE_PATH = "app/ml/realistic_synthetic_flow_data_5000.csv"
+OUTPUT_PATH = "app/ml/flow_data_labeled.csv"
+CHUNK_SIZE = 100_000
+
 
 def assign_label(row):
     if row["hb"] < 11 and row["flow_ml"] > 80:
@@ -18,7 +24,38 @@ def assign_label(row):
     else:
         return "Normal"
 
-df["label"] = df.apply(assign_label, axis=1)
 
-df.to_csv("app/ml/flow_data_labeled.csv", index=False)
-print("Dataset relabeled and saved as flow_data_labeled.csv")
+def label_frame(df: pd.DataFrame) -> np.ndarray:
+    """Vectorized assign_label: np.select takes the first true condition, like the elif chain."""
+    col = {name: df[name].to_numpy(dtype=np.float64) for name in (
+        "hb", "flow_ml", "hba1c_ratio", "crp", "clots_score", "lh_level", "fsh_level", "amh_level", "tsh_level"
+    )}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lh_fsh = col["lh_level"] / (col["fsh_level"] + 1e-5)
+    conditions = [
+        (col["hb"] < 11) & (col["flow_ml"] > 80),
+        col["hba1c_ratio"] > 6.5,
+        col["crp"] > 6,
+        (col["flow_ml"] > 120) & (col["clots_score"] > 2),
+        (lh_fsh > 2) | (col["amh_level"] > 6),
+        (col["tsh_level"] < 0.4) | (col["tsh_level"] > 4.0),
+    ]
+    choices = ["Anemia Risk", "Diabetes Risk", "Infection Suspected", "Menorrhagia", "PCOS Risk", "Thyroid Imbalance"]
+    return np.select(conditions, choices, default="Normal")
+
+
+def relabel(source=SOURCE_PATH, output=OUTPUT_PATH, chunksize: int = CHUNK_SIZE) -> int:
+    """Label `source` chunk by chunk, appending each labeled chunk to `output`. Returns the row count."""
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(source, chunksize=chunksize)):
+        chunk["label"] = label_frame(chunk)
+        chunk.to_csv(output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        rows += len(chunk)
+    return rows
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else SOURCE_PATH
+    output = sys.argv[2] if len(sys.argv) > 2 else OUTPUT_PATH
+    relabel(source, output)
+    print(f"Dataset relabeled and saved as {output}")
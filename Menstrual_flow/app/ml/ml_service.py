@@ -1,88 +1,468 @@
+import copy
+import hashlib
+import random
+import threading
+from time import perf_counter_ns
 import numpy as np
-import joblib
-from sklearn.ensemble import RandomForestClassifier
-from PIL import Image
-from io import BytesIO
-import base64
-import sqlite3
-import pandas as pd
-
-try:
-    model = joblib.load("app/ml/model.joblib")
-except Exception as e:
-    print("Model loading failed:", e)
-    model = RandomForestClassifier(n_estimators=100)
-
-conn = sqlite3.connect("swasthya_flow.db")
-c = conn.cursor()
-c.execute("""
-CREATE TABLE IF NOT EXISTS flow_data (
-    flow_ml REAL, hb REAL, ph REAL, crp REAL, hba1c_ratio REAL,
-    clots_score REAL, fsh_level REAL, lh_level REAL,
-    amh_level REAL, tsh_level REAL, prolactin_level REAL,
-    esr REAL, leukocyte_count REAL, vaginal_ph REAL, ca125 REAL, estrogen REAL,
-    progesterone REAL, androgens REAL, blood_glucose REAL, wbc_count REAL,
-    pain_score REAL, weight_gain REAL, acne_severity REAL, insulin_resistance REAL,
-    fever REAL, tenderness REAL, pain_during_intercourse REAL, bloating REAL, weight_loss REAL,
-    appetite_loss REAL, vaginal_discharge REAL, discharge_odor REAL, discharge_color REAL,
-    label TEXT
+from app import config
+from app.ml import advice, image_features, stage_timer
+from app.ml.flow_data_loader import load_flow_data
+from app.ml.flow_data_schema import EXPECTED_FEATURES, ensure_flow_data_table
+from app.ml.inference_batcher import ExecutorBatcher, InferenceBatcher
+from app.ml.inference_executor import InferenceExecutor
+from app.ml.prediction_cache import PredictionCache
+from app.ml.retrain_scheduler import RetrainScheduler
+from app.ml.rules import BANDS, CONDITIONS
+from app.ml.model_store import ModelHandle
+from app.storage.engine import flow_data_connection
+
+# sklearn, pandas, PIL and joblib are imported where they are used so importing
+# this module (and app.main) stays cheap; the model is loaded on first use or
+# by the startup warmup.
+MODEL_PATH = config.MODEL_PATH
+
+model_handle = ModelHandle(
+    config.MODEL_PATH,
+    config.FLAT_MODEL_PATH,
+    mmap_mode=config.MODEL_MMAP_MODE,
+    flat_enabled=config.FLAT_FOREST_ENABLED,
+    max_flat_rows=config.FLAT_FOREST_MAX_ROWS,
 )
-""")
-conn.commit()
-conn.close()
-
-EXPECTED_FEATURES = [
-    "flow_ml", "hb", "ph", "crp", "hba1c_ratio",
-    "clots_score", "fsh_level", "lh_level",
-    "amh_level", "tsh_level", "prolactin_level",
-    # Additional parameters for comprehensive diagnosis
-    "esr", "leukocyte_count", "vaginal_ph", "ca125", "estrogen", 
-    "progesterone", "androgens", "blood_glucose", "wbc_count",
-    # Disease-specific symptoms
-    "pain_score", "weight_gain", "acne_severity", "insulin_resistance",
-    "fever", "tenderness", "pain_during_intercourse", "bloating",
-    "weight_loss", "appetite_loss", "vaginal_discharge", "discharge_odor", "discharge_color"
-]
-
-def predict_flow_risk(features: dict, image_base64=None):
-    # 1. Prepare features
+
+def __getattr__(name):
+    # Backwards compatible `ml_service.model` / `ml_service.predictor`, loaded on access
+    if name == "model":
+        return model_handle.model()
+    if name == "predictor":
+        return model_handle.predictor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_retrain_lock = threading.Lock()
+
+# Concurrent single-row predictions are coalesced into one predict_proba call.
+# The predictor is looked up per batch so retrains are picked up.
+batcher = InferenceBatcher(
+    model_handle.predictor,
+    max_batch_size=config.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=config.INFERENCE_MAX_WAIT_MS,
+)
+
+def _build_input(features: dict, image_base64=None, image_descriptor=None) -> np.ndarray:
+    t = perf_counter_ns()
     input_row = [float(features.get(f, 0)) for f in EXPECTED_FEATURES]
     input_data = np.array([input_row], dtype=float)
+    t = stage_timer.lap("features", t)
+
+    # The image is only decoded when the model was trained with image descriptors
+    if not _expects_image_features(model_handle.predictor()):
+        return input_data
 
-    if image_base64:
+    descriptor = np.zeros(image_features.DESCRIPTOR_SIZE)
+    if image_descriptor is not None:
+        descriptor = np.asarray(image_descriptor)
+    elif image_base64:
         try:
-            img_data = base64.b64decode(image_base64)
-            img = Image.open(BytesIO(img_data)).convert("RGB").resize((128,128))
-            img_array = np.array(img).flatten()/255.0
-            # Concatenate image features if needed (model must be trained for this!)
-            input_data = np.hstack([input_data, img_array.reshape(1, -1)])
+            descriptor = image_features.descriptor_from_base64(image_base64)
         except Exception as e:
             print("Image processing failed:", e)
+    input_data = np.hstack([input_data, descriptor.reshape(1, -1)])
+    stage_timer.lap("image", t)
+    return input_data
+
+def _expects_image_features(predictor) -> bool:
+    return predictor.n_features_in_ == len(EXPECTED_FEATURES) + image_features.DESCRIPTOR_SIZE
+
+def uses_image_features() -> bool:
+    """Whether the current model takes image descriptors; callers can skip image work when not."""
+    return _expects_image_features(model_handle.predictor())
 
+def _score(input_data: np.ndarray):
+    """Return (classes, probabilities) for a single row, through the batcher when enabled."""
+    t = perf_counter_ns()
+    if config.INFERENCE_BATCHING_ENABLED:
+        scored = batcher.predict_proba(input_data[0])
+    else:
+        scored = _score_direct(input_data)
+    stage_timer.lap("predict_proba", t)
+    return scored
+
+def _score_direct(input_data: np.ndarray):
+    current = model_handle.predictor()
+    return current.classes_, current.predict_proba(input_data)[0]
+
+def _cascade_first_stage(input_data: np.ndarray, features: dict):
+    """
+    Cheap first stage of cascade mode: the first CASCADE_STAGE1_TREES trees plus
+    the condition rules. A row is settled when the small vote is confident and
+    the rules agree (no hits for Normal, some hits otherwise); returns
+    (labels, probs, detected) then, or None to use the full forest.
+
+    Decisions and audits are recorded as stage stats ("cascade_normal",
+    "cascade_abnormal", "cascade_escalate", "cascade_audit_agree/disagree"),
+    which also carry them back from executor processes.
+    """
+    t = perf_counter_ns()
+    current = model_handle.predictor()
+    labels = current.classes_
+    probs = current.predict_proba_prefix(input_data, config.CASCADE_STAGE1_TREES)[0]
+    best = int(np.argmax(probs))
+    detected = CONDITIONS.detect_row(features, _prob_dict(labels, probs))
+    if labels[best] == "Normal":
+        settled = probs[best] >= config.CASCADE_NORMAL_CUTOFF and not detected
+        decision = "cascade_normal" if settled else "cascade_escalate"
+    else:
+        settled = probs[best] >= config.CASCADE_ABNORMAL_CUTOFF and bool(detected)
+        decision = "cascade_abnormal" if settled else "cascade_escalate"
+    stage_timer.record_spans([(decision, perf_counter_ns() - t)])
+    if not settled:
+        return None
+
+    if config.CASCADE_AUDIT_RATE > 0 and random.random() < config.CASCADE_AUDIT_RATE:
+        t = perf_counter_ns()
+        full_labels, full_probs = _score_direct(input_data)
+        agree = full_labels[int(np.argmax(full_probs))] == labels[best]
+        stage_timer.record_spans([("cascade_audit_agree" if agree else "cascade_audit_disagree", perf_counter_ns() - t)])
+    return labels, probs, detected
+
+def _cascade_result(features: dict, input_data: np.ndarray, compact=False):
+    """The response settled by the cascade first stage, or None when disabled or not confident."""
+    if not config.CASCADE_ENABLED:
+        return None
     try:
-        preds = model.predict(input_data)
-        probs = model.predict_proba(input_data)
-        labels = model.classes_
-        prob_dict = {labels[i]: float(probs[0][i]) for i in range(len(labels))}
+        settled = _cascade_first_stage(input_data, features)
     except Exception as e:
-        return {"prediction": "Error", "probabilities": {}, "risk_indicator": "Unknown", "advice": [str(e)], "detected_conditions": []}
+        print("Cascade first stage failed:", e)
+        return None
+    if settled is None:
+        return None
+    labels, probs, detected = settled
+    return _build_result(features, labels, probs, detected_conditions=detected, compact=compact)
+
+def cascade_stats() -> dict:
+    """How often each cascade stage decided, and first-stage agreement with the full forest on audited rows."""
+    stages = stage_timer.STATS.snapshot()
+    count = lambda stage: stages.get(stage, {}).get("count", 0)
+    normal, abnormal, escalated = count("cascade_normal"), count("cascade_abnormal"), count("cascade_escalate")
+    agree, disagree = count("cascade_audit_agree"), count("cascade_audit_disagree")
+    rows = normal + abnormal + escalated
+    audited = agree + disagree
+    return {
+        "enabled": config.CASCADE_ENABLED,
+        "stage1_trees": config.CASCADE_STAGE1_TREES,
+        "normal_cutoff": config.CASCADE_NORMAL_CUTOFF,
+        "abnormal_cutoff": config.CASCADE_ABNORMAL_CUTOFF,
+        "rows": rows,
+        "stage1_normal_rate": round(normal / rows, 4) if rows else 0.0,
+        "stage1_abnormal_rate": round(abnormal / rows, 4) if rows else 0.0,
+        "full_model_rate": round(escalated / rows, 4) if rows else 0.0,
+        "audited": audited,
+        "agreement_rate": round(agree / audited, 4) if audited else None,
+    }
+
+def _prob_dict(labels, probs) -> dict:
+    return {labels[i]: float(probs[i]) for i in range(len(labels))}
+
+def _build_result(
+    features: dict, labels, probs, detected_conditions=None, biomarker_analysis=None,
+    compact=False, biomarker_codes=None,
+) -> dict:
+    """
+    Assemble a prediction response. With `compact`, advice is returned as
+    `advice_codes` (see app.ml.advice) instead of formatted `advice` lines.
+    """
+    t = perf_counter_ns()
+    prob_dict = _prob_dict(labels, probs)
 
     # Multi-disease detection logic
-    detected_conditions = detect_multiple_conditions(features, prob_dict)
+    if detected_conditions is None:
+        detected_conditions = detect_multiple_conditions(features, prob_dict)
+        t = stage_timer.lap("detect_conditions", t)
     
     # Overall risk assessment
     overall_risk = assess_overall_risk(detected_conditions, prob_dict)
+    t = stage_timer.lap("assess_risk", t)
     
-    # Generate comprehensive advice for all detected conditions
-    comprehensive_advice = generate_comprehensive_advice(detected_conditions, overall_risk, features)
+    if compact:
+        if biomarker_codes is None:
+            biomarker_codes = BANDS.classify_row(features)
+        advice_field = "advice_codes"
+        advice_value = advice.compact(biomarker_codes + advice.summary_codes(detected_conditions, overall_risk))
+    else:
+        # Generate comprehensive advice for all detected conditions
+        advice_field = "advice"
+        advice_value = generate_comprehensive_advice(
+            detected_conditions, overall_risk, features, biomarker_analysis=biomarker_analysis
+        )
+    stage_timer.lap("advice", t)
 
-    return {
-        "prediction": preds[0],  # Primary prediction
+    result = {
+        "prediction": labels[int(np.argmax(probs))],  # Primary prediction
         "probabilities": prob_dict,
         "risk_indicator": overall_risk,
-        "advice": comprehensive_advice,
+        advice_field: advice_value,
         "detected_conditions": detected_conditions
     }
+    if compact:
+        result["advice_catalog_version"] = advice.CATALOG_VERSION
+    return result
+
+def _error_result(e: Exception) -> dict:
+    return {"prediction": "Error", "probabilities": {}, "risk_indicator": "Unknown", "advice": [str(e)], "detected_conditions": []}
+
+# Repeated submissions of the same panel are answered from here without scoring
+prediction_cache = (
+    PredictionCache(config.PREDICTION_CACHE_SIZE, config.PREDICTION_CACHE_TTL_S)
+    if config.PREDICTION_CACHE_ENABLED else None
+)
+
+def _cache_lookup(features: dict, image_base64=None, image_descriptor=None, compact=False):
+    """
+    Look the prediction up by the lab values quantized to PREDICTION_CACHE_DECIMALS.
+    Returns (cache key, cached result or None). Only the key is quantized: a miss
+    is scored from the caller's own values, like predict_flow_risk_batch, and a hit
+    returns the result of the first panel that rounded to the same key.
+    """
+    if prediction_cache is None:
+        return None, None
+    decimals = config.PREDICTION_CACHE_DECIMALS
+    vector = np.round(np.array([float(features.get(f, np.nan)) for f in EXPECTED_FEATURES]), decimals)
+    image_digest = None
+    if image_descriptor is not None:
+        image_digest = hashlib.sha1(np.asarray(image_descriptor, dtype=np.float32).tobytes()).digest()
+    elif image_base64:
+        image_digest = hashlib.sha1(image_base64.encode()).digest()
+    key = PredictionCache.make_key(vector, model_handle.version, image_digest, variant=int(compact))
+    return key, prediction_cache.get(key)
+
+def _cache_store(key, result: dict):
+    if key is not None and result["prediction"] != "Error":
+        prediction_cache.put(key, result)
+
+def predict_flow_risk(features: dict, image_base64=None, image_descriptor=None, compact=False):
+    """
+    Predict from lab values plus an optional image, given either as base64 or
+    as a descriptor already extracted with app.ml.image_features. `compact`
+    returns advice codes instead of advice text.
+    """
+    t = perf_counter_ns()
+    key, cached = _cache_lookup(features, image_base64, image_descriptor, compact)
+    stage_timer.lap("cache_lookup", t)
+    if cached is not None:
+        return cached
+    result = _predict_uncached(features, image_base64, image_descriptor, compact)
+    _cache_store(key, result)
+    return result
+
+def _predict_uncached(features: dict, image_base64=None, image_descriptor=None, compact=False):
+    # 1. Prepare features
+    input_data = _build_input(features, image_base64, image_descriptor)
+
+    result = _cascade_result(features, input_data, compact)
+    if result is not None:
+        return result
+
+    try:
+        labels, probs = _score(input_data)
+    except Exception as e:
+        return _error_result(e)
+
+    return _build_result(features, labels, probs, compact=compact)
+
+async def predict_flow_risk_async(features: dict, image_base64=None, image_descriptor=None, compact=False):
+    """
+    Same as predict_flow_risk, but without blocking the event loop: the whole
+    prediction (image decoding, scoring, rules and advice) runs on the inference
+    executor, or awaits the batcher when the executor is disabled. With the
+    process executor, concurrent requests are coalesced by executor_batcher and
+    each group is scored by one worker call.
+    Raises InferenceOverloaded when the executor queue is full.
+    """
+    t = perf_counter_ns()
+    key, cached = _cache_lookup(features, image_base64, image_descriptor, compact)
+    t = stage_timer.lap("cache_lookup", t)
+    if cached is not None:
+        return cached
+
+    if inference_executor.enabled:
+        if inference_executor.kind == "process" and config.INFERENCE_BATCHING_ENABLED:
+            result = await executor_batcher.submit((features, image_base64, image_descriptor, compact))
+            # Coalescing wait, queueing, IPC and the worker's share of the batch
+            stage_timer.lap("executor", t)
+        elif inference_executor.kind == "process":
+            result, spans = await inference_executor.run(
+                _predict_in_worker, model_handle.source(), features, image_base64, image_descriptor, compact
+            )
+            # Stage times measured in the worker; "executor" is the queueing and IPC around them
+            stage_timer.record_spans(spans)
+            stage_timer.lap("executor", t + sum(elapsed for _, elapsed in spans))
+        else:
+            result = await inference_executor.run(
+                _predict_uncached, features, image_base64, image_descriptor, compact
+            )
+        _cache_store(key, result)
+        return result
+
+    input_data = _build_input(features, image_base64, image_descriptor)
+
+    result = _cascade_result(features, input_data, compact)
+    if result is not None:
+        _cache_store(key, result)
+        return result
+
+    try:
+        if config.INFERENCE_BATCHING_ENABLED:
+            t = perf_counter_ns()
+            labels, probs = await batcher.apredict_proba(input_data[0])
+            stage_timer.lap("predict_proba", t)
+        else:
+            labels, probs = _score(input_data)
+    except Exception as e:
+        return _error_result(e)
+
+    result = _build_result(features, labels, probs, compact=compact)
+    _cache_store(key, result)
+    return result
+
+def _init_worker():
+    """Process-pool initializer: load the model before the worker takes requests."""
+    # Only the parent writes the flat model file; workers read it
+    model_handle.write_flat = False
+    model_handle.warmup()
+
+def _sync_worker_model(model_source):
+    """Reload from disk when the parent serves a different model file than this worker loaded."""
+    if model_source is not None and model_source != model_handle.fingerprint:
+        model_handle.reload()
+        model_handle.warmup()
+
+def _predict_in_worker(model_source, features: dict, image_base64=None, image_descriptor=None, compact=False):
+    """
+    predict_flow_risk inside an executor process, for one row (batching disabled).
+    `model_source` is the parent's model_handle.source(); when it differs from
+    the model this worker loaded, the retrained model is reloaded from disk.
+    Returns (result, stage spans) so the parent can record this worker's stage timings.
+    """
+    _sync_worker_model(model_source)
+
+    with stage_timer.collect() as spans:
+        input_data = _build_input(features, image_base64, image_descriptor)
+        result = _cascade_result(features, input_data, compact)
+        if result is not None:
+            return result, spans
+        try:
+            t = perf_counter_ns()
+            labels, probs = _score_direct(input_data)
+            stage_timer.lap("predict_proba", t)
+        except Exception as e:
+            return _error_result(e), spans
+        return _build_result(features, labels, probs, compact=compact), spans
+
+def _predict_batch_in_worker(model_source, requests: list):
+    """
+    A coalesced group of predict_flow_risk calls inside an executor process.
+    `requests` holds (features, image_base64, image_descriptor, compact) tuples;
+    rows the cascade does not settle are scored with one predict_proba per
+    feature width. Returns (results, stage spans); a row that fails to build
+    gets its exception in place of a result.
+    """
+    _sync_worker_model(model_source)
+
+    results = [None] * len(requests)
+    with stage_timer.collect() as spans:
+        groups = {}
+        for i, (features, image_base64, image_descriptor, compact) in enumerate(requests):
+            try:
+                input_data = _build_input(features, image_base64, image_descriptor)
+            except Exception as e:
+                results[i] = e
+                continue
+            result = _cascade_result(features, input_data, compact)
+            if result is not None:
+                results[i] = result
+            else:
+                # Rows with and without image descriptors cannot share a matrix
+                groups.setdefault(input_data.shape[1], []).append((i, input_data[0]))
+
+        for rows in groups.values():
+            try:
+                t = perf_counter_ns()
+                current = model_handle.predictor()
+                labels = current.classes_
+                probs = current.predict_proba(np.vstack([row for _, row in rows]))
+                stage_timer.lap("predict_proba", t)
+            except Exception as e:
+                for i, _ in rows:
+                    results[i] = _error_result(e)
+                continue
+            for (i, _), row_probs in zip(rows, probs):
+                features, _, _, compact = requests[i]
+                results[i] = _build_result(features, labels, row_probs, compact=compact)
+    return results, spans
+
+async def _run_worker_batch(requests: list):
+    results, spans = await inference_executor.run(_predict_batch_in_worker, model_handle.source(), requests)
+    stage_timer.record_spans(spans)
+    return results
+
+# Created here but only started by the app (main.py), so importing this module spawns nothing
+inference_executor = InferenceExecutor(
+    config.INFERENCE_EXECUTOR,
+    workers=config.INFERENCE_WORKERS,
+    max_pending=config.INFERENCE_MAX_PENDING,
+    initializer=_init_worker,
+)
+
+# Coalesces requests in front of the process executor; shares the batcher's stats for /ml/metrics
+executor_batcher = ExecutorBatcher(
+    _run_worker_batch,
+    max_batch_size=config.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=config.INFERENCE_MAX_WAIT_MS,
+    stats=batcher.stats,
+)
+
+def predict_flow_risk_batch(features_list: list, compact: bool = False):
+    """
+    Score many rows at once: one feature matrix, one predict_proba call and
+    vectorized condition and biomarker-band thresholds. Each result has the same shape as
+    predict_flow_risk's.
+    """
+    if not features_list:
+        return []
+    try:
+        labels, probs, prob_dicts, detected = score_rows(features_list)
+    except Exception as e:
+        return [_error_result(e) for _ in features_list]
+
+    values = BANDS.gather(features_list)
+    bands = BANDS.classify(values)
+    return [
+        _build_result(
+            features, labels, row,
+            detected_conditions=conditions,
+            biomarker_analysis=None if compact else BANDS.render(values[i], bands[i]),
+            compact=compact,
+            biomarker_codes=BANDS.render_codes(values[i], bands[i]) if compact else None,
+        )
+        for i, (features, row, conditions) in enumerate(zip(features_list, probs, detected))
+    ]
+
+def score_rows(features_list: list):
+    """
+    Model probabilities and detected conditions for many rows, without advice.
+    Returns (labels, probs, prob_dicts, detected); model errors are raised.
+    """
+    X = np.array([[float(f.get(k, 0)) for k in EXPECTED_FEATURES] for f in features_list], dtype=float)
+    X = X.reshape(len(features_list), len(EXPECTED_FEATURES))
+
+    current = model_handle.predictor()
+    if _expects_image_features(current):
+        X = np.hstack([X, np.zeros((len(X), image_features.DESCRIPTOR_SIZE))])
+    labels = current.classes_
+    probs = current.predict_proba(X)
+
+    prob_dicts = [_prob_dict(labels, row) for row in probs]
+    detected = detect_multiple_conditions_batch(features_list, prob_dicts)
+    return labels, probs, prob_dicts, detected
 
 def generate_advice(prediction, risk):
     """
@@ -160,115 +540,14 @@ def detect_multiple_conditions(features: dict, prob_dict: dict):
     Detect multiple conditions based on biomarker thresholds and probabilities.
     Returns a list of detected conditions with their risk levels.
     """
-    detected = []
-    
-    # Define condition detection thresholds based on medical literature
-    conditions = {
-        "PCOS/PCOD Risk": {
-            "lh_level": {"min": 15, "weight": 0.25},  # LH > 15 mIU/mL
-            "fsh_level": {"max": 8, "weight": 0.2},   # FSH < 8 mIU/mL (LH:FSH ratio >2:1)
-            "amh_level": {"min": 4.0, "weight": 0.25}, # AMH > 4 ng/mL (very high)
-            "androgens": {"min": 80, "weight": 0.15}, # Testosterone > 80 ng/dL
-            "blood_glucose": {"min": 100, "weight": 0.1}, # Insulin resistance
-            "weight_gain": {"min": 5, "weight": 0.05}  # Weight gain
-        },
-        "PID Risk": {
-            "crp": {"min": 10, "weight": 0.3},        # CRP > 10 mg/L
-            "wbc_count": {"min": 11000, "weight": 0.25}, # WBC > 11,000 /µL
-            "fever": {"min": 37.5, "weight": 0.2},    # Fever > 37.5°C
-            "vaginal_ph": {"max": 4.5, "weight": 0.15}, # Vaginal pH < 4.5
-            "tenderness": {"min": 2, "weight": 0.1}   # Pelvic tenderness
-        },
-        "Endometriosis Risk": {
-            "estrogen": {"min": 350, "weight": 0.3},   # Estrogen > 350 pg/mL
-            "ca125": {"min": 35, "weight": 0.25},      # CA-125 > 35 U/mL
-            "pain_score": {"min": 7, "weight": 0.25},  # Pain score > 7/10
-            "pain_during_intercourse": {"min": 1, "weight": 0.2} # Dyspareunia
-        },
-        "Ovarian Cancer Risk": {
-            "ca125": {"min": 35, "weight": 0.4},       # CA-125 > 35 U/mL
-            "weight_loss": {"min": 5, "weight": 0.2},  # Unexplained weight loss
-            "bloating": {"min": 1, "weight": 0.2},     # Persistent bloating
-            "appetite_loss": {"min": 1, "weight": 0.2} # Loss of appetite
-        },
-        "Anemia Risk": {
-            "hb": {"max": 12, "weight": 0.6},          # Hemoglobin < 12 g/dL
-            "flow_ml": {"min": 80, "weight": 0.4}      # Heavy flow > 80ml
-        },
-        "Thyroid Imbalance": {
-            "tsh_level": {"min": 4.0, "weight": 0.4},  # TSH > 4.0 mIU/mL (hypothyroid)
-            "tsh_level_hyper": {"max": 0.4, "weight": 0.4}, # TSH < 0.4 mIU/mL (hyperthyroid)
-            "prolactin_level": {"min": 20, "weight": 0.2} # Prolactin > 20 ng/mL
-        },
-        "Diabetes Risk": {
-            "blood_glucose": {"min": 126, "weight": 0.5}, # Fasting glucose > 126 mg/dL
-            "hba1c_ratio": {"min": 6.5, "weight": 0.5}   # HbA1c > 6.5%
-        },
-        "Infection/Inflammation": {
-            "crp": {"min": 5, "weight": 0.3},          # CRP > 5 mg/L
-            "esr": {"min": 20, "weight": 0.25},        # ESR > 20 mm/hr
-            "wbc_count": {"min": 11000, "weight": 0.25}, # WBC > 11,000 /µL
-            "vaginal_ph": {"max": 5.0, "weight": 0.2}  # Abnormal vaginal pH
-        },
-        "Menorrhagia": {
-            "flow_ml": {"min": 80, "weight": 0.5},     # Flow > 80ml
-            "clots_score": {"min": 3, "weight": 0.3},  # Heavy clots
-            "pain_score": {"min": 6, "weight": 0.2}    # Pain during flow
-        }
-    }
-    
-    for condition_name, thresholds in conditions.items():
-        risk_score = 0
-        total_weight = 0
-        matched_biomarkers = 0
-        
-        for biomarker, criteria in thresholds.items():
-            if biomarker in features:
-                value = float(features[biomarker])
-                weight = criteria["weight"]
-                
-                # Check if biomarker meets condition criteria
-                if "min" in criteria and value >= criteria["min"]:
-                    risk_score += weight
-                    matched_biomarkers += 1
-                elif "max" in criteria and value <= criteria["max"]:
-                    risk_score += weight
-                    matched_biomarkers += 1
-                
-                total_weight += weight
-        
-        # Calculate final score only if at least 40% of biomarkers match (more lenient)
-        if total_weight > 0 and matched_biomarkers >= len(thresholds) * 0.4:
-            final_score = risk_score / total_weight
-            
-            # Determine risk level with more lenient thresholds
-            if final_score >= 0.7:
-                risk_level = "High"
-            elif final_score >= 0.5:
-                risk_level = "Moderate"
-            elif final_score >= 0.3:
-                risk_level = "Low"
-            else:
-                continue  # Skip conditions with very low risk
-            
-            # Add probability-based confidence
-            prob_confidence = prob_dict.get(condition_name, 0)
-            
-            # Only include if biomarker risk is significant OR model has moderate confidence
-            if final_score > 0.3 or prob_confidence > 0.2:
-                detected.append({
-                    "condition": condition_name,
-                    "risk_level": risk_level,
-                    "confidence": max(final_score, prob_confidence),
-                    "biomarkers": {k: float(features.get(k, 0)) for k in thresholds.keys() if k in features},
-                    "matched_count": matched_biomarkers,
-                    "total_count": len(thresholds)
-                })
-    
-    # Sort by confidence (highest first)
-    detected.sort(key=lambda x: x["confidence"], reverse=True)
-    
-    return detected
+    return CONDITIONS.detect_row(features, prob_dict)
+
+def detect_multiple_conditions_batch(features_list: list, prob_dicts: list):
+    """
+    detect_multiple_conditions over many rows with one vectorized rule evaluation.
+    Returns one detected list per row, identical to the row-by-row results.
+    """
+    return CONDITIONS.detect(features_list, prob_dicts)
 
 def assess_overall_risk(detected_conditions: list, prob_dict: dict):
     """
@@ -296,277 +575,174 @@ def assess_overall_risk(detected_conditions: list, prob_dict: dict):
 def analyze_biomarkers(features: dict):
     """
     Analyze individual biomarkers and provide specific feedback.
+    Bands and messages come from BIOMARKER_BANDS in app.ml.rules.
     """
-    analysis = []
-    
-    # CRP Analysis
-    crp = float(features.get('crp', 0))
-    if crp > 10:
-        analysis.append(f"🔴 CRP is HIGH ({crp:.1f}) - Possible infection or inflammation")
-    elif crp > 5:
-        analysis.append(f"🟡 CRP is ELEVATED ({crp:.1f}) - Mild inflammation")
-    else:
-        analysis.append(f"🟢 CRP is NORMAL ({crp:.1f})")
-    
-    # Hemoglobin Analysis
-    hb = float(features.get('hb', 0))
-    if hb < 12:
-        analysis.append(f"🔴 Hemoglobin is LOW ({hb:.1f}) - Possible anemia")
-    elif hb < 13:
-        analysis.append(f"🟡 Hemoglobin is BORDERLINE ({hb:.1f}) - Monitor closely")
-    else:
-        analysis.append(f"🟢 Hemoglobin is NORMAL ({hb:.1f})")
-    
-    # pH Analysis
-    ph = float(features.get('ph', 0))
-    if ph < 4.5:
-        analysis.append(f"🔴 pH is LOW ({ph:.1f}) - Possible infection")
-    elif ph < 5.0:
-        analysis.append(f"🟡 pH is BORDERLINE ({ph:.1f}) - Monitor")
-    else:
-        analysis.append(f"🟢 pH is NORMAL ({ph:.1f})")
-    
-    # HbA1c Analysis
-    hba1c = float(features.get('hba1c_ratio', 0))
-    if hba1c > 6.5:
-        analysis.append(f"🔴 HbA1c is HIGH ({hba1c:.1f}%) - Diabetes risk")
-    elif hba1c > 5.7:
-        analysis.append(f"🟡 HbA1c is ELEVATED ({hba1c:.1f}%) - Pre-diabetes")
-    else:
-        analysis.append(f"🟢 HbA1c is NORMAL ({hba1c:.1f}%)")
-    
-    # Flow Analysis
-    flow = float(features.get('flow_ml', 0))
-    if flow > 100:
-        analysis.append(f"🔴 Flow is HEAVY ({flow:.1f}ml) - Menorrhagia risk")
-    elif flow > 60:
-        analysis.append(f"🟡 Flow is MODERATE ({flow:.1f}ml) - Monitor")
-    else:
-        analysis.append(f"🟢 Flow is NORMAL ({flow:.1f}ml)")
-    
-    # TSH Analysis
-    tsh = float(features.get('tsh_level', 0))
-    if tsh > 4.0:
-        analysis.append(f"🔴 TSH is HIGH ({tsh:.1f}) - Thyroid dysfunction")
-    elif tsh < 0.4:
-        analysis.append(f"🔴 TSH is LOW ({tsh:.1f}) - Hyperthyroidism")
-    else:
-        analysis.append(f"🟢 TSH is NORMAL ({tsh:.1f})")
-    
-    # Clots Analysis
-    clots = float(features.get('clots_score', 0))
-    if clots > 3:
-        analysis.append(f"🔴 Clots are HEAVY ({clots:.1f}) - Possible menorrhagia")
-    elif clots > 1:
-        analysis.append(f"🟡 Clots are MODERATE ({clots:.1f}) - Monitor")
-    else:
-        analysis.append(f"🟢 Clots are NORMAL ({clots:.1f})")
-    
-    # FSH Analysis
-    fsh = float(features.get('fsh_level', 0))
-    if fsh > 8:
-        analysis.append(f"🔴 FSH is HIGH ({fsh:.1f}) - Possible PCOS")
-    else:
-        analysis.append(f"🟢 FSH is NORMAL ({fsh:.1f})")
-    
-    # LH Analysis
-    lh = float(features.get('lh_level', 0))
-    if lh > 12:
-        analysis.append(f"🔴 LH is HIGH ({lh:.1f}) - Possible PCOS")
-    else:
-        analysis.append(f"🟢 LH is NORMAL ({lh:.1f})")
-    
-    # Prolactin Analysis
-    prolactin = float(features.get('prolactin_level', 0))
-    if prolactin > 20:
-        analysis.append(f"🔴 Prolactin is HIGH ({prolactin:.1f}) - Thyroid issue")
-    else:
-        analysis.append(f"🟢 Prolactin is NORMAL ({prolactin:.1f})")
-    
-    # ESR Analysis
-    esr = float(features.get('esr', 0))
-    if esr > 20:
-        analysis.append(f"🔴 ESR is ELEVATED ({esr:.1f}) - Possible inflammation")
-    else:
-        analysis.append(f"🟢 ESR is NORMAL ({esr:.1f})")
-    
-    # WBC Analysis
-    wbc = float(features.get('wbc_count', 0))
-    if wbc > 11000:
-        analysis.append(f"🔴 WBC is HIGH ({wbc:.0f}) - Possible infection")
-    elif wbc < 4000:
-        analysis.append(f"🟡 WBC is LOW ({wbc:.0f}) - Immunosuppression risk")
-    else:
-        analysis.append(f"🟢 WBC is NORMAL ({wbc:.0f})")
-    
-    # CA-125 Analysis
-    ca125 = float(features.get('ca125', 0))
-    if ca125 > 35:
-        analysis.append(f"🔴 CA-125 is ELEVATED ({ca125:.1f}) - Endometriosis/Cancer risk")
-    else:
-        analysis.append(f"🟢 CA-125 is NORMAL ({ca125:.1f})")
-    
-    # Estrogen Analysis
-    estrogen = float(features.get('estrogen', 0))
-    if estrogen > 350:
-        analysis.append(f"🔴 Estrogen is HIGH ({estrogen:.1f}) - Endometriosis risk")
-    elif estrogen < 50:
-        analysis.append(f"🟡 Estrogen is LOW ({estrogen:.1f}) - Menopause/ovarian failure")
-    else:
-        analysis.append(f"🟢 Estrogen is NORMAL ({estrogen:.1f})")
-    
-    # Blood Glucose Analysis
-    glucose = float(features.get('blood_glucose', 0))
-    if glucose > 126:
-        analysis.append(f"🔴 Blood Glucose is HIGH ({glucose:.1f}) - Diabetes")
-    elif glucose > 100:
-        analysis.append(f"🟡 Blood Glucose is ELEVATED ({glucose:.1f}) - Pre-diabetes")
-    else:
-        analysis.append(f"🟢 Blood Glucose is NORMAL ({glucose:.1f})")
-    
-    # Pain Score Analysis
-    pain = float(features.get('pain_score', 0))
-    if pain > 7:
-        analysis.append(f"🔴 Pain is SEVERE ({pain:.1f}/10) - Medical attention needed")
-    elif pain > 4:
-        analysis.append(f"🟡 Pain is MODERATE ({pain:.1f}/10) - Monitor closely")
-    elif pain > 0:
-        analysis.append(f"🟢 Pain is MILD ({pain:.1f}/10)")
-    else:
-        analysis.append(f"🟢 No pain reported")
-    
-    return analysis
+    return BANDS.analyze_row(features)
 
-def generate_comprehensive_advice(detected_conditions: list, overall_risk: str, features: dict):
+def generate_comprehensive_advice(detected_conditions: list, overall_risk: str, features: dict, biomarker_analysis=None):
     """
     Generate comprehensive advice for all detected conditions.
+    `biomarker_analysis` may be passed in when it was already computed for a batch.
+    The text comes from the precompiled templates in app.ml.advice.
     """
-    advice = []
+    advice_lines = []
     
     # Add biomarker analysis first
-    biomarker_analysis = analyze_biomarkers(features)
-    advice.extend(biomarker_analysis)
+    if biomarker_analysis is None:
+        biomarker_analysis = analyze_biomarkers(features)
+    advice_lines.extend(biomarker_analysis)
     
-    # Simple risk assessment
-    if detected_conditions:
-        if overall_risk == "Critical":
-            advice.append("\n🚨 CRITICAL RISK: Multiple serious conditions detected. Seek immediate medical attention.")
-        elif overall_risk == "High":
-            advice.append("\n⚠️ HIGH RISK: Serious conditions detected. Consult a doctor within 24-48 hours.")
-        elif overall_risk == "Moderate":
-            advice.append("\n⚡ MODERATE RISK: Conditions require monitoring. Schedule a doctor visit within a week.")
-        else:
-            advice.append("\n📊 LOW RISK: Some conditions detected. Monitor closely and consider preventive care.")
-    else:
-        advice.append("\n✅ NO RISK DETECTED: You are good to go! Your biomarkers appear normal.")
+    # Risk summary, one block per detected condition, then general tips
+    advice_lines.extend(advice.render_summary(detected_conditions, overall_risk))
     
-    # Only show advice for actually detected conditions
-    if detected_conditions:
-        advice.append(f"\n🔍 Detected Conditions ({len(detected_conditions)}):")
-        
-        for condition in detected_conditions:
-            condition_name = condition["condition"]
-            risk_level = condition["risk_level"]
-            confidence = int(condition["confidence"] * 100)
-            
-            advice.append(f"\n📋 {condition_name} ({risk_level} Risk - {confidence}% confidence):")
-            
-            if condition_name == "Anemia Risk":
-                advice.extend([
-                    "• Eat iron-rich foods: spinach, beetroot, lentils, red meat",
-                    "• Consider iron supplements (ask doctor first)",
-                    "• Get a blood test to confirm"
-                ])
-            elif condition_name == "PCOS Risk":
-                advice.extend([
-                    "• Track your menstrual cycles",
-                    "• Maintain healthy weight",
-                    "• See a gynecologist for testing"
-                ])
-            elif condition_name == "Thyroid Imbalance":
-                advice.extend([
-                    "• Get thyroid blood tests (T3, T4, TSH)",
-                    "• See an endocrinologist",
-                    "• Eat a balanced diet"
-                ])
-            elif condition_name == "Diabetes Risk":
-                advice.extend([
-                    "• Eat less sugar, more fiber",
-                    "• Exercise regularly",
-                    "• Get blood sugar tests",
-                    "• See a diabetes specialist"
-                ])
-            elif condition_name == "Infection Suspected":
-                advice.extend([
-                    "• See a doctor immediately",
-                    "• Take prescribed antibiotics",
-                    "• Stay clean and hydrated"
-                ])
-            elif condition_name == "Menorrhagia":
-                advice.extend([
-                    "• Track how many pads you use",
-                    "• See a gynecologist",
-                    "• Consider iron supplements"
-                ])
-            elif condition_name == "Endometriosis Risk":
-                advice.extend([
-                    "• See a gynecologist for exam",
-                    "• Track your pain patterns",
-                    "• Consider anti-inflammatory diet"
-                ])
-            elif condition_name == "PID Risk":
-                advice.extend([
-                    "• See a doctor immediately",
-                    "• Take all prescribed antibiotics",
-                    "• Avoid sex until treated"
-                ])
-    else:
-        advice.append("\n✅ No specific conditions detected. Your biomarkers appear to be within normal ranges.")
-    
-    # Simple general advice
-    if detected_conditions:
-        advice.append("\n💡 General Tips:")
-        advice.extend([
-            "• See your doctor regularly",
-            "• Follow treatment plans",
-            "• Don't ignore symptoms"
-        ])
-    else:
-        advice.extend([
-            "\n💡 Stay Healthy:",
-            "• Regular check-ups",
-            "• Eat well and exercise",
-            "• Track your cycle"
-        ])
-    
-    return advice
+    return advice_lines
 
 def save_user_entry(features: dict, label):
     """Save user data for future retraining."""
     try:
-        conn = sqlite3.connect("swasthya_flow.db")
-        c = conn.cursor()
-        values = [features.get(f, 0) for f in EXPECTED_FEATURES] + [label]
-        c.execute(
-            f"INSERT INTO flow_data ({','.join(EXPECTED_FEATURES)}, label) VALUES ({','.join(['?']*len(values))})",
-            values
-        )
-        conn.commit()
-        conn.close()
+        conn = flow_data_connection()
+        try:
+            ensure_flow_data_table(conn)
+            c = conn.cursor()
+            values = [features.get(f, 0) for f in EXPECTED_FEATURES] + [label]
+            c.execute(
+                f"INSERT INTO flow_data ({','.join(EXPECTED_FEATURES)}, label) VALUES ({','.join(['?']*len(values))})",
+                values
+            )
+            conn.commit()
+        finally:
+            conn.close()
     except Exception as e:
         print("Saving user entry failed:", e)
+        return
+    if config.RETRAIN_ENABLED:
+        retrain_scheduler.notify_new_rows(1)
 
-def retrain_model_incremental():
-    """Retrain the model incrementally on new user data."""
-    try:
-        conn = sqlite3.connect("swasthya_flow.db")
-        df = pd.read_sql("SELECT * FROM flow_data", conn)
-        conn.close()
-        if len(df) < 10:
-            return
-        X = df[EXPECTED_FEATURES].values
-        y = df['label'].values
-        model.fit(X, y)
-        joblib.dump(model, "app/ml/model.joblib")
-    except Exception as e:
-        print("Incremental retraining failed:", e)
\ No newline at end of file
+def _swap_model(new_model):
+    """Persist and publish a fully fitted model; readers holding the old one are unaffected."""
+    model_handle.swap(new_model)
+    if prediction_cache is not None:
+        prediction_cache.clear()
+
+def _ensure_retrain_state(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS model_state (key TEXT PRIMARY KEY, value TEXT)")
+
+def _load_retrain_state(conn) -> dict:
+    _ensure_retrain_state(conn)
+    return dict(conn.execute("SELECT key, value FROM model_state").fetchall())
+
+def _save_retrain_state(conn, **values):
+    _ensure_retrain_state(conn)
+    conn.executemany(
+        "INSERT OR REPLACE INTO model_state (key, value) VALUES (?, ?)",
+        [(k, str(v)) for k, v in values.items()],
+    )
+    conn.commit()
+
+def _read_flow_data(conn, after_rowid: int = 0):
+    """
+    Read flow_data rows with rowid > after_rowid. Returns (X, y, max_rowid) with
+    X float32 (what the trees use internally, so fit makes no copy) and y the
+    label strings as an object array sharing one str per class.
+    """
+    X, codes, classes, max_rowid = load_flow_data(
+        conn, EXPECTED_FEATURES, after_rowid=after_rowid, chunk_rows=config.RETRAIN_CHUNK_ROWS
+    )
+    return X, np.array(classes, dtype=object)[codes], max_rowid
+
+def _grow_forest(current, X, y, n_new_trees: int):
+    """
+    Fit `n_new_trees` extra trees on the new rows only (warm_start) and return the
+    grown copy. Classes absent from the new rows are added as zero-weight samples
+    so the new trees share the existing classes_ layout.
+    """
+    classes = list(current.classes_)
+    missing = [c for c in classes if c not in set(y)]
+    sample_weight = np.ones(len(y))
+    if missing:
+        X = np.vstack([X, np.zeros((len(missing), X.shape[1]))])
+        y = np.concatenate([y, np.array(missing, dtype=object)])
+        sample_weight = np.concatenate([sample_weight, np.zeros(len(missing))])
+
+    grown = copy.deepcopy(current)
+    grown.set_params(warm_start=True, n_estimators=len(current.estimators_) + n_new_trees)
+    grown.fit(X, y, sample_weight=sample_weight)
+    grown.set_params(warm_start=False)
+    return grown
+
+def retrain_model_incremental(full: bool = False):
+    """
+    Update the model with flow_data rows added since the last run.
+
+    Only rows past the persisted rowid watermark are read, and they are learned
+    by growing the forest with warm_start trees: one per RETRAIN_MIN_ROWS_PER_TREE
+    new rows, at most RETRAIN_TREES_PER_UPDATE. With fewer new rows nothing is
+    added and the rows wait for the next run. Those trees are fitted on the new
+    rows alone yet vote like the base trees, so their share of the forest is
+    capped at RETRAIN_MAX_INCREMENTAL_SHARE. An update that would exceed it, every
+    RETRAIN_CONSOLIDATE_EVERY updates, `full`, a new label or an unfitted model
+    refits the forest from the whole table instead. The new model is fitted on a
+    copy and swapped in when done.
+    """
+    from sklearn.base import clone
+
+    with _retrain_lock:
+        try:
+            conn = flow_data_connection()
+            try:
+                ensure_flow_data_table(conn)
+                state = _load_retrain_state(conn)
+                watermark = int(state.get("flow_data_watermark", 0))
+                updates = int(state.get("incremental_updates", 0))
+                current = model_handle.model()
+                base_trees = int(state.get("base_estimators", getattr(current, "n_estimators", 100)))
+
+                fitted = hasattr(current, "estimators_")
+                consolidate = full or not fitted or updates >= config.RETRAIN_CONSOLIDATE_EVERY
+
+                if not consolidate:
+                    X, y, max_rowid = _read_flow_data(conn, after_rowid=watermark)
+                    n_new_trees = min(config.RETRAIN_TREES_PER_UPDATE, len(y) // max(1, config.RETRAIN_MIN_ROWS_PER_TREE))
+                    if n_new_trees <= 0:
+                        # Too few rows to outvote noise; leave them past the watermark for a later run
+                        return
+                    incremental = len(current.estimators_) - base_trees + n_new_trees
+                    if not set(y) <= set(current.classes_):
+                        consolidate = True
+                    elif incremental > config.RETRAIN_MAX_INCREMENTAL_SHARE * (base_trees + incremental):
+                        consolidate = True
+                    else:
+                        _swap_model(_grow_forest(current, X, y, n_new_trees))
+                        _save_retrain_state(
+                            conn,
+                            flow_data_watermark=max_rowid,
+                            incremental_updates=updates + 1,
+                            base_estimators=base_trees,
+                        )
+
+                if consolidate:
+                    X, y, max_rowid = _read_flow_data(conn)
+                    if len(y) < 10:
+                        return
+                    new_model = clone(current)
+                    new_model.set_params(n_estimators=base_trees, warm_start=False)
+                    new_model.fit(X, y)
+                    _swap_model(new_model)
+                    _save_retrain_state(
+                        conn,
+                        flow_data_watermark=max_rowid,
+                        incremental_updates=0,
+                        base_estimators=base_trees,
+                    )
+            finally:
+                conn.close()
+        except Exception as e:
+            print("Incremental retraining failed:", e)
+            raise
+
+# Retraining happens off the request path; see RetrainScheduler for the triggers.
+retrain_scheduler = RetrainScheduler(
+    retrain_model_incremental,
+    min_new_rows=config.RETRAIN_MIN_NEW_ROWS,
+    max_interval_s=config.RETRAIN_MAX_INTERVAL_S,
+)
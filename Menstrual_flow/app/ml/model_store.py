@@ -0,0 +1,153 @@
+import os
+import threading
+from typing import Optional
+
+from app.ml.flat_forest import FlatForest, ForestPredictor
+
+
+def _fingerprint(path: str) -> Optional[str]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+class ModelHandle:
+    """
+    Lazily loaded model artifacts.
+
+    Nothing is read from disk until `predictor()` / `model()` is first called or
+    `warmup()` runs. The hot path only needs the flattened forest, which is cached
+    next to the sklearn model and loaded with `mmap_mode` so several worker
+    processes share its pages. The sklearn estimator itself is only unpickled
+    when something needs it (large batches, retraining).
+
+    A missing or stale flat file is rebuilt from the sklearn model and, when
+    `write_flat` is set, saved. Inference workers clear it: the parent writes
+    the file (at warmup and in `swap()`), and a worker that finds it stale
+    flattens the model in memory instead of racing other workers to save it.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        flat_path: str,
+        mmap_mode: Optional[str] = "r",
+        flat_enabled: bool = True,
+        max_flat_rows: int = 128,
+    ):
+        self.model_path = model_path
+        self.flat_path = flat_path
+        self.mmap_mode = mmap_mode or None
+        self.flat_enabled = flat_enabled
+        self.max_flat_rows = max_flat_rows
+        self.write_flat = True
+        self._lock = threading.RLock()
+        self._model = None
+        self._predictor: Optional[ForestPredictor] = None
+        self.version = 0
+        # Fingerprint of the model file the loaded predictor came from (None until loaded)
+        self.fingerprint: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._predictor is not None
+
+    def model(self):
+        current = self._model
+        if current is not None:
+            return current
+        with self._lock:
+            if self._model is None:
+                self._model = self._load_model()
+            return self._model
+
+    def predictor(self) -> ForestPredictor:
+        current = self._predictor
+        if current is not None:
+            return current
+        with self._lock:
+            if self._predictor is None:
+                fingerprint = _fingerprint(self.model_path)
+                self._predictor = ForestPredictor(self.model, self._load_flat(), self.max_flat_rows)
+                self.fingerprint = fingerprint
+            return self._predictor
+
+    def source(self) -> Optional[str]:
+        """Fingerprint of the model this handle serves: the loaded one, else the file on disk."""
+        return self.fingerprint if self._predictor is not None else _fingerprint(self.model_path)
+
+    def warmup(self):
+        """Load the prediction path now instead of on the first request."""
+        self.predictor()
+
+    def reload(self):
+        """Drop the loaded artifacts so the next use reads them from disk again."""
+        with self._lock:
+            self._model = None
+            self._predictor = None
+            self.fingerprint = None
+
+    def swap(self, new_model):
+        """Persist a fully fitted model and publish it; readers holding the old one are unaffected."""
+        import joblib
+
+        flat = self._flatten(new_model)
+        tmp_path = self.model_path + ".tmp"
+        joblib.dump(new_model, tmp_path)
+        os.replace(tmp_path, self.model_path)
+        if flat is not None:
+            flat.source_fingerprint = _fingerprint(self.model_path)
+            self._save_flat(flat)
+        with self._lock:
+            self._model = new_model
+            self._predictor = ForestPredictor(lambda: new_model, flat, self.max_flat_rows)
+            self.fingerprint = _fingerprint(self.model_path)
+            self.version += 1
+
+    def _load_model(self):
+        import joblib
+
+        try:
+            return joblib.load(self.model_path, mmap_mode=self.mmap_mode)
+        except Exception as e:
+            print("Model loading failed:", e)
+            from sklearn.ensemble import RandomForestClassifier
+            return RandomForestClassifier(n_estimators=100)
+
+    def _flatten(self, forest) -> Optional[FlatForest]:
+        if not self.flat_enabled:
+            return None
+        try:
+            flat = FlatForest.from_estimator(forest)
+        except Exception as e:
+            # Unfitted or unsupported estimator: sklearn's own predict_proba handles the error
+            print("Flattening model failed:", e)
+            return None
+        return flat
+
+    def _load_flat(self) -> Optional[FlatForest]:
+        if not self.flat_enabled:
+            return None
+        source = _fingerprint(self.model_path)
+        if os.path.exists(self.flat_path):
+            try:
+                flat = FlatForest.load(self.flat_path, mmap_mode=self.mmap_mode)
+                if source is not None and flat.source_fingerprint == source:
+                    return flat
+            except Exception as e:
+                print("Flat model loading failed:", e)
+        # Missing or stale cache: rebuild it from the sklearn model
+        flat = self._flatten(self.model())
+        if flat is not None:
+            flat.source_fingerprint = source
+            if self.write_flat:
+                self._save_flat(flat)
+        return flat
+
+    def _save_flat(self, flat: FlatForest):
+        try:
+            flat.save(self.flat_path)
+        except Exception as e:
+            print("Saving flat model failed:", e)
@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of complete prediction results.
+
+    Keys are digests of the quantized feature vector, the model version and the
+    image hash (see `make_key`), so a retrained model never serves old entries;
+    `clear()` is also called on every model swap to free them. Cached results
+    are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_s: float = 600.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(
+        vector: np.ndarray, model_version: int, image_digest: Optional[bytes] = None, variant: int = 0
+    ) -> bytes:
+        """`variant` separates response shapes of the same prediction (e.g. compact advice)."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(np.ascontiguousarray(vector, dtype=np.float64).tobytes())
+        h.update(int(model_version).to_bytes(8, "little", signed=True))
+        h.update(int(variant).to_bytes(2, "little"))
+        if image_digest:
+            h.update(image_digest)
+        return h.digest()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
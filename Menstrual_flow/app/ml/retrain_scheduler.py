@@ -0,0 +1,144 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+
+class RetrainScheduler:
+    """
+    Runs model retraining on a background thread instead of inside requests.
+
+    A retrain is triggered when `min_new_rows` rows have been saved since the
+    last run, when `max_interval_s` has elapsed with at least one new row, or
+    explicitly through `request()`. Requests arriving while a retrain is in
+    progress are coalesced into a single follow-up run; `train_fn` is called
+    with `full=True` if any of the coalesced requests asked for a full refit.
+
+    Only `start()` launches the background thread (the app calls it at startup).
+    Before that, and after `stop()`, new rows and requests are recorded but
+    nothing runs.
+    """
+
+    def __init__(
+        self,
+        train_fn: Callable[[], Any],
+        min_new_rows: int = 50,
+        max_interval_s: float = 3600.0,
+        poll_interval_s: float = 5.0,
+    ):
+        self._train_fn = train_fn
+        self.min_new_rows = max(1, int(min_new_rows))
+        self.max_interval_s = float(max_interval_s)
+        self.poll_interval_s = float(poll_interval_s)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._pending_rows = 0
+        self._requested: Optional[str] = None
+        self._full = False
+        self._running = False
+        self._last_finished = time.monotonic()
+
+        self.runs = 0
+        self.coalesced = 0
+        self.last_reason: Optional[str] = None
+        self.last_started_at: Optional[str] = None
+        self.last_duration_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="retrain-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout)
+
+    def notify_new_rows(self, n: int = 1):
+        """Record newly saved training rows; schedules a retrain once the threshold is hit."""
+        with self._lock:
+            self._pending_rows += n
+            due = self._pending_rows >= self.min_new_rows
+        if due:
+            self.request("new_rows")
+
+    def request(self, reason: str = "manual", full: bool = False) -> bool:
+        """Ask for a retrain. Returns False if it was folded into one already pending or running."""
+        with self._lock:
+            self._full = self._full or full
+            coalesced = self._requested is not None or self._running
+            if coalesced:
+                self.coalesced += 1
+            if self._requested is None:
+                self._requested = reason
+        self._wake.set()
+        return not coalesced
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._running,
+                "pending_rows": self._pending_rows,
+                "requested": self._requested,
+                "full_requested": self._full,
+                "runs": self.runs,
+                "coalesced_requests": self.coalesced,
+                "last_reason": self.last_reason,
+                "last_started_at": self.last_started_at,
+                "last_duration_s": self.last_duration_s,
+                "last_error": self.last_error,
+                "min_new_rows": self.min_new_rows,
+                "max_interval_s": self.max_interval_s,
+            }
+
+    def _due_reason(self) -> Optional[str]:
+        if self._requested is not None:
+            return self._requested
+        if self._pending_rows > 0 and time.monotonic() - self._last_finished >= self.max_interval_s:
+            return "interval"
+        return None
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval_s)
+            self._wake.clear()
+            with self._lock:
+                if self._stopping:
+                    return
+                reason = self._due_reason()
+                if reason is None:
+                    continue
+                full, self._full = self._full, False
+                self._requested = None
+                self._pending_rows = 0
+                self._running = True
+                self.last_reason = reason
+                self.last_started_at = datetime.utcnow().isoformat()
+
+            started = time.monotonic()
+            error = None
+            try:
+                self._train_fn(full=full)
+            except Exception as e:
+                error = str(e)
+                print("Background retraining failed:", e)
+
+            with self._lock:
+                self._running = False
+                self._last_finished = time.monotonic()
+                self.runs += 1
+                self.last_duration_s = round(self._last_finished - started, 3)
+                self.last_error = error
+                if self._requested is not None:
+                    self._wake.set()
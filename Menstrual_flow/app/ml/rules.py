@@ -0,0 +1,417 @@
+"""
+Table-driven condition and biomarker rules.
+
+The threshold tables below are compiled once at import into NumPy arrays, so a
+row (or a whole matrix of rows) is evaluated with a handful of vectorized
+operations instead of nested dict walks.
+"""
+import numpy as np
+
+# Condition detection thresholds based on medical literature
+CONDITION_RULES = {
+    "PCOS/PCOD Risk": {
+        "lh_level": {"min": 15, "weight": 0.25},  # LH > 15 mIU/mL
+        "fsh_level": {"max": 8, "weight": 0.2},   # FSH < 8 mIU/mL (LH:FSH ratio >2:1)
+        "amh_level": {"min": 4.0, "weight": 0.25}, # AMH > 4 ng/mL (very high)
+        "androgens": {"min": 80, "weight": 0.15}, # Testosterone > 80 ng/dL
+        "blood_glucose": {"min": 100, "weight": 0.1}, # Insulin resistance
+        "weight_gain": {"min": 5, "weight": 0.05}  # Weight gain
+    },
+    "PID Risk": {
+        "crp": {"min": 10, "weight": 0.3},        # CRP > 10 mg/L
+        "wbc_count": {"min": 11000, "weight": 0.25}, # WBC > 11,000 /µL
+        "fever": {"min": 37.5, "weight": 0.2},    # Fever > 37.5°C
+        "vaginal_ph": {"max": 4.5, "weight": 0.15}, # Vaginal pH < 4.5
+        "tenderness": {"min": 2, "weight": 0.1}   # Pelvic tenderness
+    },
+    "Endometriosis Risk": {
+        "estrogen": {"min": 350, "weight": 0.3},   # Estrogen > 350 pg/mL
+        "ca125": {"min": 35, "weight": 0.25},      # CA-125 > 35 U/mL
+        "pain_score": {"min": 7, "weight": 0.25},  # Pain score > 7/10
+        "pain_during_intercourse": {"min": 1, "weight": 0.2} # Dyspareunia
+    },
+    "Ovarian Cancer Risk": {
+        "ca125": {"min": 35, "weight": 0.4},       # CA-125 > 35 U/mL
+        "weight_loss": {"min": 5, "weight": 0.2},  # Unexplained weight loss
+        "bloating": {"min": 1, "weight": 0.2},     # Persistent bloating
+        "appetite_loss": {"min": 1, "weight": 0.2} # Loss of appetite
+    },
+    "Anemia Risk": {
+        "hb": {"max": 12, "weight": 0.6},          # Hemoglobin < 12 g/dL
+        "flow_ml": {"min": 80, "weight": 0.4}      # Heavy flow > 80ml
+    },
+    "Thyroid Imbalance": {
+        "tsh_level": {"min": 4.0, "weight": 0.4},  # TSH > 4.0 mIU/mL (hypothyroid)
+        "tsh_level_hyper": {"max": 0.4, "weight": 0.4}, # TSH < 0.4 mIU/mL (hyperthyroid)
+        "prolactin_level": {"min": 20, "weight": 0.2} # Prolactin > 20 ng/mL
+    },
+    "Diabetes Risk": {
+        "blood_glucose": {"min": 126, "weight": 0.5}, # Fasting glucose > 126 mg/dL
+        "hba1c_ratio": {"min": 6.5, "weight": 0.5}   # HbA1c > 6.5%
+    },
+    "Infection/Inflammation": {
+        "crp": {"min": 5, "weight": 0.3},          # CRP > 5 mg/L
+        "esr": {"min": 20, "weight": 0.25},        # ESR > 20 mm/hr
+        "wbc_count": {"min": 11000, "weight": 0.25}, # WBC > 11,000 /µL
+        "vaginal_ph": {"max": 5.0, "weight": 0.2}  # Abnormal vaginal pH
+    },
+    "Menorrhagia": {
+        "flow_ml": {"min": 80, "weight": 0.5},     # Flow > 80ml
+        "clots_score": {"min": 3, "weight": 0.3},  # Heavy clots
+        "pain_score": {"min": 6, "weight": 0.2}    # Pain during flow
+    }
+}
+
+# Per-biomarker bands for analyze_biomarkers: (biomarker, [(op, threshold, template), ...], default).
+# Bands are checked in order and the first match wins; `{v}` is the biomarker value.
+BIOMARKER_BANDS = [
+    ("crp", [
+        (">", 10, "🔴 CRP is HIGH ({v:.1f}) - Possible infection or inflammation"),
+        (">", 5, "🟡 CRP is ELEVATED ({v:.1f}) - Mild inflammation"),
+    ], "🟢 CRP is NORMAL ({v:.1f})"),
+    ("hb", [
+        ("<", 12, "🔴 Hemoglobin is LOW ({v:.1f}) - Possible anemia"),
+        ("<", 13, "🟡 Hemoglobin is BORDERLINE ({v:.1f}) - Monitor closely"),
+    ], "🟢 Hemoglobin is NORMAL ({v:.1f})"),
+    ("ph", [
+        ("<", 4.5, "🔴 pH is LOW ({v:.1f}) - Possible infection"),
+        ("<", 5.0, "🟡 pH is BORDERLINE ({v:.1f}) - Monitor"),
+    ], "🟢 pH is NORMAL ({v:.1f})"),
+    ("hba1c_ratio", [
+        (">", 6.5, "🔴 HbA1c is HIGH ({v:.1f}%) - Diabetes risk"),
+        (">", 5.7, "🟡 HbA1c is ELEVATED ({v:.1f}%) - Pre-diabetes"),
+    ], "🟢 HbA1c is NORMAL ({v:.1f}%)"),
+    ("flow_ml", [
+        (">", 100, "🔴 Flow is HEAVY ({v:.1f}ml) - Menorrhagia risk"),
+        (">", 60, "🟡 Flow is MODERATE ({v:.1f}ml) - Monitor"),
+    ], "🟢 Flow is NORMAL ({v:.1f}ml)"),
+    ("tsh_level", [
+        (">", 4.0, "🔴 TSH is HIGH ({v:.1f}) - Thyroid dysfunction"),
+        ("<", 0.4, "🔴 TSH is LOW ({v:.1f}) - Hyperthyroidism"),
+    ], "🟢 TSH is NORMAL ({v:.1f})"),
+    ("clots_score", [
+        (">", 3, "🔴 Clots are HEAVY ({v:.1f}) - Possible menorrhagia"),
+        (">", 1, "🟡 Clots are MODERATE ({v:.1f}) - Monitor"),
+    ], "🟢 Clots are NORMAL ({v:.1f})"),
+    ("fsh_level", [
+        (">", 8, "🔴 FSH is HIGH ({v:.1f}) - Possible PCOS"),
+    ], "🟢 FSH is NORMAL ({v:.1f})"),
+    ("lh_level", [
+        (">", 12, "🔴 LH is HIGH ({v:.1f}) - Possible PCOS"),
+    ], "🟢 LH is NORMAL ({v:.1f})"),
+    ("prolactin_level", [
+        (">", 20, "🔴 Prolactin is HIGH ({v:.1f}) - Thyroid issue"),
+    ], "🟢 Prolactin is NORMAL ({v:.1f})"),
+    ("esr", [
+        (">", 20, "🔴 ESR is ELEVATED ({v:.1f}) - Possible inflammation"),
+    ], "🟢 ESR is NORMAL ({v:.1f})"),
+    ("wbc_count", [
+        (">", 11000, "🔴 WBC is HIGH ({v:.0f}) - Possible infection"),
+        ("<", 4000, "🟡 WBC is LOW ({v:.0f}) - Immunosuppression risk"),
+    ], "🟢 WBC is NORMAL ({v:.0f})"),
+    ("ca125", [
+        (">", 35, "🔴 CA-125 is ELEVATED ({v:.1f}) - Endometriosis/Cancer risk"),
+    ], "🟢 CA-125 is NORMAL ({v:.1f})"),
+    ("estrogen", [
+        (">", 350, "🔴 Estrogen is HIGH ({v:.1f}) - Endometriosis risk"),
+        ("<", 50, "🟡 Estrogen is LOW ({v:.1f}) - Menopause/ovarian failure"),
+    ], "🟢 Estrogen is NORMAL ({v:.1f})"),
+    ("blood_glucose", [
+        (">", 126, "🔴 Blood Glucose is HIGH ({v:.1f}) - Diabetes"),
+        (">", 100, "🟡 Blood Glucose is ELEVATED ({v:.1f}) - Pre-diabetes"),
+    ], "🟢 Blood Glucose is NORMAL ({v:.1f})"),
+    ("pain_score", [
+        (">", 7, "🔴 Pain is SEVERE ({v:.1f}/10) - Medical attention needed"),
+        (">", 4, "🟡 Pain is MODERATE ({v:.1f}/10) - Monitor closely"),
+        (">", 0, "🟢 Pain is MILD ({v:.1f}/10)"),
+    ], "🟢 No pain reported"),
+]
+
+RISK_LEVELS = ("Low", "Moderate", "High")
+
+
+class ConditionTable:
+    """
+    CONDITION_RULES compiled into padded (condition x slot) arrays.
+
+    Every condition is padded to the same number of threshold slots; padded
+    slots have zero weight and are never matched. Scores are accumulated slot
+    by slot, in rule order, so they are bit-identical to summing the weights
+    one biomarker at a time.
+
+    Single rows use `detect_row`, which walks the same compiled table as plain
+    tuples; NumPy call overhead outweighs the arithmetic for one row.
+    """
+
+    def __init__(self, rules: dict):
+        self.names = list(rules.keys())
+        self.biomarkers = []
+        for thresholds in rules.values():
+            for biomarker in thresholds:
+                if biomarker not in self.biomarkers:
+                    self.biomarkers.append(biomarker)
+        self.biomarker_index = {b: i for i, b in enumerate(self.biomarkers)}
+        self.condition_biomarkers = [list(t.keys()) for t in rules.values()]
+
+        n_conditions = len(self.names)
+        n_slots = max(len(t) for t in rules.values())
+        self.feature_index = np.zeros((n_conditions, n_slots), dtype=np.intp)
+        self.weight = np.zeros((n_conditions, n_slots))
+        self.lower = np.zeros((n_conditions, n_slots))
+        self.upper = np.zeros((n_conditions, n_slots))
+        self.has_lower = np.zeros((n_conditions, n_slots), dtype=bool)
+        self.has_upper = np.zeros((n_conditions, n_slots), dtype=bool)
+        self.slot_used = np.zeros((n_conditions, n_slots), dtype=bool)
+        self.total_count = np.array([len(t) for t in rules.values()])
+
+        for c, thresholds in enumerate(rules.values()):
+            for k, (biomarker, criteria) in enumerate(thresholds.items()):
+                self.feature_index[c, k] = self.biomarker_index[biomarker]
+                self.weight[c, k] = criteria["weight"]
+                self.slot_used[c, k] = True
+                if "min" in criteria:
+                    self.lower[c, k] = criteria["min"]
+                    self.has_lower[c, k] = True
+                if "max" in criteria:
+                    self.upper[c, k] = criteria["max"]
+                    self.has_upper[c, k] = True
+
+        # A condition needs at least 40% of its biomarkers matched
+        self.min_matched = self.total_count * 0.4
+
+        self._rows = tuple(
+            (
+                name,
+                tuple(
+                    (biomarker, criteria["weight"], criteria.get("min"), criteria.get("max"))
+                    for biomarker, criteria in thresholds.items()
+                ),
+                len(thresholds),
+                len(thresholds) * 0.4,
+            )
+            for name, thresholds in rules.items()
+        )
+
+    def detect_row(self, features: dict, prob_dict: dict) -> list:
+        """detect_multiple_conditions for a single row."""
+        detected = []
+        for name, slots, total_count, min_matched in self._rows:
+            risk_score = 0.0
+            total_weight = 0.0
+            matched = 0
+            biomarkers = {}
+            for biomarker, weight, lower, upper in slots:
+                if biomarker in features:
+                    value = float(features[biomarker])
+                    biomarkers[biomarker] = value
+                    if (lower is not None and value >= lower) or (upper is not None and value <= upper):
+                        risk_score += weight
+                        matched += 1
+                    total_weight += weight
+
+            if total_weight <= 0 or matched < min_matched:
+                continue
+            final_score = risk_score / total_weight
+            if final_score < 0.3:
+                continue
+            prob_confidence = prob_dict.get(name, 0)
+            if final_score > 0.3 or prob_confidence > 0.2:
+                detected.append({
+                    "condition": name,
+                    "risk_level": "High" if final_score >= 0.7 else "Moderate" if final_score >= 0.5 else "Low",
+                    "confidence": max(final_score, prob_confidence),
+                    "biomarkers": biomarkers,
+                    "matched_count": matched,
+                    "total_count": total_count
+                })
+
+        detected.sort(key=lambda x: x["confidence"], reverse=True)
+        return detected
+
+    def gather(self, features_list: list):
+        """(values, present) matrices over self.biomarkers for a list of feature dicts."""
+        values = np.zeros((len(features_list), len(self.biomarkers)))
+        present = np.zeros((len(features_list), len(self.biomarkers)), dtype=bool)
+        for i, features in enumerate(features_list):
+            for j, biomarker in enumerate(self.biomarkers):
+                if biomarker in features:
+                    values[i, j] = float(features[biomarker])
+                    present[i, j] = True
+        return values, present
+
+    def evaluate(self, values: np.ndarray, present: np.ndarray, probs: np.ndarray):
+        """
+        Score every condition for every row.
+
+        `values`/`present` are (rows x biomarkers), `probs` is (rows x conditions)
+        with the model probability for each condition name (0 when the model
+        has no such class). Returns (final_score, matched, keep, level) arrays,
+        each (rows x conditions); `level` indexes RISK_LEVELS.
+        """
+        v = values[:, self.feature_index]
+        p = present[:, self.feature_index] & self.slot_used
+        hit = ((self.has_lower & (v >= self.lower)) | (self.has_upper & (v <= self.upper))) & p
+
+        n_rows = values.shape[0]
+        risk_score = np.zeros((n_rows, len(self.names)))
+        total_weight = np.zeros((n_rows, len(self.names)))
+        for k in range(self.weight.shape[1]):
+            risk_score = risk_score + np.where(hit[:, :, k], self.weight[:, k], 0.0)
+            total_weight = total_weight + np.where(p[:, :, k], self.weight[:, k], 0.0)
+        matched = hit.sum(axis=2)
+
+        has_weight = total_weight > 0
+        final_score = np.divide(risk_score, total_weight, out=np.zeros_like(risk_score), where=has_weight)
+        keep = (
+            has_weight
+            & (matched >= self.min_matched)
+            & (final_score >= 0.3)
+            & ((final_score > 0.3) | (probs > 0.2))
+        )
+        level = (final_score >= 0.5).astype(np.int8) + (final_score >= 0.7)
+        return final_score, matched, keep, level
+
+    def prob_matrix(self, prob_dicts: list) -> np.ndarray:
+        return np.array([[float(p.get(name, 0)) for name in self.names] for p in prob_dicts]).reshape(
+            len(prob_dicts), len(self.names)
+        )
+
+    def detect(self, features_list: list, prob_dicts: list) -> list:
+        """detect_multiple_conditions for many rows; one sorted detected list per row."""
+        detected = [[] for _ in features_list]
+        if not features_list:
+            return detected
+        values, present = self.gather(features_list)
+        final_score, matched, keep, level = self.evaluate(values, present, self.prob_matrix(prob_dicts))
+
+        for i, c in zip(*np.nonzero(keep)):
+            features = features_list[i]
+            name = self.names[c]
+            score = float(final_score[i, c])
+            detected[i].append({
+                "condition": name,
+                "risk_level": RISK_LEVELS[level[i, c]],
+                "confidence": max(score, prob_dicts[i].get(name, 0)),
+                "biomarkers": {k: float(features.get(k, 0)) for k in self.condition_biomarkers[c] if k in features},
+                "matched_count": int(matched[i, c]),
+                "total_count": int(self.total_count[c])
+            })
+
+        for row in detected:
+            row.sort(key=lambda x: x["confidence"], reverse=True)
+        return detected
+
+
+class BandTable:
+    """BIOMARKER_BANDS compiled into (biomarker x band) threshold arrays, plus a tuple form for single rows."""
+
+    def __init__(self, bands: list):
+        self.biomarkers = [b for b, _, _ in bands]
+        n_bands = max(len(rules) for _, rules, _ in bands)
+        self.threshold = np.zeros((len(bands), n_bands))
+        self.greater = np.zeros((len(bands), n_bands), dtype=bool)
+        self.band_used = np.zeros((len(bands), n_bands), dtype=bool)
+        self.band_count = np.array([len(rules) for _, rules, _ in bands])
+        for b, (_, rules, _) in enumerate(bands):
+            for k, (op, threshold, _) in enumerate(rules):
+                self.threshold[b, k] = threshold
+                self.greater[b, k] = op == ">"
+                self.band_used[b, k] = True
+        # Advice codes, laid out like the templates: the last entry of each row is the default band
+        self.codes = [
+            [self.code(biomarker, k) for k in range(len(rules))] + [self.code(biomarker, None)]
+            for biomarker, rules, _ in bands
+        ]
+        self._bands = bands
+        self._templates = None
+        self._rows = None
+
+    def _compiled(self):
+        """
+        (templates[b][band], per-row tuples), compiled on first use with the
+        advice template helpers; app.ml.advice imports this module, so they can
+        only be imported once both modules are loaded.
+        """
+        if self._rows is None:
+            from app.ml.advice import compile_template
+
+            templates = [
+                [compile_template(t) for _, _, t in rules] + [compile_template(default)]
+                for _, rules, default in self._bands
+            ]
+            self._templates = templates
+            self._rows = tuple(
+                (
+                    biomarker,
+                    tuple((op == ">", threshold, templates[b][k]) for k, (op, threshold, _) in enumerate(rules)),
+                    templates[b][-1],
+                )
+                for b, (biomarker, rules, _) in enumerate(self._bands)
+            )
+        return self._templates, self._rows
+
+    @staticmethod
+    def code(biomarker: str, band) -> str:
+        """Advice code of a band; band None is the default (normal) band."""
+        return f"biomarker.{biomarker}.{'normal' if band is None else band}"
+
+    def classify_row(self, features: dict) -> list:
+        """(advice code, {"v": value}) per biomarker for a single row, in analyze_row order."""
+        codes = []
+        for b, (biomarker, rules, _) in enumerate(self._compiled()[1]):
+            value = float(features.get(biomarker, 0))
+            band = len(rules)
+            for k, (greater, threshold, _) in enumerate(rules):
+                if (value > threshold) if greater else (value < threshold):
+                    band = k
+                    break
+            codes.append((self.codes[b][band], {"v": value}))
+        return codes
+
+    def render_codes(self, values: np.ndarray, bands: np.ndarray) -> list:
+        """classify_row's output for one row of `classify` results."""
+        return [
+            (self.codes[b][bands[b]], {"v": float(values[b])})
+            for b in range(len(self.biomarkers))
+        ]
+
+    def analyze_row(self, features: dict) -> list:
+        """analyze_biomarkers for a single row."""
+        from app.ml.advice import format_template
+
+        analysis = []
+        for biomarker, rules, default in self._compiled()[1]:
+            value = float(features.get(biomarker, 0))
+            template = default
+            for greater, threshold, t in rules:
+                if (value > threshold) if greater else (value < threshold):
+                    template = t
+                    break
+            analysis.append(format_template(template, value))
+        return analysis
+
+    def gather(self, features_list: list) -> np.ndarray:
+        return np.array(
+            [[float(f.get(b, 0)) for b in self.biomarkers] for f in features_list], dtype=float
+        ).reshape(len(features_list), len(self.biomarkers))
+
+    def classify(self, values: np.ndarray) -> np.ndarray:
+        """Index of the first matching band per (row, biomarker); band_count means the default band."""
+        v = values[:, :, None]
+        match = np.where(self.greater, v > self.threshold, v < self.threshold) & self.band_used
+        first = match.argmax(axis=2)
+        return np.where(match.any(axis=2), first, self.band_count)
+
+    def render(self, values: np.ndarray, bands: np.ndarray) -> list:
+        """Formatted analysis lines for one row of values and band indexes."""
+        from app.ml.advice import format_template
+
+        templates = self._compiled()[0]
+        return [
+            format_template(templates[b][bands[b]], float(values[b]))
+            for b in range(len(self.biomarkers))
+        ]
+
+
+CONDITIONS = ConditionTable(CONDITION_RULES)
+BANDS = BandTable(BIOMARKER_BANDS)
@@ -0,0 +1,105 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter_ns
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app import config
+
+# Upper bounds of the stage duration histogram buckets, in microseconds
+STAGE_BUCKETS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+Span = Tuple[str, int]
+
+# Spans of the request being handled, when a caller asked for them (Server-Timing)
+_current_spans: ContextVar[Optional[List[Span]]] = ContextVar("stage_spans", default=None)
+
+
+class StageStats:
+    """Per-stage count, total, max and duration histogram of prediction stages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, list] = {}
+
+    def record(self, stage: str, elapsed_ns: int):
+        with self._lock:
+            s = self._stages.get(stage)
+            if s is None:
+                # count, total_ns, max_ns, histogram
+                s = self._stages[stage] = [0, 0, 0, [0] * (len(STAGE_BUCKETS_US) + 1)]
+            s[0] += 1
+            s[1] += elapsed_ns
+            s[2] = max(s[2], elapsed_ns)
+            s[3][bisect_left(STAGE_BUCKETS_US, elapsed_ns / 1000.0)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                stage: {
+                    "count": count,
+                    "avg_us": round(total / count / 1000.0, 2),
+                    "max_us": round(max_ns / 1000.0, 2),
+                    "total_ms": round(total / 1e6, 3),
+                    "histogram_us": {
+                        **{f"<={b}": n for b, n in zip(STAGE_BUCKETS_US, hist)},
+                        f">{STAGE_BUCKETS_US[-1]}": hist[-1],
+                    },
+                }
+                for stage, (count, total, max_ns, hist) in self._stages.items()
+            }
+
+
+STATS = StageStats()
+
+
+def lap(stage: str, start_ns: int) -> int:
+    """
+    Record the time since `start_ns` as `stage` and return the current
+    perf_counter_ns(), so consecutive stages can be chained:
+
+        t = perf_counter_ns()
+        ...
+        t = lap("features", t)
+    """
+    now = perf_counter_ns()
+    if config.STAGE_TIMING_ENABLED:
+        elapsed = now - start_ns
+        STATS.record(stage, elapsed)
+        spans = _current_spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+    return now
+
+
+def record_spans(spans: Iterable[Span]):
+    """Merge spans measured elsewhere (an executor process) into the stats and current request."""
+    current = _current_spans.get()
+    for stage, elapsed in spans:
+        STATS.record(stage, elapsed)
+        if current is not None:
+            current.append((stage, elapsed))
+
+
+@contextmanager
+def collect():
+    """Collect the spans recorded in this context (and contexts copied from it) into a list."""
+    spans: List[Span] = []
+    token = _current_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_spans.reset(token)
+
+
+def server_timing(spans: Iterable[Span]) -> str:
+    """Format spans as a Server-Timing header value; repeated stages are summed."""
+    totals: Dict[str, int] = {}
+    for stage, elapsed in spans:
+        totals[stage] = totals.get(stage, 0) + elapsed
+    return ", ".join(f"{stage};dur={elapsed / 1e6:.3f}" for stage, elapsed in totals.items())
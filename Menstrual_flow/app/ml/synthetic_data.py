@@ -0,0 +1,260 @@
+"""
+Synthetic flow readings for training, load tests and benchmarks.
+
+    python -m app.ml.synthetic_data --rows 10000000 --format csv --out app/ml/synthetic_large.csv
+    python -m app.ml.synthetic_data --rows 10000000 --format npy --out app/ml/synthetic_large
+    python -m app.ml.synthetic_data --rows 1000000 --format db --users 5000
+
+Every row gets a label first (LABEL_PRIORS), then all EXPECTED_FEATURES are
+sampled from normal ranges with the label's PROFILES overriding the biomarkers
+that characterise it. Sampling is vectorized per chunk with a seeded
+np.random.Generator, so a (seed, chunk size) pair always produces the same rows.
+
+Formats:
+- csv: EXPECTED_FEATURES + label, the layout train_model.py reads (CSV
+  formatting dominates; prefer npy for tens of millions of rows);
+- npy: a directory with one memory-mappable float32 .npy per feature, int8
+  label codes in label.npy and the label names in meta.json;
+- db:  bulk inserts into flow_readings (swasthya_flow_new.db) and flow_data
+  (swasthya_flow.db).
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from app.ml.flow_data_schema import EXPECTED_FEATURES, ensure_flow_data_table
+
+LABELS = [
+    "Normal", "Anemia Risk", "Diabetes Risk", "Infection Suspected", "Menorrhagia",
+    "PCOS Risk", "Thyroid Imbalance", "Endometriosis Risk", "PID Risk", "Ovarian Cancer Risk",
+]
+LABEL_PRIORS = [0.3] + [0.7 / (len(LABELS) - 1)] * (len(LABELS) - 1)
+
+# Healthy ranges: feature -> (mean, std, min, max)
+CONTINUOUS = {
+    "flow_ml": (55, 20, 0, 250),
+    "hb": (13.0, 1.0, 6, 18),
+    "ph": (5.0, 0.3, 3.5, 8.0),
+    "crp": (2.5, 1.8, 0, 100),
+    "hba1c_ratio": (5.2, 0.4, 4.0, 14.0),
+    "clots_score": (1.0, 0.9, 0, 5),
+    "fsh_level": (6.5, 1.8, 1, 25),
+    "lh_level": (7.5, 2.5, 1, 40),
+    "amh_level": (2.5, 1.0, 0.1, 15),
+    "tsh_level": (2.0, 0.8, 0.05, 15),
+    "prolactin_level": (12.5, 4.0, 2, 60),
+    "esr": (12, 4, 1, 120),
+    "leukocyte_count": (7000, 1500, 2000, 30000),
+    "vaginal_ph": (4.3, 0.25, 3.5, 7.5),
+    "ca125": (18, 8, 1, 600),
+    "estrogen": (180, 80, 20, 800),
+    "progesterone": (9, 4.5, 0.2, 30),
+    "androgens": (45, 15, 5, 200),
+    "blood_glucose": (88, 10, 50, 350),
+    "wbc_count": (7500, 1800, 2000, 30000),
+    "pain_score": (2.5, 1.8, 0, 10),
+    "weight_gain": (1.0, 1.5, 0, 25),
+    "acne_severity": (0.8, 0.8, 0, 5),
+    "fever": (36.9, 0.3, 35.5, 41.5),
+}
+# Rounded after sampling
+INTEGER = {"clots_score", "leukocyte_count", "wbc_count", "pain_score", "weight_gain", "acne_severity"}
+# 0/1 features: feature -> probability of 1
+BINARY = {
+    "insulin_resistance": 0.15, "tenderness": 0.15, "pain_during_intercourse": 0.1, "bloating": 0.25,
+    "weight_loss": 0.1, "appetite_loss": 0.1, "vaginal_discharge": 0.2, "discharge_odor": 0.1,
+    "discharge_color": 0.1,
+}
+
+# Per-label overrides: (mean, std) for continuous features, probability for binary ones
+PROFILES = {
+    "Anemia Risk": {"hb": (9.3, 0.9), "flow_ml": (115, 30), "fever": (36.8, 0.3)},
+    "Diabetes Risk": {"hba1c_ratio": (7.6, 0.8), "blood_glucose": (165, 30), "insulin_resistance": 0.8, "weight_gain": (5, 3)},
+    "Infection Suspected": {
+        "crp": (22, 9), "fever": (38.4, 0.6), "wbc_count": (14500, 3000), "leukocyte_count": (12000, 2500),
+        "esr": (38, 12), "discharge_odor": 0.7,
+    },
+    "Menorrhagia": {"flow_ml": (155, 28), "clots_score": (3.6, 0.9), "hb": (11.8, 1.0)},
+    "PCOS Risk": {
+        "lh_level": (18, 4), "amh_level": (7.0, 1.5), "androgens": (95, 18), "acne_severity": (3, 1),
+        "weight_gain": (7, 3), "insulin_resistance": 0.55,
+    },
+    "Thyroid Imbalance": {"tsh_level": (6.8, 1.8), "prolactin_level": (22, 6), "weight_gain": (4, 2.5)},
+    "Endometriosis Risk": {
+        "pain_score": (7.6, 1.2), "ca125": (70, 25), "pain_during_intercourse": 0.8, "bloating": 0.75,
+    },
+    "PID Risk": {
+        "crp": (14, 6), "fever": (38.1, 0.5), "tenderness": 0.85, "vaginal_discharge": 0.85,
+        "discharge_color": 0.7, "pain_score": (6, 1.5),
+    },
+    "Ovarian Cancer Risk": {
+        "ca125": (210, 70), "bloating": 0.85, "weight_loss": 0.7, "appetite_loss": 0.7, "pain_score": (5, 1.8),
+    },
+}
+
+
+def generate_chunk(rng: np.random.Generator, n: int):
+    """(features, label codes): features maps each EXPECTED_FEATURES name to a float64 array of length n."""
+    codes = rng.choice(len(LABELS), size=n, p=LABEL_PRIORS).astype(np.int8)
+    cols = {}
+    for name in EXPECTED_FEATURES:
+        if name in BINARY:
+            cols[name] = (rng.random(n) < BINARY[name]).astype(np.float64)
+        else:
+            mean, std, _, _ = CONTINUOUS[name]
+            cols[name] = rng.normal(mean, std, n)
+
+    for code, label in enumerate(LABELS):
+        profile = PROFILES.get(label)
+        if not profile:
+            continue
+        idx = np.flatnonzero(codes == code)
+        if not idx.size:
+            continue
+        for name, spec in profile.items():
+            if name in BINARY:
+                cols[name][idx] = rng.random(idx.size) < spec
+            else:
+                cols[name][idx] = rng.normal(spec[0], spec[1], idx.size)
+
+    for name, (_, _, lo, hi) in CONTINUOUS.items():
+        np.clip(cols[name], lo, hi, out=cols[name])
+        if name in INTEGER:
+            np.rint(cols[name], out=cols[name])
+    return {name: cols[name] for name in EXPECTED_FEATURES}, codes
+
+
+def iter_chunks(rows: int, seed: int = 42, chunk_size: int = 500_000):
+    """Yield (offset, features, codes) chunks covering `rows` rows."""
+    rng = np.random.default_rng(seed)
+    for offset in range(0, rows, chunk_size):
+        features, codes = generate_chunk(rng, min(chunk_size, rows - offset))
+        yield offset, features, codes
+
+
+def write_csv(path, rows: int, seed: int = 42, chunk_size: int = 500_000):
+    import pandas as pd
+
+    labels = np.array(LABELS, dtype=object)
+    for offset, features, codes in iter_chunks(rows, seed, chunk_size):
+        # round() then default formatting is ~1.5x faster than to_csv(float_format=...)
+        df = pd.DataFrame(features).round(4)
+        df["label"] = labels[codes]
+        df.to_csv(path, mode="w" if offset == 0 else "a", header=offset == 0, index=False)
+
+
+def write_npy(directory, rows: int, seed: int = 42, chunk_size: int = 500_000):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    outputs = {
+        name: np.lib.format.open_memmap(directory / f"{name}.npy", mode="w+", dtype=np.float32, shape=(rows,))
+        for name in EXPECTED_FEATURES
+    }
+    label_out = np.lib.format.open_memmap(directory / "label.npy", mode="w+", dtype=np.int8, shape=(rows,))
+    for offset, features, codes in iter_chunks(rows, seed, chunk_size):
+        end = offset + len(codes)
+        for name, values in features.items():
+            outputs[name][offset:end] = values
+        label_out[offset:end] = codes
+    for array in list(outputs.values()) + [label_out]:
+        array.flush()
+    (directory / "meta.json").write_text(json.dumps(
+        {"rows": rows, "seed": seed, "chunk_size": chunk_size, "features": EXPECTED_FEATURES, "labels": LABELS},
+        indent=2,
+    ))
+
+
+def load_db(rows: int, seed: int = 42, chunk_size: int = 100_000, users: int = 1000,
+            start: datetime = datetime(2025, 1, 1), step_s: int = 3600,
+            flow_readings: bool = True, flow_data: bool = True):
+    """
+    Bulk-insert generated rows, one transaction per chunk. flow_readings rows are
+    spread round-robin over `users` synthetic emails, so each user gets a series
+    of readings `step_s` seconds apart. Only columns present in each table are filled.
+    """
+    from sqlalchemy import inspect
+
+    from app.database import engine
+    from app.storage.engine import flow_data_connection
+    from app.storage.model import FlowReading
+
+    if flow_readings:
+        FlowReading.__table__.create(bind=engine, checkfirst=True)
+        existing = {c["name"] for c in inspect(engine).get_columns("flow_readings")}
+        reading_cols = [name for name in EXPECTED_FEATURES if name in existing]
+        reading_sql = (
+            f"INSERT INTO flow_readings (user_email, cycle_id, timestamp, {','.join(reading_cols)}) "
+            f"VALUES ({','.join(['?'] * (len(reading_cols) + 3))})"
+        )
+        emails = np.array([f"synthetic{u}@example.com" for u in range(users)], dtype=object)
+        base = np.datetime64(start, "us")
+    if flow_data:
+        data_conn = flow_data_connection()
+        ensure_flow_data_table(data_conn)
+        existing = {row[1] for row in data_conn.execute("PRAGMA table_info(flow_data)")}
+        data_cols = [name for name in EXPECTED_FEATURES if name in existing]
+        data_sql = (
+            f"INSERT INTO flow_data ({','.join(data_cols)}, label) "
+            f"VALUES ({','.join(['?'] * (len(data_cols) + 1))})"
+        )
+    labels = np.array(LABELS, dtype=object)
+
+    try:
+        for offset, features, codes in iter_chunks(rows, seed, chunk_size):
+            n = len(codes)
+            if flow_readings:
+                index = np.arange(offset, offset + n)
+                offsets = (index // users) * step_s * 1_000_000
+                stamps = np.datetime_as_string(base + offsets.astype("timedelta64[us]"))
+                stamps = np.char.replace(stamps, "T", " ")
+                columns = [emails[index % users].tolist(), ["synthetic"] * n, stamps.tolist()]
+                columns += [np.round(features[name], 4).tolist() for name in reading_cols]
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(reading_sql, list(zip(*columns)))
+            if flow_data:
+                columns = [np.round(features[name], 4).tolist() for name in data_cols]
+                columns.append(labels[codes].tolist())
+                data_conn.executemany(data_sql, zip(*columns))
+                data_conn.commit()
+    finally:
+        if flow_data:
+            data_conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic flow readings")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=500_000)
+    parser.add_argument("--format", choices=["csv", "npy", "db"], default="csv")
+    parser.add_argument("--out", default="app/ml/synthetic_flow_data.csv",
+                        help="CSV file or npy directory (ignored for db)")
+    parser.add_argument("--users", type=int, default=1000, help="db: distinct user emails for flow_readings")
+    parser.add_argument("--tables", choices=["both", "flow_readings", "flow_data"], default="both")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.format == "csv":
+        write_csv(args.out, args.rows, args.seed, args.chunk_size)
+    elif args.format == "npy":
+        write_npy(args.out, args.rows, args.seed, args.chunk_size)
+    else:
+        load_db(
+            args.rows, args.seed, min(args.chunk_size, 100_000), users=args.users,
+            flow_readings=args.tables in ("both", "flow_readings"),
+            flow_data=args.tables in ("both", "flow_data"),
+        )
+    elapsed = time.perf_counter() - started
+    target = args.out if args.format != "db" else args.tables
+    print(f"{args.rows} synthetic rows written to {target} in {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
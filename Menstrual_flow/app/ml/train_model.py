@@ -1,8 +1,33 @@
-import pandas as pd
+"""
+Train the flow risk model.
+
+    python app/ml/train_model.py [--data CSV] [--n-estimators 200] [--force]
+    python app/ml/train_model.py --sweep
+
+Training is skipped when the model artifact was already built from the same
+dataset bytes and hyperparameters (fingerprint stored in MODEL.meta.json). The
+parsed feature matrix is cached next to the CSV as .npy files keyed by the CSV
+hash and opened memory-mapped, so reruns do not reparse the CSV. Fitting uses
+all cores. --sweep cross-validates a small hyperparameter grid in parallel and
+records fit time, predict latency and accuracy per configuration.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
 import joblib
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import cross_validate, train_test_split
 from sklearn.ensemble import RandomForestClassifier
 
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from app.ml.image_features import DESCRIPTOR_SIZE, extract_descriptor
+
 EXPECTED_FEATURES = [
     "flow_ml", "hb", "ph", "crp", "hba1c_ratio",
     "clots_score", "fsh_level", "lh_level",
@@ -11,18 +36,206 @@ EXPECTED_FEATURES = [
     "pain_score", "weight_gain", "acne_severity", "insulin_resistance", "fever", "tenderness", "pain_during_intercourse", "bloating", "weight_loss", "appetite_loss", "vaginal_discharge", "discharge_odor", "discharge_color"
 ]
 
-df = pd.read_csv("app/ml/synthetic_flow_dataset.csv")
+DATA_PATH = "app/ml/synthetic_flow_dataset.csv"
+MODEL_PATH = "app/ml/model.joblib"
+SWEEP_RESULTS_PATH = "app/ml/sweep_results.json"
+
+DEFAULT_PARAMS = {"n_estimators": 200, "max_depth": None, "min_samples_leaf": 1, "random_state": 42}
+
+# Grid for --sweep
+SWEEP_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [None, 12],
+    "min_samples_leaf": [1, 3],
+}
+
+
+def file_hash(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(data_hash: str, params: dict) -> str:
+    """Identity of a training run: dataset bytes, feature list and hyperparameters."""
+    payload = json.dumps(
+        {"data": data_hash, "features": EXPECTED_FEATURES, "params": params}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _cache_paths(data_path: Path, data_hash: str):
+    prefix = f"{data_path.stem}.{data_hash[:12]}"
+    return data_path.with_name(prefix + ".X.npy"), data_path.with_name(prefix + ".y.npy")
+
+
+def load_dataset(data_path=DATA_PATH):
+    """
+    Feature matrix and labels for a CSV, from the .npy cache when the CSV is
+    unchanged. Cached arrays are opened read-only and memory-mapped.
+    Image descriptors (optional image_path column) are part of the cached matrix;
+    image files are assumed not to change under the same path.
+    """
+    data_path = Path(data_path)
+    data_hash = file_hash(data_path)
+    x_path, y_path = _cache_paths(data_path, data_hash)
+    if x_path.exists() and y_path.exists():
+        print(f"Using cached feature matrix {x_path}")
+        return np.load(x_path, mmap_mode="r"), np.load(y_path, mmap_mode="r"), data_hash
+
+    import pandas as pd
+
+    df = pd.read_csv(data_path)
+    X = df[EXPECTED_FEATURES].to_numpy(dtype=np.float64)
+    y = df["label"].to_numpy(dtype=str)
+
+    # Optional image_path column: append the same descriptor the API extracts at prediction time.
+    # Rows without an image get zeros, which is also what the API uses when no image is sent.
+    if "image_path" in df.columns:
+        descriptors = np.zeros((len(df), DESCRIPTOR_SIZE))
+        for i, path in enumerate(df["image_path"]):
+            if isinstance(path, str) and path:
+                descriptors[i] = extract_descriptor(Path(path).read_bytes())
+        X = np.hstack([X, descriptors])
+
+    # Drop caches of earlier versions of this CSV, then write atomically
+    for old in data_path.parent.glob(f"{data_path.stem}.*.npy"):
+        old.unlink()
+    for path, array in ((x_path, X), (y_path, y)):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        tmp.replace(path)
+    return X, y, data_hash
+
+
+def _meta_path(model_path) -> Path:
+    return Path(str(model_path) + ".meta.json")
+
+
+def artifact_fingerprint(model_path=MODEL_PATH):
+    meta = _meta_path(model_path)
+    if not Path(model_path).exists() or not meta.exists():
+        return None
+    try:
+        return json.loads(meta.read_text()).get("fingerprint")
+    except (OSError, ValueError):
+        return None
+
+
+def train(data_path=DATA_PATH, model_path=MODEL_PATH, params=None, force: bool = False):
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    X, y, data_hash = load_dataset(data_path)
+    fp = fingerprint(data_hash, params)
+    if not force and artifact_fingerprint(model_path) == fp:
+        print(f"{model_path} is up to date (fingerprint {fp}), skipping training")
+        return None
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    model = RandomForestClassifier(**params, n_jobs=-1)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - started
+    train_acc = model.score(X_train, y_train)
+    test_acc = model.score(X_test, y_test)
+    # The API scores one row at a time; a parallel predict would only add thread overhead there
+    model.set_params(n_jobs=None)
+
+    joblib.dump(model, model_path)
+    _meta_path(model_path).write_text(json.dumps({
+        "fingerprint": fp,
+        "data": str(data_path),
+        "data_sha256": data_hash,
+        "params": params,
+        "fit_s": round(fit_s, 3),
+        "train_accuracy": train_acc,
+        "test_accuracy": test_acc,
+    }, indent=2))
+
+    print(f"Model trained in {fit_s:.2f}s and saved to {model_path}")
+    print("Training accuracy:", train_acc)
+    print("Testing accuracy:", test_acc)
+    return model
+
+
+def _predict_latency_us(model, X, repeats: int = 50) -> tuple:
+    """Median single-row latency and per-row cost of a full-matrix predict_proba, in microseconds."""
+    row = np.asarray(X[:1])
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    model.predict_proba(X)
+    batch = time.perf_counter() - started
+    return float(np.median(timings) * 1e6), batch / len(X) * 1e6
+
+
+def sweep(data_path=DATA_PATH, grid=None, folds: int = 5, results_path=SWEEP_RESULTS_PATH) -> list:
+    """Cross-validate every configuration of `grid`; folds run in parallel on all cores."""
+    grid = grid or SWEEP_GRID
+    X, y, data_hash = load_dataset(data_path)
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    results = []
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = {**DEFAULT_PARAMS, **dict(zip(names, values))}
+        # Parallelism is across folds, so each forest fits on one core
+        cv = cross_validate(
+            RandomForestClassifier(**params, n_jobs=1), X_train, y_train, cv=folds, n_jobs=-1
+        )
+        model = RandomForestClassifier(**params, n_jobs=1).fit(X_train, y_train)
+        single_us, batch_row_us = _predict_latency_us(model, X_test)
+        result = {
+            "params": params,
+            "cv_accuracy": round(float(cv["test_score"].mean()), 4),
+            "cv_accuracy_std": round(float(cv["test_score"].std()), 4),
+            "fit_s": round(float(cv["fit_time"].mean()), 4),
+            "predict_single_us": round(single_us, 1),
+            "predict_batch_row_us": round(batch_row_us, 2),
+        }
+        results.append(result)
+        print(
+            f"{json.dumps(dict(zip(names, values)))}: acc {result['cv_accuracy']:.4f} "
+            f"fit {result['fit_s']:.2f}s single {result['predict_single_us']:.0f}us"
+        )
+
+    results.sort(key=lambda r: (-r["cv_accuracy"], r["predict_single_us"]))
+    Path(results_path).write_text(json.dumps({"data_sha256": data_hash, "results": results}, indent=2))
+    print(f"Sweep results written to {results_path}")
+    return results
 
-X = df[EXPECTED_FEATURES].values
-y = df["label"].values
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the flow risk model")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--n-estimators", type=int, default=DEFAULT_PARAMS["n_estimators"])
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_PARAMS["max_depth"])
+    parser.add_argument("--min-samples-leaf", type=int, default=DEFAULT_PARAMS["min_samples_leaf"])
+    parser.add_argument("--force", action="store_true", help="retrain even if the artifact is up to date")
+    parser.add_argument("--sweep", action="store_true", help="run the hyperparameter sweep instead of training")
+    args = parser.parse_args(argv)
 
-model = RandomForestClassifier(n_estimators=200, random_state=42)
-model.fit(X_train, y_train)
+    if args.sweep:
+        sweep(args.data)
+        return
+    train(
+        args.data,
+        args.model,
+        params={
+            "n_estimators": args.n_estimators,
+            "max_depth": args.max_depth,
+            "min_samples_leaf": args.min_samples_leaf,
+        },
+        force=args.force,
+    )
 
-joblib.dump(model, "app/ml/model.joblib")
 
-print("Model trained and saved to app/ml/model.joblib")
-print("Training accuracy:", model.score(X_train, y_train))
-print("Testing accuracy:", model.score(X_test, y_test))
+if __name__ == "__main__":
+    main()
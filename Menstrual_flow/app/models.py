@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List
 
 ########## Input for single reading ##########
 class Reading(BaseModel):
@@ -10,4 +10,13 @@ class Reading(BaseModel):
 
 ########## Input for batch(multiple) readings ##########
 class BatchReadings(BaseModel):
-    readings: List[Reading]
+    # Rows are raw objects checked one by one in data_service.add_readings_batch,
+    # so a bad row gets an "invalid" status instead of a 422 for the whole batch
+    readings: List[Dict[str, Any]] = Field(
+        ...,
+        description=(
+            "Reading objects: timestamp, flow_ml and user_email are required, and any other "
+            "flow_readings column (cycle_id, labs, sensor values) may be set"
+        ),
+        examples=[[{"user_email": "user@example.com", "timestamp": "2025-01-01T08:00:00Z", "flow_ml": 4.5, "hb": 12.1}]],
+    )
@@ -1,6 +1,6 @@
 from typing import Dict, Any, List
 from collections import defaultdict
-from app.services.data_service import list_all_readings
+from app.services.data_service import list_all_readings, list_all_readings_async
 
 def _sum_flow_by_cycle(readings: list) -> dict:
     totals = defaultdict(float)
@@ -19,8 +19,14 @@ def _get_latest_metric(readings: list, field: str):
 
 
 def compute_summary(user_email: str) -> Dict[str, Any]:
-    readings = list_all_readings(user_email)
+    return summarize_readings(user_email, list_all_readings(user_email))
 
+
+async def compute_summary_async(user_email: str) -> Dict[str, Any]:
+    return summarize_readings(user_email, await list_all_readings_async(user_email))
+
+
+def summarize_readings(user_email: str, readings: list) -> Dict[str, Any]:
     # Pull latest values for each metric
     hb = _get_latest_metric(readings, "hb")
     ph = _get_latest_metric(readings, "ph")
@@ -1,7 +1,61 @@
-from app.database import SessionLocal
+import base64
+import json
+import math
+from datetime import datetime, timezone
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+
+from app import config
+from app.database import SessionLocal, engine
+from app.models import Reading
+from app.services.ingest_buffer import IngestBuffer
+from app.storage import timeseries
+from app.storage.engine import async_readings_session
 from app.storage.model import FlowReading
 
 
+def _full_reading_dict(r) -> dict:
+    return {
+        "id": r.id,
+        "user_email": r.user_email,
+        "cycle_id": r.cycle_id,
+        "flow_ml": r.flow_ml,
+        "hb": r.hb,
+        "ph": r.ph,
+        "crp": r.crp,
+        "hba1c_ratio": r.hba1c_ratio,
+        "clots_score": r.clots_score,
+        "fsh_level": r.fsh_level,
+        "lh_level": r.lh_level,
+        "amh_level": r.amh_level,
+        "tsh_level": r.tsh_level,
+        "prolactin_level": r.prolactin_level,
+        # Gas sensor data
+        "co2_ppm": r.co2_ppm,
+        "co_ppm": r.co_ppm,
+        "no2_ppb": r.no2_ppb,
+        "o3_ppb": r.o3_ppb,
+        "pm25_ugm3": r.pm25_ugm3,
+        "pm10_ugm3": r.pm10_ugm3,
+        "temperature_c": r.temperature_c,
+        "humidity_pct": r.humidity_pct,
+        "air_quality_index": r.air_quality_index,
+        "air_quality_category": r.air_quality_category,
+        # TCS230 Color sensor data
+        "color_red": r.color_red,
+        "color_green": r.color_green,
+        "color_blue": r.color_blue,
+        "color_clear": r.color_clear,
+        "color_hue": r.color_hue,
+        "color_saturation": r.color_saturation,
+        "color_brightness": r.color_brightness,
+        "color_temperature": r.color_temperature,
+        "color_category": r.color_category,
+        "timestamp": r.timestamp.isoformat() if r.timestamp else None,
+    }
+
+
 def list_all_readings(user_email: str):
     """Return all readings for a given user as list of dicts (metric/value format)."""
     session = SessionLocal()
@@ -12,52 +66,257 @@ def list_all_readings(user_email: str):
             .order_by(FlowReading.timestamp)
             .all()
         )
-        return [
-            {
-                "id": r.id,
-                "user_email": r.user_email,
-                "cycle_id": r.cycle_id,
-                "flow_ml": r.flow_ml,
-                "hb": r.hb,
-                "ph": r.ph,
-                "crp": r.crp,
-                "hba1c_ratio": r.hba1c_ratio,
-                "clots_score": r.clots_score,
-                "fsh_level": r.fsh_level,
-                "lh_level": r.lh_level,
-                "amh_level": r.amh_level,
-                "tsh_level": r.tsh_level,
-                "prolactin_level": r.prolactin_level,
-                # Gas sensor data
-                "co2_ppm": r.co2_ppm,
-                "co_ppm": r.co_ppm,
-                "no2_ppb": r.no2_ppb,
-                "o3_ppb": r.o3_ppb,
-                "pm25_ugm3": r.pm25_ugm3,
-                "pm10_ugm3": r.pm10_ugm3,
-                "temperature_c": r.temperature_c,
-                "humidity_pct": r.humidity_pct,
-                "air_quality_index": r.air_quality_index,
-                "air_quality_category": r.air_quality_category,
-                # TCS230 Color sensor data
-                "color_red": r.color_red,
-                "color_green": r.color_green,
-                "color_blue": r.color_blue,
-                "color_clear": r.color_clear,
-                "color_hue": r.color_hue,
-                "color_saturation": r.color_saturation,
-                "color_brightness": r.color_brightness,
-                "color_temperature": r.color_temperature,
-                "color_category": r.color_category,
-                "timestamp": r.timestamp.isoformat() if r.timestamp else None,
-            }
-            for r in rows
-        ]
+        return [_full_reading_dict(r) for r in rows]
+    finally:
+        session.close()
+
+
+async def list_all_readings_async(user_email: str):
+    """list_all_readings on the async engine."""
+    async with async_readings_session() as session:
+        result = await session.execute(
+            select(FlowReading)
+            .where(FlowReading.user_email == user_email)
+            .order_by(FlowReading.timestamp)
+        )
+        return [_full_reading_dict(r) for r in result.scalars()]
+
+
+def encode_cursor(timestamp, reading_id: int) -> str:
+    """Opaque keyset cursor for the reading after which the next page starts."""
+    raw = json.dumps([timestamp.isoformat(), reading_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """(timestamp, id) from an encode_cursor token; raises ValueError when it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        ts, reading_id = json.loads(raw)
+        return datetime.fromisoformat(ts), int(reading_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _reading_dict(row) -> dict:
+    item = row._asdict()
+    item["timestamp"] = item["timestamp"].isoformat() if item["timestamp"] else None
+    return item
+
+
+def readings_page(user_email: str, fields=None, cursor: str = None, limit: int = 100, start=None, end=None):
+    """
+    One page of a user's readings in (timestamp, id) order, selecting only `fields`
+    (plus id and timestamp). Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    session = SessionLocal()
+    try:
+        # One extra row tells whether another page follows
+        rows = timeseries.since(session, user_email, after, limit + 1, fields, start, end)
     finally:
         session.close()
+    next_cursor = encode_cursor(rows[limit - 1].timestamp, rows[limit - 1].id) if len(rows) > limit else None
+    return [_reading_dict(r) for r in rows[:limit]], next_cursor
+
+
+def iter_reading_pages(user_email: str, fields=None, cursor: str = None, page_size: int = 1000, start=None, end=None):
+    """
+    Every reading after `cursor` as a generator of pages (lists of dicts), one
+    keyset query per page, so memory stays flat and no connection is held while
+    the caller consumes a page. Bad fields or cursors raise ValueError here, before iteration.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    timeseries.validate_columns(fields)
+    return _iter_pages(user_email, fields, after, page_size, start, end)
+
+
+def _iter_pages(user_email: str, fields, after, page_size: int, start, end):
+    while True:
+        session = SessionLocal()
+        try:
+            rows = timeseries.since(session, user_email, after, page_size, fields, start, end)
+        finally:
+            session.close()
+        if rows:
+            yield [_reading_dict(row) for row in rows]
+        if len(rows) < page_size:
+            return
+        after = (rows[-1].timestamp, rows[-1].id)
+
+
+async def readings_page_async(user_email: str, fields=None, cursor: str = None, limit: int = 100, start=None, end=None):
+    """readings_page on the async engine."""
+    after = decode_cursor(cursor) if cursor else None
+    async with async_readings_session() as session:
+        result = await session.execute(timeseries.since_query(user_email, after, limit + 1, fields, start, end))
+        rows = result.all()
+    next_cursor = encode_cursor(rows[limit - 1].timestamp, rows[limit - 1].id) if len(rows) > limit else None
+    return [_reading_dict(r) for r in rows[:limit]], next_cursor
+
 
+def iter_reading_pages_async(user_email: str, fields=None, cursor: str = None, page_size: int = 1000, start=None, end=None):
+    """iter_reading_pages as an async generator; bad fields or cursors still raise ValueError before iteration."""
+    after = decode_cursor(cursor) if cursor else None
+    timeseries.validate_columns(fields)
+    return _aiter_pages(user_email, fields, after, page_size, start, end)
+
+
+async def _aiter_pages(user_email: str, fields, after, page_size: int, start, end):
+    while True:
+        async with async_readings_session() as session:
+            result = await session.execute(timeseries.since_query(user_email, after, page_size, fields, start, end))
+            rows = result.all()
+        if rows:
+            yield [_reading_dict(row) for row in rows]
+        if len(rows) < page_size:
+            return
+        after = (rows[-1].timestamp, rows[-1].id)
+
+
+# Columns a batch row may set, with the Python type each expects
+_BATCH_COLUMNS = {
+    c.name: c.type.python_type for c in FlowReading.__table__.columns if c.name != "id"
+}
+
+
+def _validate_batch_row(row: dict) -> dict:
+    """Normalized column values for one batch row; raises ValueError with the reason it is rejected."""
+    if not isinstance(row, dict):
+        raise ValueError("Reading must be a JSON object")
+    try:
+        # Reading checks the required fields; the other columns are checked below
+        row = {**row, **Reading.parse_obj(row).dict()}
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+        ))
+    unknown = [k for k in row if k not in _BATCH_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    values = {}
+    for name, value in row.items():
+        expected = _BATCH_COLUMNS[name]
+        if value is None or name == "timestamp":
+            values[name] = value
+        elif expected is str:
+            values[name] = str(value)
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{name} must be a finite number")
+        elif expected is int and value != int(value):
+            raise ValueError(f"{name} must be a whole number")
+        else:
+            values[name] = expected(value)
+    ts = values["timestamp"]
+    if ts.tzinfo is not None:
+        # Stored timestamps are naive UTC, like datetime.utcnow() elsewhere
+        values["timestamp"] = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return values
+
+
+def add_readings_batch(rows: list, upsert: bool = False) -> dict:
+    """
+    Insert many readings in one transaction with executemany.
+
+    Rows are validated in one pass; invalid rows are reported and skipped. With
+    `upsert`, a row whose (user_email, timestamp) already exists, in the table or
+    earlier in the batch, updates that reading instead, so device retries do not
+    duplicate data; of repeats within the batch the last one wins and the others
+    are reported as "duplicate". (user_email, timestamp) is not unique in the
+    table (single readings are stored as they come), so when several readings
+    already share the key only the newest one (highest id) is updated and the
+    older copies are left as they are. Returns per-row statuses ("inserted", "updated",
+    "duplicate", "invalid") in input order plus counts.
+    """
+    statuses = [None] * len(rows)
+    valid = []
+    for i, row in enumerate(rows):
+        try:
+            valid.append((i, _validate_batch_row(row)))
+        except (ValueError, TypeError) as e:
+            statuses[i] = {"index": i, "status": "invalid", "error": str(e)}
+
+    params = list(zip([i for i, _ in valid], _uniform_rows([values for _, values in valid])))
+
+    readings = FlowReading.__table__
+    inserts, updates = [], []
+    with engine.begin() as conn:
+        existing = {}
+        if upsert and params:
+            emails = {p["user_email"] for _, p in params}
+            stamps = [p["timestamp"] for _, p in params]
+            # One indexed range lookup for the whole batch
+            found = conn.execute(
+                select(readings.c.id, readings.c.user_email, readings.c.timestamp).where(
+                    readings.c.user_email.in_(emails),
+                    readings.c.timestamp >= min(stamps),
+                    readings.c.timestamp <= max(stamps),
+                ).order_by(readings.c.id)
+            )
+            # Ascending ids, so the newest reading with a given key wins
+            existing = {(email, ts): reading_id for reading_id, email, ts in found}
+
+        seen = {}
+        for i, p in params:
+            key = (p["user_email"], p["timestamp"])
+            if upsert and key in existing:
+                p = {**p, "b_id": existing[key]}
+                target, status = updates, "updated"
+            else:
+                target, status = inserts, "inserted"
+            if upsert and key in seen:
+                # A repeat inside the batch replaces the earlier row, which is reported as a duplicate
+                slot, earlier = seen[key]
+                target[slot] = p
+                statuses[earlier] = {"index": earlier, "status": "duplicate"}
+            else:
+                slot = len(target)
+                target.append(p)
+            seen[key] = (slot, i)
+            statuses[i] = {"index": i, "status": status}
+
+        if inserts:
+            conn.execute(insert(readings), inserts)
+        if updates:
+            conn.execute(update(readings).where(readings.c.id == bindparam("b_id")), updates)
+
+    counts = {}
+    for s in statuses:
+        counts[s["status"]] = counts.get(s["status"], 0) + 1
+    return {"count": len(rows), **counts, "results": statuses}
+
+
+def _uniform_rows(rows: list) -> list:
+    """Give every row the same keys (executemany needs one parameter shape), filling column defaults."""
+    keys = sorted({k for row in rows for k in row})
+    defaults = {"cycle_id": "unknown"}
+    return [{k: row.get(k, defaults.get(k)) for k in keys} for row in rows]
+
+
+def insert_readings(rows: list):
+    """Insert already validated rows in one transaction; the ingest buffer's group commit."""
+    with engine.begin() as conn:
+        conn.execute(insert(FlowReading.__table__), _uniform_rows(rows))
+
+
+ingest_buffer = IngestBuffer(
+    insert_readings,
+    max_rows=config.INGEST_BUFFER_MAX_ROWS,
+    flush_rows=config.INGEST_FLUSH_ROWS,
+    flush_interval_ms=config.INGEST_FLUSH_INTERVAL_MS,
+)
+
+
+def submit_reading(fields: dict) -> int:
+    """
+    Validate one reading, stamp it with the current time and hand it to the
+    ingest buffer. Returns the sequence number; the reading is in the database
+    once ingest_buffer.committed_seq reaches it. Raises ValueError for invalid
+    fields and IngestBufferFull / IngestUnavailable for backpressure.
+    """
+    row = _validate_batch_row({**fields, "timestamp": datetime.utcnow()})
+    return ingest_buffer.submit(row)
 
-from datetime import datetime
 
 def add_single_reading(
     user_email: str,
@@ -140,3 +399,13 @@ def add_single_reading(
         return reading
     finally:
         session.close()
+
+
+async def add_single_reading_async(user_email: str, **fields):
+    """add_single_reading on the async engine; `fields` are other flow_readings columns."""
+    async with async_readings_session() as session:
+        reading = FlowReading(user_email=user_email, timestamp=datetime.utcnow(), **fields)
+        session.add(reading)
+        await session.commit()
+        await session.refresh(reading)
+        return reading
@@ -0,0 +1,189 @@
+import collections
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class IngestBufferFull(Exception):
+    """Raised when `max_rows` readings are already waiting to be written; the client should retry shortly."""
+
+
+class IngestUnavailable(Exception):
+    """Raised when the buffer is stopped, or full because writes to the database keep failing."""
+
+
+class IngestBuffer:
+    """
+    Write-behind buffer that turns many single-reading writes into a few group commits.
+
+    `submit` appends a row and returns its sequence number right away. A
+    background thread writes buffered rows with `write_batch(rows)` (one
+    transaction) as soon as `flush_rows` rows are waiting or the oldest row has
+    waited `flush_interval_ms`, so throughput grows with batch size instead of
+    being capped by one fsync per reading. Rows are committed in sequence order;
+    `committed_seq` is the highest sequence number known to be in the database.
+
+    Accepted rows are held only in memory until their batch commits: a crash
+    loses at most the unflushed rows. At most `max_rows` rows may be buffered;
+    further submits raise IngestBufferFull (or IngestUnavailable while writes are
+    failing) instead of growing the queue. A failed batch is kept and retried
+    with backoff. `stop()` flushes whatever is left.
+
+    Sequence numbers count per buffer, i.e. per process. They only mean
+    something to a client that reads `committed_seq` from the same process, so
+    the app uses the buffer only when it runs a single server worker.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], Any],
+        max_rows: int = 10000,
+        flush_rows: int = 500,
+        flush_interval_ms: float = 5.0,
+    ):
+        self._write_batch = write_batch
+        self.max_rows = max(1, int(max_rows))
+        self.flush_rows = max(1, min(int(flush_rows), self.max_rows))
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000.0
+        self._lock = threading.Lock()
+        self._has_rows = threading.Condition(self._lock)
+        self._committed = threading.Condition(self._lock)
+        self._queue = collections.deque()  # (seq, enqueued, row)
+        self._in_flight = 0
+        self._thread = None
+        self._stopping = False
+
+        self.last_seq = 0
+        self.committed_seq = 0
+        self.accepted = 0
+        self.committed = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.flush_max_ms = 0.0
+        self.flush_total_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="ingest-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop accepting rows, flush the rest and wait up to `timeout` seconds for the writer."""
+        with self._lock:
+            thread = self._thread
+            self._stopping = True
+            self._has_rows.notify()
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            self._thread = None
+            if self._queue:
+                print(f"Ingest buffer stopped with {len(self._queue)} unwritten readings:", self.last_error)
+
+    def submit(self, row: Dict[str, Any]) -> int:
+        """Buffer one flow_readings row (column -> value); returns its sequence number."""
+        with self._lock:
+            if self._stopping or self._thread is None:
+                self.rejected += 1
+                raise IngestUnavailable("Ingest buffer is not running")
+            if len(self._queue) + self._in_flight >= self.max_rows:
+                self.rejected += 1
+                if self.consecutive_failures:
+                    raise IngestUnavailable(f"Ingest buffer full and writes failing: {self.last_error}")
+                raise IngestBufferFull(f"Ingest buffer full ({self.max_rows} readings pending)")
+            self.last_seq += 1
+            self.accepted += 1
+            self._queue.append((self.last_seq, time.perf_counter(), row))
+            if len(self._queue) == 1 or len(self._queue) >= self.flush_rows:
+                self._has_rows.notify()
+            return self.last_seq
+
+    def wait_committed(self, seq: int, timeout: float = None) -> bool:
+        """Block until `seq` is committed; False if `timeout` passes first."""
+        with self._lock:
+            return self._committed.wait_for(lambda: self.committed_seq >= seq, timeout)
+
+    def _next_batch(self):
+        """Wait for a full batch, an expired timer or stop; returns the rows to write (empty when done)."""
+        with self._lock:
+            while True:
+                if self._queue:
+                    if self._stopping or len(self._queue) >= self.flush_rows:
+                        break
+                    remaining = self._queue[0][1] + self.flush_interval - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._has_rows.wait(remaining)
+                elif self._stopping:
+                    return []
+                else:
+                    self._has_rows.wait()
+            n = min(len(self._queue), self.flush_rows)
+            batch = [self._queue.popleft() for _ in range(n)]
+            self._in_flight = n
+            return batch
+
+    def _run(self):
+        backoff = 0.01
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            started = time.perf_counter()
+            try:
+                self._write_batch([row for _, _, row in batch])
+            except Exception as e:
+                with self._lock:
+                    # Put the batch back in front so order and sequence numbers stay intact
+                    self._queue.extendleft(reversed(batch))
+                    self._in_flight = 0
+                    self.failed_flushes += 1
+                    self.consecutive_failures += 1
+                    self.last_error = str(e)
+                    stopping = self._stopping
+                print("Ingest flush failed:", e)
+                if stopping and self.consecutive_failures >= 3:
+                    return
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 1.0)
+                continue
+            backoff = 0.01
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with self._lock:
+                self._in_flight = 0
+                self.committed_seq = batch[-1][0]
+                self.committed += len(batch)
+                self.flushes += 1
+                self.consecutive_failures = 0
+                self.flush_total_ms += elapsed_ms
+                self.flush_max_ms = max(self.flush_max_ms, elapsed_ms)
+                self._committed.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running and not self._stopping,
+                "pending": len(self._queue) + self._in_flight,
+                "max_rows": self.max_rows,
+                "last_seq": self.last_seq,
+                "committed_seq": self.committed_seq,
+                "accepted": self.accepted,
+                "committed": self.committed,
+                "rejected": self.rejected,
+                "flushes": self.flushes,
+                "avg_flush_rows": round(self.committed / self.flushes, 2) if self.flushes else 0.0,
+                "avg_flush_ms": round(self.flush_total_ms / self.flushes, 3) if self.flushes else 0.0,
+                "max_flush_ms": round(self.flush_max_ms, 3),
+                "failed_flushes": self.failed_flushes,
+                "last_error": self.last_error,
+            }
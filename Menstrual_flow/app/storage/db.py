@@ -1,9 +1,6 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import declarative_base
 
-DATABASE_URL = "sqlite:///./swasthya_flow.db"
-
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The engine is configured (pool, pragmas) in app.storage.engine
+from app.storage.engine import FlowDataSession as SessionLocal, flow_data_engine as engine
 
 Base = declarative_base()
@@ -0,0 +1,121 @@
+"""
+One place that opens the app's SQLite databases.
+
+Every engine gets a connection pool and the same tuned pragmas on each new
+connection (see the "SQLite storage" settings in app/config.py):
+
+- journal_mode=WAL: readers see the last commit while a writer is active, so
+  reads no longer wait on writes and vice versa.
+- synchronous=NORMAL: in WAL mode this fsyncs at checkpoints rather than at every
+  commit; a power cut can lose the last commits but never corrupts the file.
+- busy_timeout: a writer waits for the lock instead of failing with
+  "database is locked".
+- cache_size / mmap_size: a larger page cache, and reads from the memory-mapped
+  file instead of read() calls.
+
+Two databases exist: flow_readings, users and feedback live in READINGS_DB_PATH
+(app.database re-exports that engine) and the flow_data training table and
+model_state live in FLOW_DATA_DB_PATH. Code that needs a plain DB-API connection
+(the sqlite3-style retraining code) takes one from the pool with
+`flow_data_connection()`; closing it returns it to the pool.
+
+Async request handlers use `async_readings_session()`: an AsyncSession on an
+aiosqlite engine over the same file, with the same pool settings and pragmas.
+That engine is created on first use, so scripts on the sync path never import
+aiosqlite.
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import config
+
+
+def _apply_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    try:
+        if config.SQLITE_JOURNAL_MODE:
+            cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+        if config.SQLITE_SYNCHRONOUS:
+            cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+        # A negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size={-int(config.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE)}")
+    finally:
+        cursor.close()
+
+
+def make_engine(path: str):
+    """Pooled engine on the SQLite file at `path`, with the tuned pragmas applied on connect."""
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={
+            "check_same_thread": False,
+            "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+        },
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT_S,
+    )
+    event.listen(engine, "connect", _apply_pragmas)
+    return engine
+
+
+readings_engine = make_engine(config.READINGS_DB_PATH)
+ReadingsSession = sessionmaker(autocommit=False, autoflush=False, bind=readings_engine)
+
+flow_data_engine = make_engine(config.FLOW_DATA_DB_PATH)
+FlowDataSession = sessionmaker(autocommit=False, autoflush=False, bind=flow_data_engine)
+
+
+def flow_data_connection():
+    """A pooled DB-API connection to the flow_data database; `close()` hands it back to the pool."""
+    return flow_data_engine.raw_connection()
+
+
+def make_async_engine(path: str):
+    """make_engine for asyncio: an aiosqlite engine with the same pool settings and pragmas."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        connect_args={"timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000.0},
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT_S,
+    )
+    # Pool events fire on the sync engine the async one wraps
+    event.listen(engine.sync_engine, "connect", _apply_pragmas)
+    return engine
+
+
+_async_readings_engine = None
+_async_readings_sessions = None
+
+
+def async_readings_engine():
+    """The async engine on READINGS_DB_PATH, created on first use."""
+    global _async_readings_engine, _async_readings_sessions
+    if _async_readings_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_readings_engine = make_async_engine(config.READINGS_DB_PATH)
+        # Loaded attributes stay readable after commit; lazy loads would need an await
+        _async_readings_sessions = async_sessionmaker(
+            _async_readings_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_readings_engine
+
+
+def async_readings_session():
+    """A new AsyncSession on the readings database; use as `async with async_readings_session() as db`."""
+    async_readings_engine()
+    return _async_readings_sessions()
+
+
+async def dispose_async_engines():
+    """Close pooled aiosqlite connections (their worker threads) at shutdown."""
+    global _async_readings_engine, _async_readings_sessions
+    engine, _async_readings_engine, _async_readings_sessions = _async_readings_engine, None, None
+    if engine is not None:
+        await engine.dispose()
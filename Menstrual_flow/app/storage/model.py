@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -32,6 +32,8 @@ class Feedback(Base):
 
 class FlowReading(Base):
     __tablename__ = "flow_readings"
+    # Per-user time-series access (see app/storage/timeseries.py); existing databases: migrate_readings_index.py
+    __table_args__ = (Index("ix_flow_readings_user_email_timestamp", "user_email", "timestamp"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_email = Column(String, nullable=False)
@@ -97,4 +99,18 @@ class FlowReading(Base):
     appetite_loss = Column(Integer, nullable=True)  # 0/1 boolean
     vaginal_discharge = Column(String, nullable=True)  # Description of discharge
     discharge_odor = Column(String, nullable=True)  # Odor description
-    discharge_color = Column(String, nullable=True)  # Color description
\ No newline at end of file
+    discharge_color = Column(String, nullable=True)  # Color description
+
+
+class FlowPrediction(Base):
+    """Offline risk score of one flow reading by one model version (see app.ml.batch_score)."""
+    __tablename__ = "flow_predictions"
+
+    reading_id = Column(Integer, ForeignKey("flow_readings.id"), primary_key=True)
+    model_version = Column(String, primary_key=True)
+    prediction = Column(String, nullable=False)
+    risk_indicator = Column(String, nullable=False)
+    confidence = Column(Float, nullable=False)
+    probabilities = Column(String, nullable=True)  # JSON {label: probability}
+    detected_conditions = Column(String, nullable=True)  # JSON [[condition, risk_level, confidence], ...]
+    scored_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,98 @@
+"""
+Per-user time-series queries over flow_readings.
+
+Every query filters on user_email and orders by (timestamp, id), which the
+composite (user_email, timestamp) index serves directly: SQLite appends the
+rowid (id) to every index entry, so no sort step is needed. check_readings_index.py
+asserts the query plans.
+
+Each helper has a *_query builder (a Core select, also used by the check) and
+a function that runs it on a Session or Connection and returns Row objects.
+`columns` limits the selected columns; id and timestamp are always included.
+"""
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import and_, not_, select
+
+from app.storage.model import FlowReading
+
+readings = FlowReading.__table__
+INDEX_NAME = "ix_flow_readings_user_email_timestamp"
+
+Cursor = Tuple[datetime, int]
+
+
+def validate_columns(columns: Optional[Sequence[str]]):
+    """Raise ValueError for names that are not flow_readings columns."""
+    unknown = [c for c in columns or () if c not in readings.c]
+    if unknown:
+        raise ValueError(f"Unknown flow_readings columns: {', '.join(unknown)}")
+
+
+def _columns(columns: Optional[Sequence[str]]):
+    if columns is None:
+        return [readings]
+    validate_columns(columns)
+    names = ["id", "timestamp"] + [c for c in columns if c not in ("id", "timestamp")]
+    return [readings.c[name] for name in names]
+
+
+def latest_query(user_email: str, n: int, columns: Optional[Sequence[str]] = None):
+    """The user's `n` most recent readings, newest first."""
+    return (
+        select(*_columns(columns))
+        .where(readings.c.user_email == user_email)
+        .order_by(readings.c.timestamp.desc(), readings.c.id.desc())
+        .limit(n)
+    )
+
+
+def range_query(user_email: str, t0: datetime, t1: datetime, columns: Optional[Sequence[str]] = None):
+    """Readings with t0 <= timestamp < t1, oldest first."""
+    return (
+        select(*_columns(columns))
+        .where(
+            readings.c.user_email == user_email,
+            readings.c.timestamp >= t0,
+            readings.c.timestamp < t1,
+        )
+        .order_by(readings.c.timestamp, readings.c.id)
+    )
+
+
+def since_query(user_email: str, cursor: Optional[Cursor] = None, limit: int = 500,
+                columns: Optional[Sequence[str]] = None,
+                start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """
+    Up to `limit` readings after the (timestamp, id) cursor, oldest first; no
+    cursor starts at the beginning. The index range starts at the cursor's
+    timestamp and rows at that timestamp up to the cursor's id are skipped.
+    `start` / `end` optionally bound the timestamps to [start, end).
+    """
+    query = select(*_columns(columns)).where(readings.c.user_email == user_email)
+    if start is not None:
+        query = query.where(readings.c.timestamp >= start)
+    if end is not None:
+        query = query.where(readings.c.timestamp < end)
+    if cursor is not None:
+        ts, last_id = cursor
+        query = query.where(
+            readings.c.timestamp >= ts,
+            not_(and_(readings.c.timestamp == ts, readings.c.id <= last_id)),
+        )
+    return query.order_by(readings.c.timestamp, readings.c.id).limit(limit)
+
+
+def latest(conn, user_email: str, n: int, columns: Optional[Sequence[str]] = None):
+    return conn.execute(latest_query(user_email, n, columns)).all()
+
+
+def in_range(conn, user_email: str, t0: datetime, t1: datetime, columns: Optional[Sequence[str]] = None):
+    return conn.execute(range_query(user_email, t0, t1, columns)).all()
+
+
+def since(conn, user_email: str, cursor: Optional[Cursor] = None, limit: int = 500,
+          columns: Optional[Sequence[str]] = None,
+          start: Optional[datetime] = None, end: Optional[datetime] = None):
+    return conn.execute(since_query(user_email, cursor, limit, columns, start, end)).all()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Check /flow/batch: every bad row gets its own "invalid" status (never a 422 for the
+whole batch), and an upsert updates only the newest reading with a repeated
+(user_email, timestamp)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+async def check_row_validation(client):
+    rows = [
+        {"user_email": "a@example.com", "timestamp": "2025-01-01T08:00:00", "flow_ml": 4.5},
+        {"timestamp": "2025-01-01T09:00:00", "flow_ml": 1.0},
+        {"user_email": "a@example.com", "timestamp": "not-a-date", "flow_ml": 1.0},
+        {"user_email": "a@example.com", "timestamp": "2025-01-01T10:00:00", "flow_ml": "lots"},
+        {"user_email": "a@example.com", "timestamp": "2025-01-01T11:00:00", "flow_ml": 1.0, "mood": "ok"},
+        {"user_email": "a@example.com", "timestamp": "2025-01-01T12:00:00", "flow_ml": 1.0, "hb": True},
+    ]
+    response = await client.post("/flow/batch", json={"readings": rows})
+    print(f"mixed batch: HTTP {response.status_code}")
+    if response.status_code != 200:
+        print(f"  ❌ the whole batch was rejected: {response.text[:200]}")
+        return False
+    results = response.json()["results"]
+    for r in results:
+        print(f"  row {r['index']}: {r['status']} {r.get('error', '')}")
+    if [r["status"] for r in results] != ["inserted"] + ["invalid"] * (len(rows) - 1):
+        print("  ❌ expected the first row inserted and every other row invalid")
+        return False
+    return True
+
+async def check_upsert_newest(client):
+    from datetime import datetime
+
+    from sqlalchemy import select
+
+    from app.database import engine
+    from app.services import data_service
+    from app.storage.model import FlowReading
+
+    readings = FlowReading.__table__
+    key = {"user_email": "b@example.com", "timestamp": datetime(2025, 2, 1, 8)}
+    # Two stored copies of one key, as the single-reading path can produce
+    data_service.insert_readings([{**key, "flow_ml": 1.0}, {**key, "flow_ml": 2.0}])
+
+    body = {"readings": [{"user_email": "b@example.com", "timestamp": "2025-02-01T08:00:00", "flow_ml": 9.0}]}
+    response = await client.post("/flow/batch", params={"upsert": "true"}, json=body)
+    status = response.json()["results"][0]["status"]
+    with engine.connect() as conn:
+        stored = [
+            flow for _, flow in conn.execute(
+                select(readings.c.id, readings.c.flow_ml)
+                .where(readings.c.user_email == key["user_email"])
+                .order_by(readings.c.id)
+            )
+        ]
+    print(f"upsert over two copies: {status}, stored flow_ml {stored}")
+    if status != "updated" or stored != [1.0, 9.0]:
+        print("  ❌ expected only the newest copy updated")
+        return False
+    return True
+
+async def check():
+    import httpx
+
+    from app.database import engine
+    from app.main import app
+    from app.storage.model import FlowReading
+
+    FlowReading.__table__.create(engine, checkfirst=True)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await check_row_validation(client) & await check_upsert_newest(client)
+
+if __name__ == "__main__":
+    # Separate database so the check never touches app data; set before any app import
+    _tmp = tempfile.TemporaryDirectory()
+    os.environ["READINGS_DB_PATH"] = os.path.join(_tmp.name, "check.db")
+    try:
+        success = asyncio.run(check())
+    finally:
+        from app.database import engine
+
+        engine.dispose()
+        _tmp.cleanup()
+    if success:
+        print("\n✅ Batch readings are validated per row and upserts update the newest copy.")
+    else:
+        print("\n❌ Batch readings check failed.")
+    sys.exit(0 if success else 1)
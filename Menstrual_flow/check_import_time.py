@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Check that importing the API stays cheap (no model loading or heavy imports at import time)
+"""
+
+import os
+import subprocess
+import sys
+
+def check_import_time():
+    budget_s = float(os.getenv("IMPORT_TIME_BUDGET_S", "1.5"))
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app.main\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = [m for m in ('sklearn', 'pandas', 'PIL') if m in sys.modules]\n"
+        "print(elapsed, ','.join(heavy))\n"
+    )
+
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"Error: importing app.main failed\n{e.stderr}")
+        return False
+
+    # Startup prints may precede the result on stdout
+    fields = result.stdout.splitlines()[-1].split(" ")
+    elapsed = float(fields[0])
+    heavy = [m for m in fields[1].split(",") if m] if len(fields) > 1 else []
+
+    print(f"import app.main: {elapsed:.3f}s (budget {budget_s:.3f}s)")
+    if heavy:
+        print(f"Heavy modules imported at import time: {heavy}")
+
+    return elapsed <= budget_s and not heavy
+
+if __name__ == "__main__":
+    print("Checking API import time...")
+    success = check_import_time()
+    if success:
+        print("\n✅ Import time within budget!")
+    else:
+        print("\n❌ Import time over budget.")
+        sys.exit(1)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Check async predictions under the default (process) inference executor: startup
+does not block the event loop, concurrent requests are coalesced into batches,
+and workers pick up a model swapped in after they loaded theirs
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+async def _max_loop_gap(coro):
+    """Run `coro` while a ticker measures the longest stall of the event loop, in seconds."""
+    gaps = []
+    done = False
+
+    async def tick():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticker = asyncio.create_task(tick())
+    await coro
+    done = True
+    await ticker
+    return max(gaps, default=0.0)
+
+async def check(rows):
+    from app import config
+    from app.main import shutdown_event, startup_event
+    from app.ml import ml_service
+
+    ok = True
+    print(f"INFERENCE_EXECUTOR={config.INFERENCE_EXECUTOR}, workers={config.INFERENCE_WORKERS}")
+    if config.INFERENCE_EXECUTOR != "process":
+        print("  ❌ the check must run with the default process executor")
+        return False
+
+    gap = await _max_loop_gap(startup_event())
+    print(f"startup: longest event loop stall {gap * 1000:.0f} ms")
+    if gap > 0.5:
+        print("  ❌ startup blocks the event loop")
+        ok = False
+
+    try:
+        expected = [ml_service.predict_flow_risk(r)["prediction"] for r in rows]
+        ml_service.batcher.stats.reset()
+        results = await asyncio.gather(*(ml_service.predict_flow_risk_async(r) for r in rows))
+        stats = ml_service.batcher.stats.snapshot()
+        print(f"{len(rows)} concurrent predictions: {stats['batches']} batches, avg {stats['avg_batch_size']} rows")
+        if stats["requests"] != len(rows) or stats["batches"] >= len(rows):
+            print("  ❌ requests were not coalesced in front of the executor")
+            ok = False
+        if [r["prediction"] for r in results] != expected:
+            print("  ❌ batched predictions differ from in-process predictions")
+            ok = False
+
+        # Retrain in the parent: the workers loaded the old model at startup
+        from sklearn.ensemble import RandomForestClassifier
+
+        X = [[float(r[f]) for f in ml_service.EXPECTED_FEATURES] for r in rows]
+        labels = ["Normal" if i % 2 else "PCOS Risk" for i in range(len(rows))]
+        ml_service._swap_model(RandomForestClassifier(n_estimators=5, max_depth=3, random_state=0).fit(X, labels))
+        expected_new = [ml_service.predict_flow_risk(r)["prediction"] for r in rows]
+        results = await asyncio.gather(*(ml_service.predict_flow_risk_async(r) for r in rows))
+        changed = sum(a != b for a, b in zip(expected, expected_new))
+        print(f"after swap: {changed} of {len(rows)} predictions changed in the parent")
+        if [r["prediction"] for r in results] != expected_new:
+            print("  ❌ executor workers still serve the old model")
+            ok = False
+    finally:
+        await shutdown_event()
+    return ok
+
+if __name__ == "__main__":
+    # Work on copies of the model and databases, since the check swaps in a retrained
+    # model and startup writes to the databases; every request must reach the
+    # executor, so the result cache is off. Set before any app import; spawned
+    # workers inherit the environment.
+    _tmp = tempfile.mkdtemp()
+    shutil.copy("app/ml/model.joblib", os.path.join(_tmp, "model.joblib"))
+    os.environ["MODEL_PATH"] = os.path.join(_tmp, "model.joblib")
+    os.environ["FLAT_MODEL_PATH"] = os.path.join(_tmp, "model_flat.joblib")
+    for _name, _db in (("READINGS_DB_PATH", "swasthya_flow_new.db"), ("FLOW_DATA_DB_PATH", "swasthya_flow.db")):
+        if os.path.exists(_db):
+            shutil.copy(_db, os.path.join(_tmp, _db))
+        os.environ[_name] = os.path.join(_tmp, _db)
+    os.environ["PREDICTION_CACHE_ENABLED"] = "0"
+    os.environ["RETRAIN_ENABLED"] = "0"
+    os.environ.setdefault("INFERENCE_WORKERS", "2")
+
+    import pandas as pd
+
+    from app.ml.ml_service import EXPECTED_FEATURES
+
+    rows = pd.read_csv("app/ml/synthetic_flow_dataset.csv", nrows=64)[EXPECTED_FEATURES].to_dict("records")
+    try:
+        success = asyncio.run(check(rows))
+    finally:
+        shutil.rmtree(_tmp, ignore_errors=True)
+    if success:
+        print("\n✅ Process executor predictions are batched and follow model swaps.")
+    else:
+        print("\n❌ Inference batching check failed.")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Check that the flow_readings time-series queries use the (user_email, timestamp) index
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+
+from app.storage import timeseries
+from migrate_readings_index import migrate_database
+from app.storage.model import FlowReading
+
+def _plan(conn, statement, parameters):
+    return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()]
+
+def check_query_plans():
+    engine = create_engine("sqlite://")
+    FlowReading.__table__.create(engine)
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    start = datetime(2025, 1, 1)
+    rows = [
+        {"user_email": f"user{u}@example.com", "timestamp": start + timedelta(hours=i // 2), "flow_ml": float(i)}
+        for u in range(20) for i in range(200)
+    ]
+    ok = True
+    with engine.begin() as conn:
+        conn.execute(FlowReading.__table__.insert(), rows)
+        conn.exec_driver_sql("ANALYZE")
+
+        user = "user7@example.com"
+        expected = sorted(
+            (r["timestamp"], i + 1) for i, r in enumerate(rows) if r["user_email"] == user
+        )
+        t0, t1 = start + timedelta(hours=10), start + timedelta(hours=40)
+        cursor = expected[41]
+        cases = [
+            ("latest", lambda: timeseries.latest(conn, user, 5, ["flow_ml"]), expected[::-1][:5]),
+            ("range", lambda: timeseries.in_range(conn, user, t0, t1), [e for e in expected if t0 <= e[0] < t1]),
+            ("since", lambda: timeseries.since(conn, user, cursor, limit=50), expected[42:92]),
+        ]
+        for name, run, want in cases:
+            got = [(r.timestamp, r.id) for r in run()]
+            plan = _plan(conn, *statements[-1])
+            uses_index = any(timeseries.INDEX_NAME in step for step in plan)
+            sorts = any("TEMP B-TREE" in step for step in plan)
+            print(f"{name}: {' | '.join(plan)}")
+            if not uses_index or sorts:
+                print(f"  ❌ {name} does not use {timeseries.INDEX_NAME} without a sort step")
+                ok = False
+            if got != want:
+                print(f"  ❌ {name} returned the wrong rows")
+                ok = False
+    return ok
+
+def check_database_index(db_path="swasthya_flow_new.db"):
+    """migrate_readings_index.py adds the index to the real database; run it twice on a copy."""
+    if not os.path.exists(db_path):
+        return True
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, os.path.basename(db_path))
+        shutil.copy(db_path, copy)
+        migrated = migrate_database(copy) and migrate_database(copy)
+        conn = sqlite3.connect(copy)
+        try:
+            indexes = [row[1] for row in conn.execute("PRAGMA index_list(flow_readings)")]
+        finally:
+            conn.close()
+    if not migrated or indexes.count(timeseries.INDEX_NAME) != 1:
+        print(f"❌ migrate_readings_index.py does not leave {db_path} with one {timeseries.INDEX_NAME}")
+        return False
+    print(f"{db_path}: migrate_readings_index.py adds {timeseries.INDEX_NAME}")
+    return True
+
+if __name__ == "__main__":
+    success = check_query_plans() & check_database_index()
+    if success:
+        print("\n✅ Time-series queries use the flow_readings index.")
+    else:
+        print("\n❌ Time-series query check failed.")
+    sys.exit(0 if success else 1)
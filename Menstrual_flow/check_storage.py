@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Check that every SQLite engine is pooled and tuned, and that readers and writers do not block each other
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event, text
+
+from app import config
+from app.storage import engine as storage
+
+def _pragmas(conn):
+    names = ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+    return {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
+
+def check_pragmas(engine):
+    expected = {
+        "journal_mode": config.SQLITE_JOURNAL_MODE.lower(),
+        "synchronous": {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3}[config.SQLITE_SYNCHRONOUS.upper()],
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -config.SQLITE_CACHE_SIZE_KB,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+    }
+    with engine.connect() as conn:
+        got = _pragmas(conn)
+    print(f"pragmas: {got}")
+    wrong = {k: v for k, v in expected.items() if got[k] != v}
+    if wrong:
+        print(f"  ❌ expected {wrong}")
+        return False
+    return True
+
+def check_async_pragmas(path):
+    """The aiosqlite engine used by async handlers gets the same pragmas."""
+    async def run():
+        engine = storage.make_async_engine(path)
+        try:
+            async with engine.connect() as conn:
+                return await conn.run_sync(lambda sync_conn: _pragmas(sync_conn))
+        finally:
+            await engine.dispose()
+
+    got = asyncio.run(run())
+    print(f"async pragmas: {got}")
+    if got["journal_mode"] != config.SQLITE_JOURNAL_MODE.lower() or got["busy_timeout"] != config.SQLITE_BUSY_TIMEOUT_MS:
+        print("  ❌ async engine is missing the tuned pragmas")
+        return False
+    return True
+
+def check_app_engines():
+    """The app's engines must be built by make_engine (pragma listener plus a real pool)."""
+    ok = True
+    for name in ("readings_engine", "flow_data_engine"):
+        engine = getattr(storage, name)
+        tuned = event.contains(engine, "connect", storage._apply_pragmas)
+        print(f"{name}: {engine.url.database}, pool {engine.pool.status()}")
+        if not tuned or engine.pool.size() != config.DB_POOL_SIZE:
+            print(f"  ❌ {name} is not a pooled engine with the tuned pragmas")
+            ok = False
+    return ok
+
+def check_concurrency(engine, writers=8, writes_each=50):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (id INTEGER PRIMARY KEY, v REAL)")
+        conn.exec_driver_sql("INSERT INTO t (v) VALUES (0)")
+
+    # A reader must not wait for a writer that holds an open write transaction
+    started, release = threading.Event(), threading.Event()
+
+    def long_writer():
+        with engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO t (v) VALUES (1)")
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=long_writer)
+    thread.start()
+    started.wait(5)
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        seen = conn.execute(text("SELECT COUNT(*) FROM t")).scalar()
+    read_ms = (time.perf_counter() - t0) * 1000
+    release.set()
+    thread.join()
+    print(f"read during open write transaction: {read_ms:.1f} ms, saw {seen} committed row(s)")
+    ok = read_ms < 100 and seen == 1
+
+    # Concurrent writers wait on busy_timeout instead of failing
+    errors = []
+
+    def writer():
+        for i in range(writes_each):
+            try:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql("INSERT INTO t (v) VALUES (?)", (float(i),))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT COUNT(*) FROM t")).scalar()
+    print(f"{writers} concurrent writers: {total - 2} rows written, {len(errors)} errors")
+    if errors:
+        print(f"  ❌ {errors[0]}")
+    return ok and not errors and total == 2 + writers * writes_each
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = storage.make_engine(os.path.join(tmp, "check.db"))
+        try:
+            success = (
+                check_pragmas(engine)
+                & check_async_pragmas(os.path.join(tmp, "check.db"))
+                & check_concurrency(engine)
+                & check_app_engines()
+            )
+        finally:
+            engine.dispose()
+    if success:
+        print("\n✅ SQLite storage is pooled and tuned.")
+    else:
+        print("\n❌ SQLite storage check failed.")
+    sys.exit(0 if success else 1)
@@ -1,5 +1,5 @@
 from app.database import Base, engine
-from app.storage.model import FlowReading, User, Feedback
+from app.storage.model import FlowReading, FlowPrediction, User, Feedback
 
 Base.metadata.create_all(bind=engine)
 
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the (user_email, timestamp) index to flow_readings.
+Per-user history queries use it instead of scanning and sorting the whole table.
+"""
+
+import sqlite3
+import os
+
+INDEX_NAME = "ix_flow_readings_user_email_timestamp"
+
+def migrate_database(db_path="swasthya_flow_new.db"):
+
+    if not os.path.exists(db_path):
+        print(f"Database file {db_path} not found.")
+        return False
+
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA index_list(flow_readings)")
+        indexes = [row[1] for row in cursor.fetchall()]
+        if INDEX_NAME in indexes:
+            print(f"  Already exists: {INDEX_NAME}")
+        else:
+            cursor.execute(f"CREATE INDEX {INDEX_NAME} ON flow_readings (user_email, timestamp)")
+            print(f"  Added: {INDEX_NAME}")
+
+        # Refresh planner statistics so the new index is costed correctly
+        cursor.execute("ANALYZE flow_readings")
+        conn.commit()
+        return True
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    print("Adding the flow_readings (user_email, timestamp) index to swasthya_flow_new.db...")
+    success = migrate_database()
+    if success:
+        print("\n✅ Database migration completed successfully!")
+    else:
+        print("\n❌ Database migration failed.")
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Separate database so the benchmark never touches app data
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("READINGS_DB_PATH", os.path.join(_tmp, "bench.db"))
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from starlette.concurrency import run_in_threadpool
+
+from app.services import data_service
+from app.storage.engine import dispose_async_engines, readings_engine
+from app.storage.model import FlowReading
+
+
+def _populate(users: int = 50, per_user: int = 400):
+    FlowReading.__table__.create(readings_engine, checkfirst=True)
+    start = datetime(2025, 1, 1)
+    rows = [
+        {"user_email": f"user{u}@example.com", "timestamp": start + timedelta(minutes=i), "flow_ml": float(i % 9)}
+        for u in range(users) for i in range(per_user)
+    ]
+    data_service.insert_readings(rows)
+    return users
+
+
+async def _probe(done: asyncio.Event, waits: list):
+    """Time a no-op threadpool call every few ms: how long other sync work waits for a worker thread."""
+    while not done.is_set():
+        t0 = time.perf_counter()
+        await run_in_threadpool(lambda: None)
+        waits.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def _run(call, requests: int, concurrency: int):
+    """
+    Issue `requests` history-page reads with `concurrency` in flight. Returns the
+    elapsed time, per-request latencies and threadpool probe waits, in ms.
+    """
+    latencies, waits = [], []
+    sem = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+    probe = asyncio.create_task(_probe(done, waits))
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            await call(f"user{i % 50}@example.com")
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await probe
+    return elapsed, latencies, waits
+
+
+async def benchmark(requests: int = 2000, concurrencies=(1, 16, 64, 256)):
+    _populate()
+    fields = ["flow_ml"]
+
+    async def sync_path(email):
+        # What a sync route does: one threadpool hop for the whole handler
+        await run_in_threadpool(data_service.readings_page, email, fields, None, 100)
+
+    async def async_path(email):
+        await data_service.readings_page_async(email, fields, None, 100)
+
+    await async_path("user0@example.com")
+    print(f"{'path':>6} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'threadpool wait p50/max ms':>27}")
+    for concurrency in concurrencies:
+        for name, call in (("sync", sync_path), ("async", async_path)):
+            elapsed, lat, waits = await _run(call, requests, concurrency)
+            lat.sort()
+            print(
+                f"{name:>6} {concurrency:>5} {requests / elapsed:>8.0f} "
+                f"{statistics.median(lat):>8.2f} {lat[int(len(lat) * 0.99) - 1]:>8.2f} "
+                f"{statistics.median(waits):>18.2f} / {max(waits):.2f}"
+            )
+    await dispose_async_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
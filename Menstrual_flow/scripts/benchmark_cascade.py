@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Score every row directly so the timings compare the two cascade modes only
+os.environ.setdefault("PREDICTION_CACHE_ENABLED", "0")
+os.environ.setdefault("INFERENCE_BATCHING_ENABLED", "0")
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app import config
+from app.ml import ml_service, stage_timer
+from app.ml.ml_service import EXPECTED_FEATURES
+
+
+def _best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(data_path: str = "app/ml/synthetic_flow_dataset.csv", cutoffs=((0.7, 0.85), (0.6, 0.7), (0.5, 0.6))):
+    """Full-forest vs cascade latency, stage decision rates and agreement for a few cutoff pairs."""
+    rows = pd.read_csv(data_path)[EXPECTED_FEATURES].to_dict("records")
+    ml_service.predict_flow_risk(rows[0])
+
+    config.CASCADE_ENABLED = False
+    baseline = [ml_service.predict_flow_risk(r)["prediction"] for r in rows]
+    full_s = _best_of(lambda: [ml_service.predict_flow_risk(r) for r in rows])
+    print(f"{len(rows)} rows, full forest: {full_s / len(rows) * 1e6:.0f} us/row")
+
+    print(f"{'cutoffs':>12} {'us/row':>8} {'normal':>8} {'abnormal':>9} {'full':>7} {'agreement':>10}")
+    config.CASCADE_ENABLED = True
+    for normal_cutoff, abnormal_cutoff in cutoffs:
+        config.CASCADE_NORMAL_CUTOFF = normal_cutoff
+        config.CASCADE_ABNORMAL_CUTOFF = abnormal_cutoff
+        config.CASCADE_AUDIT_RATE = 0.0
+        cascade_s = _best_of(lambda: [ml_service.predict_flow_risk(r) for r in rows])
+
+        stage_timer.STATS.reset()
+        predictions = [ml_service.predict_flow_risk(r)["prediction"] for r in rows]
+        stats = ml_service.cascade_stats()
+        agreement = sum(a == b for a, b in zip(predictions, baseline)) / len(rows)
+        print(
+            f"{normal_cutoff:>5}/{abnormal_cutoff:<6} {cascade_s / len(rows) * 1e6:>8.0f} "
+            f"{stats['stage1_normal_rate']:>8.1%} {stats['stage1_abnormal_rate']:>9.1%} "
+            f"{stats['full_model_rate']:>7.1%} {agreement:>10.2%}"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
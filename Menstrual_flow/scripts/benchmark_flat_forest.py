@@ -0,0 +1,45 @@
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.ml.flat_forest import FlatForest
+from app.ml.ml_service import EXPECTED_FEATURES
+
+
+def _best_of(fn, repeat: int = 5, number: int = 20) -> float:
+    """Best mean seconds per call over `repeat` runs of `number` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def benchmark(model_path: str = "app/ml/model.joblib", data_path: str = "app/ml/synthetic_flow_dataset.csv"):
+    """Compare sklearn predict_proba with the flattened evaluator and check they agree."""
+    model = joblib.load(model_path)
+    flat = FlatForest.from_estimator(model)
+    X = pd.read_csv(data_path)[EXPECTED_FEATURES].values.astype(float)
+
+    max_diff = np.abs(flat.predict_proba(X) - model.predict_proba(X)).max()
+    print(f"Max |flat - sklearn| probability difference over {len(X)} rows: {max_diff:.2e}")
+    assert np.allclose(flat.predict_proba(X), model.predict_proba(X), atol=1e-9)
+
+    print(f"{'rows':>6} {'sklearn ms':>12} {'flat ms':>10} {'speedup':>9}")
+    for n in (1, 8, 64, 256):
+        batch = X[:n]
+        sk = _best_of(lambda: model.predict_proba(batch))
+        fl = _best_of(lambda: flat.predict_proba(batch))
+        print(f"{n:>6} {sk * 1e3:>12.3f} {fl * 1e3:>10.3f} {sk / fl:>8.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.data_service import _uniform_rows
+from app.services.ingest_buffer import IngestBuffer
+from app.storage.model import FlowReading
+
+
+def _row(i: int) -> dict:
+    return {"user_email": f"user{i % 50}@example.com", "timestamp": datetime.utcnow(), "flow_ml": float(i % 9)}
+
+
+def per_row(engine, n: int) -> float:
+    """One session and commit per reading, as /flow/single does without the buffer."""
+    Session = sessionmaker(bind=engine)
+    start = time.perf_counter()
+    for i in range(n):
+        session = Session()
+        session.add(FlowReading(**_row(i)))
+        session.commit()
+        session.close()
+    return time.perf_counter() - start
+
+
+def buffered(engine, n: int, flush_rows: int, threads: int = 4) -> tuple:
+    """Submit from a few threads and time until every reading is committed."""
+    def write(rows):
+        with engine.begin() as conn:
+            conn.execute(insert(FlowReading.__table__), _uniform_rows(rows))
+
+    buffer = IngestBuffer(write, max_rows=max(n, 1), flush_rows=flush_rows, flush_interval_ms=5)
+    buffer.start()
+    per_thread = n // threads
+
+    def produce():
+        for i in range(per_thread):
+            buffer.submit(_row(i))
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=produce) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    buffer.wait_committed(buffer.last_seq)
+    elapsed = time.perf_counter() - start
+    buffer.stop()
+    return elapsed, buffer.snapshot()
+
+
+def benchmark(n: int = 2000, flush_sizes=(1, 10, 100, 500)):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'ingest.db')}")
+        FlowReading.__table__.create(engine)
+
+        baseline_n = min(n, 500)
+        elapsed = per_row(engine, baseline_n)
+        print(f"{'per-row commit':>16}: {baseline_n / elapsed:>9.0f} readings/s")
+
+        for flush_rows in flush_sizes:
+            elapsed, stats = buffered(engine, n, flush_rows)
+            print(
+                f"{'flush_rows=' + str(flush_rows):>16}: {stats['committed'] / elapsed:>9.0f} readings/s "
+                f"({stats['flushes']} commits, avg {stats['avg_flush_rows']} rows)"
+            )
+
+
+if __name__ == "__main__":
+    benchmark()